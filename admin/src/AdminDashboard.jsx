@@ -156,75 +156,27 @@ const AdminDashboard = () => {
   const fetchDashboardData = async () => {
     try {
       console.log('Fetching dashboard data...');
-      // Fetch all data in parallel - add ?page_size=1000 to get all records
-      const [appointmentsRes, usersRes, servicesRes, galleryRes, transactionsRes] = await Promise.all([
-        api.get('/appointments/?page_size=1000'),
-        api.get('/users/?page_size=1000'),
-        api.get('/services/?page_size=1000'),
-        api.get('/gallery/?page_size=1000'),
-        api.get('/transactions/?page_size=1000')
-      ]);
-      
-      // Handle paginated responses
-      const appointments = appointmentsRes.data.results 
-        ? appointmentsRes.data.results 
-        : (Array.isArray(appointmentsRes.data) ? appointmentsRes.data : []);
-      
-      const users = usersRes.data.results 
-        ? usersRes.data.results 
-        : (Array.isArray(usersRes.data) ? usersRes.data : []);
-      
-      const services = servicesRes.data.results 
-        ? servicesRes.data.results 
-        : (Array.isArray(servicesRes.data) ? servicesRes.data : []);
-      
-      const gallery = galleryRes.data.results 
-        ? galleryRes.data.results 
-        : (Array.isArray(galleryRes.data) ? galleryRes.data : []);
-      
-      const transactions = transactionsRes.data.results 
-        ? transactionsRes.data.results 
-        : (Array.isArray(transactionsRes.data) ? transactionsRes.data : []);
-      
-      const totalAppointments = appointments.length;
-      const pendingAppointments = appointments.filter(
-        apt => apt.status === 'pending'
-      ).length;
-      
-      // Calculate total revenue from completed appointments
-      const appointmentRevenue = appointments
-        .filter(apt => apt.status === 'completed')
-        .reduce((sum, apt) => sum + parseFloat(apt.amount_paid || 0), 0);
-      
-      // Also include completed transactions (for any other payments)
-      const transactionRevenue = transactions
-        .filter(txn => txn.status === 'completed')
-        .reduce((sum, txn) => sum + parseFloat(txn.amount || 0), 0);
-      
-      const totalRevenue = appointmentRevenue + transactionRevenue;
+      // Counts and revenue are aggregated server-side
+      const { data: summary } = await api.get('/admin/summary/');
 
       setStats({
-        totalAppointments,
-        pendingAppointments,
-        totalRevenue: totalRevenue.toFixed(2),
-        totalUsers: users.length,
-        totalServices: services.length,
-        totalGalleryItems: gallery.length
+        totalAppointments: summary.total_appointments,
+        pendingAppointments: summary.pending_appointments,
+        totalRevenue: summary.total_revenue,
+        totalUsers: summary.total_users,
+        totalServices: summary.total_services,
+        totalGalleryItems: summary.total_gallery_items
       });
 
-      // Create recent activities from appointments - sort by date descending
-      const recent = appointments
-        .sort((a, b) => new Date(b.appointment_date) - new Date(a.appointment_date))
-        .slice(0, 5)
-        .map(apt => ({
-          time: new Date(apt.appointment_date).toLocaleString(),
-          description: `Appointment: ${apt.service_name || 'Service'} - ${apt.customer_name || 'Customer'} (${apt.status})`
-        }));
+      const recent = summary.recent_activities.map(activity => ({
+        time: new Date(activity.appointment_date).toLocaleString(),
+        description: activity.description
+      }));
       
       setRecentActivities(recent);
       setLoading(false);
       setLastUpdated(new Date());
-      console.log('Dashboard updated:', { totalAppointments, pendingAppointments, totalRevenue: totalRevenue.toFixed(2) });
+      console.log('Dashboard updated:', summary);
     } catch (error) {
       console.error('Error fetching dashboard data:', error);
       setLoading(false);
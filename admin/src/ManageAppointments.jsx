@@ -55,6 +55,17 @@ const EmptyState = styled.div`
   color: ${props => props.theme.colors.textLight};
 `;
 
+const BulkBar = styled.div`
+  display: flex;
+  align-items: center;
+  gap: 0.75rem;
+  margin-bottom: 1rem;
+  padding: 0.75rem 1rem;
+  border-radius: 8px;
+  background: ${props => props.theme.colors.background};
+  box-shadow: ${props => props.theme.shadows.small};
+`;
+
 const ActionButtons = styled.div`
   display: flex;
   gap: 0.5rem;
@@ -107,6 +118,8 @@ const ManageAppointments = () => {
   const [searchTerm, setSearchTerm] = useState('');
   const [lastUpdated, setLastUpdated] = useState(null);
   const [processingId, setProcessingId] = useState(null);
+  const [selectedIds, setSelectedIds] = useState([]);
+  const [bulkProcessing, setBulkProcessing] = useState(false);
 
   useEffect(() => {
     fetchAppointments();
@@ -199,6 +212,47 @@ const ManageAppointments = () => {
     }
   };
 
+  const toggleSelected = (id) => {
+    setSelectedIds(prev => prev.includes(id) ? prev.filter(selected => selected !== id) : [...prev, id]);
+  };
+
+  const allVisibleSelected = filteredAppointments.length > 0 &&
+    filteredAppointments.every(apt => selectedIds.includes(apt.id));
+
+  const toggleAllVisible = () => {
+    const visibleIds = filteredAppointments.map(apt => apt.id);
+    setSelectedIds(prev => allVisibleSelected
+      ? prev.filter(id => !visibleIds.includes(id))
+      : [...new Set([...prev, ...visibleIds])]);
+  };
+
+  // One request for the whole selection; the server reports a result per appointment
+  const bulkUpdateStatus = async (status) => {
+    if (!window.confirm(`Mark ${selectedIds.length} appointment(s) as "${status}"?`)) {
+      return;
+    }
+    setBulkProcessing(true);
+    try {
+      const updateData = { ids: selectedIds, status };
+      if (status === 'completed') {
+        updateData.payment_status = 'completed';
+      }
+      const response = await api.post('/appointments/bulk-update/', updateData);
+      const skipped = response.data.results.filter(result => result.result !== 'updated');
+      setSelectedIds([]);
+      await fetchAppointments();
+      alert(
+        `${response.data.updated} appointment(s) updated to "${status}".` +
+        (skipped.length ? ` ${skipped.length} skipped (already ${status}, not found or not allowed from their current status).` : '')
+      );
+    } catch (error) {
+      console.error('Error bulk updating appointments:', error);
+      alert(`Failed to update appointments: ${error.response?.data?.detail || error.message}`);
+    } finally {
+      setBulkProcessing(false);
+    }
+  };
+
   const deleteAppointment = async (id) => {
     if (window.confirm('Are you sure you want to delete this appointment? This action cannot be undone.')) {
       setProcessingId(id);
@@ -269,6 +323,24 @@ const ManageAppointments = () => {
         />
       </Filters>
 
+      {selectedIds.length > 0 && (
+        <BulkBar>
+          <span>{selectedIds.length} selected</span>
+          <ActionButton variant="confirm" onClick={() => bulkUpdateStatus('confirmed')} disabled={bulkProcessing}>
+            Confirm
+          </ActionButton>
+          <ActionButton onClick={() => bulkUpdateStatus('completed')} disabled={bulkProcessing}>
+            Complete
+          </ActionButton>
+          <ActionButton variant="cancel" onClick={() => bulkUpdateStatus('cancelled')} disabled={bulkProcessing}>
+            Cancel
+          </ActionButton>
+          <SecondaryButton onClick={() => setSelectedIds([])} disabled={bulkProcessing}>
+            Clear
+          </SecondaryButton>
+        </BulkBar>
+      )}
+
       {filteredAppointments.length === 0 ? (
         <EmptyState>
           <p>No appointments found</p>
@@ -277,6 +349,9 @@ const ManageAppointments = () => {
         <Table>
           <thead>
             <tr>
+              <th>
+                <input type="checkbox" checked={allVisibleSelected} onChange={toggleAllVisible} />
+              </th>
               <th>Date & Time</th>
               <th>Client</th>
               <th>Service</th>
@@ -289,6 +364,13 @@ const ManageAppointments = () => {
           <tbody>
             {filteredAppointments.map(appointment => (
               <tr key={appointment.id}>
+                <td>
+                  <input
+                    type="checkbox"
+                    checked={selectedIds.includes(appointment.id)}
+                    onChange={() => toggleSelected(appointment.id)}
+                  />
+                </td>
                 <td>
                   {new Date(appointment.appointment_date).toLocaleDateString()}<br />
                   <small>{appointment.appointment_time}</small>
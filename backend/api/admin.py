@@ -1,6 +1,16 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import Service, GalleryImage, Appointment, Review, ContactMessage, User, Transaction
+from django.db import IntegrityError, connections
+from django.db.models import Q
+from django.http import HttpResponseRedirect
+from .models import (
+    Service, GalleryImage, Appointment, Review, ContactMessage, User, Transaction, MpesaCallback,
+    TRANSACTION_SEARCH_FIELDS,
+)
+from .availability import availability, booking_overlaps
+from .constraints import SLOT_TAKEN_MESSAGE, is_booking_conflict
+from .search import contains_any
 
 
 @admin.register(User)
@@ -27,21 +37,66 @@ class ServiceAdmin(admin.ModelAdmin):
 class GalleryImageAdmin(admin.ModelAdmin):
     list_display = ['title', 'service', 'is_featured', 'created_at']
     list_filter = ['is_featured', 'service']
+    list_select_related = ['service']
     search_fields = ['title', 'description']
 
 
+class AppointmentAdminForm(forms.ModelForm):
+    class Meta:
+        model = Appointment
+        fields = '__all__'
+
+    def clean(self):
+        # duration is not a form field, so model validation skips the
+        # exclusion constraint; check for an overlap here instead of
+        # letting the INSERT/UPDATE fail
+        cleaned_data = super().clean()
+        service = cleaned_data.get('service')
+        appointment_date = cleaned_data.get('appointment_date')
+        appointment_time = cleaned_data.get('appointment_time')
+        if not (service and appointment_date and appointment_time) or cleaned_data.get('status') == 'cancelled':
+            return cleaned_data
+        if self.instance.pk and 'service' not in self.changed_data:
+            duration = self.instance.duration
+        else:
+            duration = service.duration
+        if booking_overlaps(appointment_date, appointment_time, duration, exclude_id=self.instance.pk):
+            raise forms.ValidationError(SLOT_TAKEN_MESSAGE)
+        return cleaned_data
+
+
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
+    form = AppointmentAdminForm
     list_display = ['customer_name', 'service', 'appointment_date', 'appointment_time', 'status', 'created_at']
     list_filter = ['status', 'appointment_date']
+    list_select_related = ['service']
     search_fields = ['customer_name', 'customer_email', 'customer_phone']
     date_hierarchy = 'appointment_date'
+    readonly_fields = ['duration']
+
+    def save_model(self, request, obj, form, change):
+        if 'service' in form.changed_data:
+            obj.duration = obj.service.duration
+        super().save_model(request, obj, form, change)
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except IntegrityError as e:
+            # Booked by someone else between the form check and the save
+            if not is_booking_conflict(e):
+                raise
+            availability.invalidate()
+            self.message_user(request, SLOT_TAKEN_MESSAGE, messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
 
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ['customer_name', 'rating', 'service', 'is_approved', 'created_at']
     list_filter = ['is_approved', 'rating']
+    list_select_related = ['service']
     search_fields = ['customer_name', 'comment']
     actions = ['approve_reviews']
 
@@ -66,6 +121,7 @@ class ContactMessageAdmin(admin.ModelAdmin):
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'mpesa_transaction_id', 'amount', 'status', 'phone_number', 'initiated_at', 'completed_at']
     list_filter = ['status', 'initiated_at', 'completed_at']
+    list_select_related = ['user']
     search_fields = ['user__username', 'user__email', 'mpesa_transaction_id', 'phone_number', 'account_reference']
     readonly_fields = ['initiated_at', 'completed_at']
     date_hierarchy = 'initiated_at'
@@ -83,3 +139,22 @@ class TransactionAdmin(admin.ModelAdmin):
             'fields': ('initiated_at', 'completed_at')
         }),
     )
+
+    def get_search_results(self, request, queryset, search_term):
+        # The default OR across user__ fields joins api_user into every
+        # condition, so neither trigram index can be used. Match the user
+        # columns in a subquery instead; each side then hits its own index.
+        if not search_term or connections[queryset.db].vendor != 'postgresql':
+            return super().get_search_results(request, queryset, search_term)
+        for term in search_term.split():
+            users = User.objects.filter(contains_any(['username', 'email'], term)).values('id')
+            queryset = queryset.filter(contains_any(TRANSACTION_SEARCH_FIELDS, term) | Q(user_id__in=users))
+        return queryset, False
+
+
+@admin.register(MpesaCallback)
+class MpesaCallbackAdmin(admin.ModelAdmin):
+    list_display = ['id', 'checkout_request_id', 'received_at', 'processed_at', 'attempts']
+    list_filter = ['processed_at']
+    search_fields = ['checkout_request_id']
+    readonly_fields = ['checkout_request_id', 'payload', 'received_at', 'processed_at', 'attempts', 'last_error']
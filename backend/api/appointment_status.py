@@ -0,0 +1,114 @@
+"""
+Bulk appointment status transitions.
+
+``bulk_update_status`` moves many appointments to one status with a fixed
+number of statements however many IDs are sent: one locking SELECT, one
+UPDATE, one bulk_create for the customers' notifications (one per customer,
+listing all of their appointments that changed) and a grouped unread-counter
+update. Per-row save() and serializer validation are skipped;
+status changes cannot create booking conflicts, and cancellations only free
+slots.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import availability
+from .models import Appointment, Notification
+from .notifications import create_notifications
+
+# Target status -> statuses it may be reached from
+STATUS_TRANSITIONS = {
+    'confirmed': ['pending'],
+    'completed': ['confirmed'],
+    'cancelled': ['pending', 'confirmed'],
+}
+
+NOTIFICATION_TEXT = {
+    'confirmed': ('Appointment Confirmed', 'Your {service} appointment on {date} at {time} has been confirmed.'),
+    'completed': ('Appointment Completed', 'Thank you for visiting! Your {service} appointment on {date} is complete.'),
+    'cancelled': ('Appointment Cancelled', 'Your {service} appointment on {date} at {time} has been cancelled.'),
+}
+
+
+# For a customer with several appointments in one bulk update
+SUMMARY_TEXT = {
+    'confirmed': 'Your {count} appointments have been confirmed: {appointments}.',
+    'completed': 'Thank you for visiting! Your {count} appointments are complete: {appointments}.',
+    'cancelled': 'Your {count} appointments have been cancelled: {appointments}.',
+}
+
+
+def status_notification(rows, new_status):
+    """One notification about all of a customer's ``rows``"""
+    title, message = NOTIFICATION_TEXT[new_status]
+    if len(rows) == 1:
+        [row] = rows
+        message = message.format(
+            service=row['service__name'],
+            date=row['appointment_date'],
+            time=row['appointment_time'].strftime('%H:%M'),
+        )
+    else:
+        appointments = '; '.join(
+            f"{row['service__name']} on {row['appointment_date']} at {row['appointment_time']:%H:%M}" for row in rows
+        )
+        message = SUMMARY_TEXT[new_status].format(count=len(rows), appointments=appointments)
+    return Notification(
+        user_id=rows[0]['user_id'],
+        title=title,
+        message=message,
+        notification_type='appointment',
+    )
+
+
+def release_slots(appointment_ids):
+    for appointment_id in appointment_ids:
+        availability.appointment_removed(appointment_id)
+
+
+def bulk_update_status(ids, new_status, payment_status=None):
+    """
+    Apply ``new_status`` to every appointment in ``ids`` it may move to.
+
+    Returns one ``{'id', 'result'}`` entry per distinct ID, in request order;
+    result is 'updated', 'unchanged', 'not_found' or 'invalid_transition'
+    (which also carries the current ``status``).
+    """
+    ids = list(dict.fromkeys(ids))
+    changes = {'status': new_status, 'updated_at': timezone.now()}
+    if payment_status:
+        changes['payment_status'] = payment_status
+
+    with transaction.atomic():
+        rows = {
+            row['id']: row
+            for row in Appointment.objects.select_for_update(of=('self',)).filter(id__in=ids).order_by().values(
+                'id', 'status', 'user_id', 'appointment_date', 'appointment_time', 'service__name'
+            )
+        }
+        allowed = STATUS_TRANSITIONS[new_status]
+        to_update = [pk for pk in ids if pk in rows and rows[pk]['status'] in allowed]
+        if to_update:
+            Appointment.objects.filter(id__in=to_update).update(**changes)
+            by_user = defaultdict(list)
+            for pk in to_update:
+                if rows[pk]['user_id']:
+                    by_user[rows[pk]['user_id']].append(rows[pk])
+            create_notifications([status_notification(user_rows, new_status) for user_rows in by_user.values()])
+            if new_status == 'cancelled':
+                transaction.on_commit(lambda: release_slots(to_update))
+
+    updated = set(to_update)
+    results = []
+    for pk in ids:
+        if pk in updated:
+            results.append({'id': pk, 'result': 'updated'})
+        elif pk not in rows:
+            results.append({'id': pk, 'result': 'not_found'})
+        elif rows[pk]['status'] == new_status:
+            results.append({'id': pk, 'result': 'unchanged'})
+        else:
+            results.append({'id': pk, 'result': 'invalid_transition', 'status': rows[pk]['status']})
+    return results
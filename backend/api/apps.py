@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .callback_queue import serving_requests, start_consumer
+
+        if serving_requests():
+            # Drain callbacks left over from before a restart without waiting for a new one
+            start_consumer()
@@ -0,0 +1,193 @@
+"""
+In-process availability engine for appointment slots.
+
+Booked appointments are kept per day as intervals sorted by start minute, so
+conflict checks are a binary search and slot listing is a single sweep with no
+database query. Days are loaded lazily, updated incrementally from model
+signals and reloaded after AVAILABILITY_CACHE_TTL seconds so changes made by
+other worker processes are picked up. At most AVAILABILITY_CACHE_MAX_DAYS days
+are kept; the least recently used one is dropped first.
+
+The index is a fast answer for slot listings and a pre-check, never the final
+word on a booking: it can be up to a TTL behind other workers.
+``booking_overlaps`` asks the database.
+"""
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import time as dt_time, timedelta
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Appointment
+
+
+def to_minutes(value):
+    """Minutes since midnight for a datetime.time or 'HH:MM' string"""
+    if isinstance(value, str):
+        hours, minutes = value.split(':')[:2]
+        return int(hours) * 60 + int(minutes)
+    return value.hour * 60 + value.minute
+
+
+def format_minutes(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def booking_window():
+    """(first, last) dates that can be booked: today to BOOKING_WINDOW_DAYS ahead"""
+    today = timezone.localdate()
+    return today, today + timedelta(days=getattr(settings, 'BOOKING_WINDOW_DAYS', 90))
+
+
+def in_booking_window(date):
+    first, last = booking_window()
+    return first <= date <= last
+
+
+def booking_overlaps(date, start_time, duration, exclude_id=None):
+    """True if a live appointment in the database overlaps [start, start + duration) on ``date``"""
+    start = to_minutes(start_time)
+    end = start + duration
+    rows = Appointment.objects.filter(appointment_date=date).exclude(status='cancelled')
+    if exclude_id is not None:
+        rows = rows.exclude(pk=exclude_id)
+    if end < 24 * 60:
+        # Later bookings cannot overlap; earlier ones are checked against their own length
+        rows = rows.filter(appointment_time__lt=dt_time(end // 60, end % 60))
+    rows = rows.values_list('appointment_time', 'duration')
+    return any(to_minutes(other_time) + other_duration > start for other_time, other_duration in rows)
+
+
+class DaySchedule:
+    """Booked (start, end) minute intervals for one day, sorted by start"""
+
+    def __init__(self):
+        self.loaded_at = time.monotonic()
+        self._intervals = []
+        self._by_id = {}
+        self._longest = 0
+
+    def add(self, appointment_id, start, end):
+        self.remove(appointment_id)
+        interval = (start, end, appointment_id)
+        insort(self._intervals, interval)
+        self._by_id[appointment_id] = interval
+        self._longest = max(self._longest, end - start)
+
+    def remove(self, appointment_id):
+        interval = self._by_id.pop(appointment_id, None)
+        if interval is not None:
+            index = bisect_left(self._intervals, interval)
+            del self._intervals[index]
+
+    def conflicts(self, start, end, exclude_id=None):
+        """True if [start, end) overlaps a booking other than exclude_id"""
+        # Only intervals starting in (start - longest, end) can overlap
+        lo = bisect_left(self._intervals, (start - self._longest,))
+        hi = bisect_left(self._intervals, (end,))
+        for other_start, other_end, appointment_id in self._intervals[lo:hi]:
+            if appointment_id != exclude_id and other_end > start and other_start < end:
+                return True
+        return False
+
+    def free_slots(self, duration, opening, closing, step):
+        """Start minutes of every free slot of ``duration`` within opening hours"""
+        slots = []
+        candidate = opening
+        for booked_start, booked_end, _ in self._intervals:
+            while candidate + duration <= min(booked_start, closing):
+                slots.append(candidate)
+                candidate += step
+            if booked_end > candidate:
+                # Jump past the booking, staying on the slot grid
+                candidate += -(-(booked_end - candidate) // step) * step
+        while candidate + duration <= closing:
+            slots.append(candidate)
+            candidate += step
+        return slots
+
+
+class AvailabilityIndex:
+    """Per-process LRU map of date -> DaySchedule"""
+
+    def __init__(self):
+        self._days = OrderedDict()
+        self._dates_by_id = {}
+        self._lock = threading.RLock()
+
+    def _load(self, date):
+        schedule = DaySchedule()
+        rows = (
+            Appointment.objects.filter(appointment_date=date)
+            .exclude(status='cancelled')
+            .values_list('id', 'appointment_time', 'duration')
+        )
+        for appointment_id, start_time, duration in rows:
+            start = to_minutes(start_time)
+            schedule.add(appointment_id, start, start + duration)
+            self._dates_by_id[appointment_id] = date
+        return schedule
+
+    def _forget(self, date):
+        schedule = self._days.pop(date, None)
+        if schedule is not None:
+            for appointment_id in schedule._by_id:
+                if self._dates_by_id.get(appointment_id) == date:
+                    del self._dates_by_id[appointment_id]
+
+    def day(self, date):
+        ttl = getattr(settings, 'AVAILABILITY_CACHE_TTL', 30)
+        with self._lock:
+            schedule = self._days.get(date)
+            if schedule is None or time.monotonic() - schedule.loaded_at > ttl:
+                self._forget(date)
+                schedule = self._days[date] = self._load(date)
+                max_days = getattr(settings, 'AVAILABILITY_CACHE_MAX_DAYS', 120)
+                while len(self._days) > max_days:
+                    self._forget(next(iter(self._days)))
+            else:
+                self._days.move_to_end(date)
+            return schedule
+
+    def is_available(self, date, start_time, duration, exclude_id=None):
+        start = to_minutes(start_time)
+        with self._lock:
+            return not self.day(date).conflicts(start, start + duration, exclude_id)
+
+    def free_slots(self, date, duration):
+        opening = to_minutes(getattr(settings, 'BOOKING_OPENING_TIME', '09:00'))
+        closing = to_minutes(getattr(settings, 'BOOKING_CLOSING_TIME', '19:00'))
+        step = getattr(settings, 'BOOKING_SLOT_INTERVAL', 30)
+        with self._lock:
+            minutes = self.day(date).free_slots(duration, opening, closing, step)
+        return [format_minutes(minute) for minute in minutes]
+
+    def appointment_changed(self, appointment):
+        """Apply a created/updated appointment to any loaded day"""
+        with self._lock:
+            self.appointment_removed(appointment.pk)
+            schedule = self._days.get(appointment.appointment_date)
+            if schedule is None or appointment.status == 'cancelled':
+                return
+            start = to_minutes(appointment.appointment_time)
+            schedule.add(appointment.pk, start, start + appointment.duration)
+            self._dates_by_id[appointment.pk] = appointment.appointment_date
+
+    def appointment_removed(self, appointment_id):
+        with self._lock:
+            date = self._dates_by_id.pop(appointment_id, None)
+            if date in self._days:
+                self._days[date].remove(appointment_id)
+
+    def invalidate(self, dates=None):
+        """Forget loaded days so they are rebuilt from the database"""
+        with self._lock:
+            for date in (list(self._days) if dates is None else dates):
+                self._forget(date)
+
+
+availability = AvailabilityIndex()
+
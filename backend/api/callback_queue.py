@@ -0,0 +1,195 @@
+"""
+Write-ahead queue for M-Pesa callbacks.
+
+The callback endpoint only inserts the raw payload into MpesaCallback and
+acknowledges Safaricom. Rows are drained in batches by a consumer, either the
+in-process thread started here or the ``process_mpesa_callbacks`` management
+command, so a crash mid-processing never loses a payment. The thread starts
+with each web process (ApiConfig.ready), so rows left behind by a crash or
+restart are picked up within one poll interval, not when the next callback
+arrives. A callback that fails, including one whose CheckoutRequestID is not
+recorded yet, is retried after an exponential backoff
+(MPESA_CALLBACK_RETRY_BACKOFF seconds, doubled per attempt) rather than on
+the next batch.
+"""
+import logging
+import os
+import sys
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Avg, F, Min, Q
+from django.utils import timezone
+
+from .models import MpesaCallback
+from .payments import UnknownCheckoutRequest, apply_stk_callback
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_callback(callback_data):
+    """Persist a raw callback with a single INSERT and schedule processing"""
+    stk_callback = callback_data.get('Body', {}).get('stkCallback', {})
+    entry = MpesaCallback.objects.create(
+        checkout_request_id=str(stk_callback.get('CheckoutRequestID', ''))[:100],
+        payload=callback_data,
+    )
+    transaction.on_commit(wake_consumer)
+    return entry
+
+
+def retry_delay(attempts):
+    """Backoff before the next try of a callback that has failed ``attempts`` times"""
+    base = getattr(settings, 'MPESA_CALLBACK_RETRY_BACKOFF', 10)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def process_pending_callbacks(batch_size=None):
+    """
+    Process one batch of queued callbacks that are due.
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED so several
+    consumers can drain the queue concurrently. Each callback runs in its own
+    savepoint; a failing callback is put back with ``next_attempt_at`` set by
+    ``retry_delay`` until MPESA_CALLBACK_MAX_ATTEMPTS is reached.
+
+    Returns:
+        tuple: (callbacks applied, callbacks that failed this attempt)
+    """
+    batch_size = batch_size or getattr(settings, 'MPESA_CALLBACK_BATCH_SIZE', 50)
+    max_attempts = getattr(settings, 'MPESA_CALLBACK_MAX_ATTEMPTS', 5)
+    now = timezone.now()
+    applied = failed = 0
+
+    with transaction.atomic():
+        batch = list(
+            MpesaCallback.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True)
+            .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+            .order_by('received_at', 'id')[:batch_size]
+        )
+        for entry in batch:
+            entry.attempts += 1
+            try:
+                with transaction.atomic():
+                    apply_stk_callback(entry.payload)
+            except Exception as e:
+                if isinstance(e, UnknownCheckoutRequest):
+                    # Usually the STK push has not committed its CheckoutRequestID yet
+                    logger.warning(f"M-Pesa callback {entry.id} is for an unknown CheckoutRequestID, will retry: {e}")
+                else:
+                    logger.exception(f"Error processing M-Pesa callback {entry.id} ({entry.checkout_request_id})")
+                failed += 1
+                entry.last_error = str(e)
+                if entry.attempts >= max_attempts:
+                    logger.error(f"Giving up on M-Pesa callback {entry.id} after {entry.attempts} attempts")
+                    entry.processed_at = timezone.now()
+                else:
+                    entry.next_attempt_at = timezone.now() + retry_delay(entry.attempts)
+            else:
+                applied += 1
+                entry.last_error = ''
+                entry.processed_at = timezone.now()
+            entry.save(update_fields=['attempts', 'last_error', 'processed_at', 'next_attempt_at'])
+
+    if batch:
+        logger.info(f"Processed {len(batch)} M-Pesa callback(s): {applied} applied, {failed} failed")
+    return applied, failed
+
+
+def drain_callbacks():
+    """
+    Process batches until none is due; returns the number applied.
+
+    Stops after a batch in which nothing succeeded, so a failing dependency
+    (e.g. the database rejecting every write) waits for the next poll instead
+    of spinning through the retry budget.
+    """
+    total = 0
+    while True:
+        applied, _ = process_pending_callbacks()
+        total += applied
+        if not applied:
+            return total
+
+
+def queue_stats():
+    """Queue depth and processing lag, for monitoring"""
+    now = timezone.now()
+    pending = MpesaCallback.objects.filter(processed_at__isnull=True).aggregate(
+        oldest=Min('received_at')
+    )
+    recent_ids = MpesaCallback.objects.filter(processed_at__isnull=False).order_by('-processed_at').values('id')[:100]
+    recent = MpesaCallback.objects.filter(id__in=recent_ids).aggregate(
+        lag=Avg(F('processed_at') - F('received_at'))
+    )
+    return {
+        'depth': MpesaCallback.objects.filter(processed_at__isnull=True).count(),
+        'oldest_pending_age_seconds': (now - pending['oldest']).total_seconds() if pending['oldest'] else 0,
+        'recent_processing_lag_seconds': recent['lag'].total_seconds() if recent['lag'] else 0,
+        'failed': MpesaCallback.objects.filter(processed_at__isnull=False).exclude(last_error='').count(),
+    }
+
+
+class CallbackConsumer(threading.Thread):
+    """Background thread that drains the callback queue in this process"""
+
+    def __init__(self):
+        super().__init__(name='mpesa-callback-consumer', daemon=True)
+        self._wakeup = threading.Event()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def run(self):
+        poll_interval = getattr(settings, 'MPESA_CALLBACK_POLL_INTERVAL', 5)
+        while True:
+            # The timed wait also picks up rows that are due for a retry
+            self._wakeup.wait(timeout=poll_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                drain_callbacks()
+            except Exception:
+                logger.exception("M-Pesa callback consumer failed to drain the queue")
+            finally:
+                close_old_connections()
+
+
+_consumer = None
+_consumer_pid = None
+_consumer_lock = threading.Lock()
+
+
+def serving_requests(argv=None):
+    """
+    False for management commands (migrate, test, shell, ...) other than
+    runserver; True under gunicorn, uvicorn and other servers.
+    """
+    argv = sys.argv if argv is None else argv
+    if not argv or os.path.basename(argv[0]) not in ('manage.py', 'django-admin'):
+        return True
+    return len(argv) > 1 and argv[1] == 'runserver'
+
+
+def start_consumer():
+    """Start the in-process consumer once per process; returns it, or None if disabled"""
+    global _consumer, _consumer_pid
+    if getattr(settings, 'MPESA_CALLBACK_CONSUMER', 'thread') != 'thread':
+        return None
+    pid = os.getpid()
+    with _consumer_lock:
+        if _consumer is None or _consumer_pid != pid:
+            _consumer = CallbackConsumer()
+            _consumer_pid = pid
+            _consumer.start()
+    return _consumer
+
+
+def wake_consumer():
+    """Start (if needed) and wake the in-process consumer"""
+    consumer = start_consumer()
+    if consumer is not None:
+        consumer.wake()
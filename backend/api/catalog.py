@@ -1,21 +1,15 @@
 """
-Script to populate the database with service categories and services
-Run with: python manage.py shell < populate_services.py
-"""
-import os
-import django
-
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'verdelle_nails.settings')
-django.setup()
+The salon's real service menu and showcase gallery.
 
-from api.models import ServiceCategory, Service
+``ensure_catalog()`` upserts these rows by name so it is safe to run on every
+deploy: existing categories and services are updated in place rather than
+deleted (deleting a Service cascades to its appointments).
+"""
+from django.db import transaction
 
-# Clear existing data
-Service.objects.all().delete()
-ServiceCategory.objects.all().delete()
+from .models import Service, ServiceCategory
 
-# Service categories and their services
-categories_data = [
+CATALOG = [
     {
         'name': 'Manicure Services',
         'description': 'Complete hand and nail care treatments designed to pamper and beautify your hands',
@@ -116,20 +110,34 @@ categories_data = [
     },
 ]
 
-print("Creating service categories and services...")
+GALLERY = [
+    {'title': 'French Manicure Elegance', 'description': 'Classic French manicure with a modern twist', 'is_featured': True},
+    {'title': 'Glitter Ombre Nails', 'description': 'Beautiful gradient effect with gold glitter accents', 'is_featured': True},
+    {'title': 'Floral Nail Art', 'description': 'Hand-painted delicate flowers on nude base', 'is_featured': True},
+    {'title': 'Geometric Design', 'description': 'Modern geometric patterns in pastel colors', 'is_featured': False},
+    {'title': 'Chrome Mirror Finish', 'description': 'Stunning chrome mirror effect in silver', 'is_featured': True},
+    {'title': 'Matte Black Stiletto', 'description': 'Bold matte black stiletto nails with gold accent', 'is_featured': False},
+    {'title': 'Pastel Rainbow', 'description': 'Soft pastel rainbow ombre design', 'is_featured': False},
+    {'title': 'Marble Effect Nails', 'description': 'Elegant white marble effect with gold veins', 'is_featured': True},
+    {'title': 'Red Velvet Luxury', 'description': 'Deep red velvet finish with crystal accents', 'is_featured': False},
+    {'title': 'Tropical Paradise', 'description': 'Vibrant tropical designs with palm leaves', 'is_featured': False},
+    {'title': 'Nude Minimalist', 'description': 'Simple nude nails with delicate line art', 'is_featured': False},
+    {'title': 'Holographic Magic', 'description': 'Holographic powder creating rainbow effect', 'is_featured': True},
+]
 
-for cat_data in categories_data:
-    # Create category
-    services_data = cat_data.pop('services')
-    category = ServiceCategory.objects.create(**cat_data)
-    print(f"\nCreated category: {category.name}")
-    
-    # Create services for this category
-    for idx, service_data in enumerate(services_data):
-        service_data['category'] = category
-        service_data['display_order'] = idx + 1
-        service = Service.objects.create(**service_data)
-        print(f"  - Created service: {service.name} (${service.price})")
 
-print(f"\n✓ Successfully created {ServiceCategory.objects.count()} categories")
-print(f"✓ Successfully created {Service.objects.count()} services")
+@transaction.atomic
+def ensure_catalog():
+    """Create or update the catalog; returns (categories, services) touched"""
+    category_count = service_count = 0
+    for category_data in CATALOG:
+        category_fields = {key: value for key, value in category_data.items() if key != 'services'}
+        category, _ = ServiceCategory.objects.update_or_create(
+            name=category_fields.pop('name'), defaults=category_fields
+        )
+        category_count += 1
+        for index, service_data in enumerate(category_data['services'], start=1):
+            service_fields = dict(service_data, category=category, display_order=index)
+            Service.objects.update_or_create(name=service_fields.pop('name'), defaults=service_fields)
+            service_count += 1
+    return category_count, service_count
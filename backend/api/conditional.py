@@ -0,0 +1,101 @@
+"""
+Conditional GET for the public catalog endpoints.
+
+Each resource family (services, service categories, gallery, reviews) has a
+version stamp in the shared cache. Model signals replace the stamp after a
+change commits, and the ETag of a response is a hash of the stamps its
+serializer reads plus everything else that shapes the body (URL, host,
+Accept). ``ConditionalGetMixin`` computes that ETag from the cache alone, so
+a matching If-None-Match is answered with 304 before the view runs a query.
+
+Writes that bypass signals (queryset.update(), bulk_create(), raw SQL) must
+call ``bump_versions`` themselves.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+VERSION_KEY = 'catalog:version:{}'
+
+# Families whose serialized output includes each model's fields
+FAMILIES_BY_MODEL = {
+    'Service': ['services', 'service-categories', 'gallery', 'reviews'],
+    'ServiceCategory': ['services', 'service-categories'],
+    'GalleryImage': ['gallery'],
+    # Reviews also move the rating columns serialized with each service
+    'Review': ['reviews', 'services', 'service-categories'],
+}
+
+
+def current_versions(families):
+    keys = [VERSION_KEY.format(family) for family in families]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # First read after a cache flush: whoever adds first wins
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_families(families):
+    cache.set_many({VERSION_KEY.format(family): uuid.uuid4().hex for family in families}, None)
+
+
+def bump_versions(model):
+    """Invalidate the ETags of every family that serializes ``model``, once the transaction commits"""
+    families = FAMILIES_BY_MODEL.get(model.__name__)
+    if families:
+        transaction.on_commit(lambda: bump_families(families))
+
+
+def wants_html(request):
+    """The browsable API embeds the user and a CSRF token, so it is never tagged"""
+    if request.GET.get('format') == 'api':
+        return True
+    accept = request.headers.get('Accept', '')
+    return 'text/html' in accept and 'application/json' not in accept
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETags and Cache-Control for read-only requests on a viewset.
+
+    ``etag_families`` lists the families the serializer reads; ``cache_max_age``
+    is the freshness lifetime given to anonymous clients. Requests carrying
+    credentials get ``private, no-cache`` so staff see their edits at once,
+    still revalidating with the ETag.
+    """
+    etag_families = ()
+    cache_max_age = 60
+
+    def get_etag(self, request):
+        if request.method not in ('GET', 'HEAD') or not self.etag_families or wants_html(request):
+            return None
+        parts = [*current_versions(self.etag_families), request.build_absolute_uri(), request.headers.get('Accept', '')]
+        return '"{}"'.format(hashlib.sha1('\n'.join(parts).encode()).hexdigest())
+
+    def add_cache_headers(self, request, response, etag):
+        response['ETag'] = etag
+        # Checked by presence only: resolving the user would cost a query
+        if 'Authorization' in request.headers or settings.SESSION_COOKIE_NAME in request.COOKIES:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=self.cache_max_age)
+        patch_vary_headers(response, ['Accept', 'Authorization'])
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag is not None:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return self.add_cache_headers(request, not_modified, etag)
+        response = super().dispatch(request, *args, **kwargs)
+        if etag is not None and response.status_code == 200:
+            self.add_cache_headers(request, response, etag)
+        return response
@@ -0,0 +1,97 @@
+"""
+Database-enforced booking exclusion.
+
+Two live appointments may not overlap. Checking that in Python and then
+inserting leaves a window in which concurrent bookings of one slot both pass,
+so on PostgreSQL an exclusion constraint does it instead:
+
+    EXCLUDE USING gist (appointment_date WITH =,
+                        tsrange(date + time, date + time + duration) WITH &&)
+    WHERE status <> 'cancelled'
+
+``duration`` is the service's length copied onto the appointment when it is
+booked (a constraint cannot join services). The ``=`` on the date needs the
+``btree_gist`` extension. A booking is then one INSERT; a violation surfaces
+as an IntegrityError that ``is_booking_conflict`` recognises.
+
+Other backends (SQLite in development) skip the constraint
+(``PostgresExclusionConstraint``); there, and on PostgreSQL before the
+migration that adds it, the serializer checks the database for an overlap
+(``availability.booking_overlaps``) before writing.
+"""
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import DateTimeField, DurationField, F, Func, Q
+
+BOOKING_EXCLUSION_CONSTRAINT = 'appt_no_overlap'
+SLOT_TAKEN_MESSAGE = 'This time slot is already booked.'
+
+
+class PostgresExclusionConstraint(ExclusionConstraint):
+    """ExclusionConstraint that other backends silently skip, like PostgresGinIndex"""
+
+    def constraint_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().constraint_sql(model, schema_editor)
+
+    def create_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().create_sql(model, schema_editor)
+
+    def remove_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().remove_sql(model, schema_editor)
+
+    def validate(self, model, instance, exclude=None, using=DEFAULT_DB_ALIAS):
+        if connections[using].vendor != 'postgresql':
+            return
+        super().validate(model, instance, exclude=exclude, using=using)
+
+
+def booking_range():
+    """tsrange covering [start, start + duration) of an appointment"""
+    start = Func(
+        F('appointment_date'), F('appointment_time'),
+        template='(%(expressions)s)', arg_joiner=' + ', output_field=DateTimeField(),
+    )
+    length = Func(F('duration'), template='make_interval(mins => %(expressions)s)', output_field=DurationField())
+    end = Func(start, length, template='(%(expressions)s)', arg_joiner=' + ', output_field=DateTimeField())
+    return Func(start, end, function='TSRANGE', output_field=DateTimeRangeField())
+
+
+def booking_exclusion():
+    return PostgresExclusionConstraint(
+        name=BOOKING_EXCLUSION_CONSTRAINT,
+        expressions=[
+            ('appointment_date', RangeOperators.EQUAL),
+            (booking_range(), RangeOperators.OVERLAPS),
+        ],
+        condition=~Q(status='cancelled'),
+        violation_error_message=SLOT_TAKEN_MESSAGE,
+    )
+
+
+_installed = set()
+
+
+def booking_exclusion_enforced(using=DEFAULT_DB_ALIAS):
+    """True once the constraint exists: PostgreSQL with migration 0019 applied"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    if using not in _installed:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM pg_constraint WHERE conname = %s', [BOOKING_EXCLUSION_CONSTRAINT])
+            if cursor.fetchone() is None:
+                return False
+        _installed.add(using)
+    return True
+
+
+def is_booking_conflict(error):
+    """True if an IntegrityError was raised by the booking exclusion constraint"""
+    return BOOKING_EXCLUSION_CONSTRAINT in str(error)
@@ -0,0 +1,69 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedDispatcher:
+    """
+    Thread pool with a bounded backlog for work that must not run in the
+    request thread (e.g. Daraja calls).
+
+    ``submit`` never blocks: once ``max_workers + max_pending`` jobs are in
+    flight it returns False so the caller can shed load instead of queueing
+    without limit.
+    """
+
+    def __init__(self, name, max_workers, max_pending):
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            logger.warning(f"{self.name} dispatcher is saturated, rejecting job {fn.__name__}")
+            return False
+        try:
+            self._executor.submit(self._run, fn, *args, **kwargs)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        return True
+
+    def _run(self, fn, *args, **kwargs):
+        close_old_connections()
+        try:
+            fn(*args, **kwargs)
+        except Exception:
+            logger.exception(f"Unhandled error in {self.name} job {fn.__name__}")
+        finally:
+            close_old_connections()
+            self._slots.release()
+
+
+_dispatchers = {}
+_dispatchers_pid = None
+_dispatchers_lock = threading.Lock()
+
+
+def get_dispatcher(name='mpesa'):
+    """Return the named dispatcher for this worker process"""
+    global _dispatchers, _dispatchers_pid
+    pid = os.getpid()
+    with _dispatchers_lock:
+        if _dispatchers_pid != pid:
+            # Threads do not survive a fork; start fresh pools in each worker
+            _dispatchers = {}
+            _dispatchers_pid = pid
+        if name not in _dispatchers:
+            _dispatchers[name] = BoundedDispatcher(
+                name,
+                max_workers=getattr(settings, 'MPESA_DISPATCH_WORKERS', 4),
+                max_pending=getattr(settings, 'MPESA_DISPATCH_MAX_PENDING', 32),
+            )
+        return _dispatchers[name]
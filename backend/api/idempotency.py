@@ -0,0 +1,137 @@
+"""
+Idempotent payment initiation.
+
+A double tap or a client retry must not send a second STK push. Two keys
+guard ``initiate_payment``:
+
+- Explicit: an ``Idempotency-Key`` request header. The first response for
+  the key (anything but a 5xx) is cached for ``PAYMENT_IDEMPOTENCY_TTL``
+  seconds and replayed to every retry carrying it. Reusing a key for a
+  different appointment or phone number is rejected with 422.
+- Implicit: the appointment itself. One request per appointment may talk to
+  Daraja at a time (a ``cache.add`` lock); concurrent ones are told the push
+  is on its way. The last successful response is replayed to keyless
+  retries for as long as the appointment still shows that push in flight, so
+  a customer can try again once a push was cancelled or failed. A push stuck
+  'initiating' for ``MPESA_INITIATING_TIMEOUT`` seconds is not in flight: its
+  job was lost and the next request starts a new one.
+
+Replays and in-flight duplicates are counted in
+``verdelle_payment_duplicate_requests_total``.
+"""
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from rest_framework import status
+
+from .metrics import payment_duplicate_requests
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+IN_FLIGHT_STATUSES = ('initiating', 'initiated')
+
+
+def _digest(value):
+    return hashlib.sha256(str(value).encode()).hexdigest()[:32]
+
+
+def response_cache_key(appointment_id, key=None):
+    """Cache key of the stored response; ``key=None`` is the implicit per-appointment key"""
+    scope = _digest(key) if key is not None else 'implicit'
+    return f'payment:idempotency:{appointment_id}:{scope}'
+
+
+def in_flight_cache_key(appointment_id):
+    return f'payment:in-flight:{appointment_id}'
+
+
+def fingerprint(appointment_id, phone_number):
+    return _digest(f'{appointment_id}:{phone_number}')
+
+
+def in_flight_timeout():
+    """Longest a request can hold the lock: a token refresh plus the STK push"""
+    return int(2 * (settings.MPESA_CONNECT_TIMEOUT + settings.MPESA_READ_TIMEOUT)) + 5
+
+
+def stale_initiating_cutoff():
+    """'initiating' rows last touched before this lost their background STK push job"""
+    return timezone.now() - timedelta(seconds=settings.MPESA_INITIATING_TIMEOUT)
+
+
+def is_stale_initiating(appointment):
+    return appointment.payment_status == 'initiating' and appointment.updated_at < stale_initiating_cutoff()
+
+
+async def claim(appointment_id):
+    """True if no other request for this appointment is talking to Daraja"""
+    return await cache.aadd(in_flight_cache_key(appointment_id), 1, in_flight_timeout())
+
+
+async def release(appointment_id):
+    await cache.adelete(in_flight_cache_key(appointment_id))
+
+
+def in_flight_response(appointment_id):
+    logger.info(f"Payment initiation for appointment {appointment_id} is already in flight")
+    payment_duplicate_requests.labels('in_flight').inc()
+    return JsonResponse({
+        'success': True,
+        'message': 'Payment request is already being processed. Please check your phone.',
+        'appointment_id': appointment_id,
+        'payment_status': 'initiating'
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+def _replay(appointment, entry):
+    logger.info(f"Replaying payment initiation response for appointment {appointment.id}")
+    payment_duplicate_requests.labels('replayed').inc()
+    response = HttpResponse(entry['body'], content_type='application/json', status=entry['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+async def replay_response(appointment, phone_number, key=None):
+    """The stored response this request repeats, a 422 for a misused key, or None"""
+    request_fingerprint = fingerprint(appointment.id, phone_number)
+    if key is not None:
+        entry = await cache.aget(response_cache_key(appointment.id, key))
+        if entry is None:
+            return None
+        if entry['fingerprint'] != request_fingerprint:
+            return JsonResponse(
+                {'error': f'{IDEMPOTENCY_HEADER} was already used for a different payment request'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        return _replay(appointment, entry)
+
+    if appointment.payment_status not in IN_FLIGHT_STATUSES or is_stale_initiating(appointment):
+        return None
+    entry = await cache.aget(response_cache_key(appointment.id))
+    if entry is None or entry['fingerprint'] != request_fingerprint:
+        return None
+    return _replay(appointment, entry)
+
+
+async def remember_response(appointment, phone_number, response, key=None):
+    """Store ``response`` under the explicit key and, if it succeeded, the implicit one"""
+    if response.status_code >= 500:
+        return
+    entry = {
+        'fingerprint': fingerprint(appointment.id, phone_number),
+        'status': response.status_code,
+        'body': response.content.decode(),
+    }
+    entries = {}
+    if key is not None:
+        entries[response_cache_key(appointment.id, key)] = entry
+    if response.status_code < 300:
+        entries[response_cache_key(appointment.id)] = entry
+    await cache.aset_many(entries, settings.PAYMENT_IDEMPOTENCY_TTL)
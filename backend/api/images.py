@@ -0,0 +1,182 @@
+"""
+Responsive image derivatives for gallery, service and profile images.
+
+Each upload is re-encoded at IMAGE_DERIVATIVE_WIDTHS in WebP and JPEG by a
+background process pool, never in the upload request. The pool's processes
+are spawned, not forked: forking a threaded web worker can copy a lock some
+other thread holds and deadlock the child. Derivative names are
+derived from the original storage name, so serializers can build a
+srcset-style map without touching storage:
+
+    gallery/nails.jpg -> derivatives/gallery/nails.w320.<hash>.webp
+
+Once a job finishes, the image's name is copied into the model's
+``<field>_derivatives`` column (``record_derivatives``); ``srcset_for``
+compares the two instead of asking storage whether the files exist, which
+on S3-like backends is a request per serialized row.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import posixpath
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+def derivative_widths():
+    return sorted(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', [320, 640, 1024]))
+
+
+def derivative_name(name, width, image_format):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    # Storage never reuses a name, so hashing it gives a stable content key
+    # that lets /media/ serve derivatives as immutable
+    digest = hashlib.sha1(name.encode()).hexdigest()[:10]
+    extension = FORMATS[image_format][1]
+    return posixpath.join('derivatives', directory, f'{stem}.w{width}.{digest}.{extension}')
+
+
+def has_derivatives(name):
+    """Storage check; request paths use ``derivatives_recorded`` instead"""
+    widths = derivative_widths()
+    return bool(name) and bool(widths) and default_storage.exists(derivative_name(name, widths[-1], 'jpeg'))
+
+
+def record_field(field_name):
+    return f'{field_name}_derivatives'
+
+
+def derivatives_recorded(field_file):
+    """True if the model row records finished derivatives for this exact file"""
+    record = getattr(field_file.instance, record_field(field_file.field.name), None)
+    return bool(field_file.name) and bool(derivative_widths()) and record == field_file.name
+
+
+def record_derivatives(model, field_name, name):
+    """Mark the rows still holding ``name`` as having derivatives; returns rows changed"""
+    record = record_field(field_name)
+    return model.objects.filter(**{field_name: name}).exclude(**{record: name}).update(**{record: name})
+
+
+def srcset_for(field_file, request=None):
+    """
+    Map of derivative URLs for an image field, or None until they exist.
+
+    Returns ``{'webp': {320: url, ...}, 'jpeg': {...}, 'srcset': {'webp': 'url 320w, ...'}}``
+    """
+    if not field_file or not derivatives_recorded(field_file):
+        return None
+    result = {'srcset': {}}
+    for image_format in FORMATS:
+        urls = {}
+        for width in derivative_widths():
+            url = default_storage.url(derivative_name(field_file.name, width, image_format))
+            urls[width] = request.build_absolute_uri(url) if request else url
+        result[image_format] = urls
+        result['srcset'][image_format] = ', '.join(f'{url} {width}w' for width, url in urls.items())
+    return result
+
+
+def generate_derivatives(name, force=False):
+    """Write every width/format derivative of a stored image; returns the count written"""
+    from PIL import Image, ImageOps
+
+    if not force and has_derivatives(name):
+        return 0
+    with default_storage.open(name, 'rb') as handle:
+        original = ImageOps.exif_transpose(Image.open(handle))
+        original.load()
+
+    written = 0
+    for width in derivative_widths():
+        resized = original.copy()
+        # Never upscale: small originals are re-encoded at their own width
+        resized.thumbnail((min(width, original.width), original.height * width), Image.LANCZOS)
+        for image_format, (pil_format, _) in FORMATS.items():
+            image = resized
+            if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            buffer = io.BytesIO()
+            image.save(buffer, pil_format, quality=getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80), optimize=True)
+            target = derivative_name(name, width, image_format)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+            written += 1
+    # The JPEG at the largest width is written last and marks completion
+    return written
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _generate_safely(name, force=False):
+    """Derivatives written (0 if they already existed), or None on failure"""
+    try:
+        return generate_derivatives(name, force)
+    except Exception:
+        logger.exception(f"Could not generate image derivatives for {name}")
+        return None
+
+
+def create_pool(max_workers=None):
+    return ProcessPoolExecutor(
+        max_workers=max_workers or getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    )
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def schedule_derivatives(name, on_done=None):
+    """
+    Queue derivative generation for an uploaded image on the shared pool.
+
+    ``on_done`` is called in this process once the derivatives exist
+    (written now or earlier), on a pool thread.
+    """
+    global _pool, _pool_pid
+    if not name or not getattr(settings, 'IMAGE_DERIVATIVES_ENABLED', True):
+        return
+    pid = os.getpid()
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = create_pool()
+            _pool_pid = pid
+        try:
+            future = _pool.submit(_generate_safely, name)
+        except BrokenProcessPool:
+            logger.warning("Image derivative pool died; starting a new one")
+            _pool = create_pool()
+            future = _pool.submit(_generate_safely, name)
+    if on_done is not None:
+        future.add_done_callback(lambda done: _notify_done(done, on_done))
+
+
+def _notify_done(future, on_done):
+    try:
+        if not future.cancelled() and future.result() is not None:
+            on_done()
+    except Exception:
+        logger.exception("Image derivative completion callback failed")
@@ -0,0 +1,396 @@
+import io
+import random
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from api.availability import to_minutes
+from api.catalog import GALLERY, ensure_catalog
+from api.conditional import bump_versions
+from api.notifications import reconcile_unread_counts
+from api.ratings import recompute_ratings
+from api.models import Appointment, GalleryImage, Notification, Review, Service, Transaction, User
+
+# Rows per unit of --scale; --scale 100 loads one million appointments
+USERS_PER_SCALE = 1000
+APPOINTMENTS_PER_SCALE = 10000
+
+# Share of bookings made while logged in (guests get no transactions/notifications)
+REGISTERED_BOOKING_RATE = 0.7
+# Days of bookings generated ahead of today; the rest are history
+FUTURE_DAYS = 30
+
+FIRST_NAMES = [
+    'Achieng', 'Wanjiru', 'Njeri', 'Akinyi', 'Mumbua', 'Chebet', 'Nafula', 'Amani', 'Zawadi', 'Imani',
+    'Grace', 'Faith', 'Mercy', 'Joy', 'Sharon', 'Brenda', 'Diana', 'Lucy', 'Ann', 'Esther',
+]
+LAST_NAMES = [
+    'Otieno', 'Kamau', 'Wambui', 'Mwangi', 'Odhiambo', 'Kiptoo', 'Mutua', 'Wekesa', 'Njoroge', 'Ochieng',
+    'Kariuki', 'Chege', 'Kilonzo', 'Ndungu', 'Omondi', 'Cherono', 'Kimani', 'Nyambura', 'Auma', 'Barasa',
+]
+REVIEW_COMMENTS = [
+    'Absolutely loved my nails, will be back!',
+    'Great service and very friendly staff.',
+    'My gel set lasted three weeks without chipping.',
+    'Clean salon and on time, highly recommend.',
+    'Nice result, took a little longer than expected.',
+    'The nail art was exactly what I asked for.',
+]
+
+
+def copy_value(value):
+    """Encode a Python value for COPY ... FROM STDIN (text format)"""
+    if value is None:
+        return '\\N'
+    if value is True or value is False:
+        return 't' if value else 'f'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class TableLoader:
+    """
+    Inserts model instances with explicit primary keys and timestamps.
+
+    Uses COPY on PostgreSQL and a parameterised executemany elsewhere. Model
+    save() and signals are bypassed, as with bulk_create, but auto_now fields
+    keep the values set on the instance so history looks like history.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.fields = [field for field in model._meta.concrete_fields]
+        self.table = connection.ops.quote_name(model._meta.db_table)
+        self.columns = ', '.join(connection.ops.quote_name(field.column) for field in self.fields)
+        self.count = 0
+
+    def values(self, obj):
+        for field in self.fields:
+            value = getattr(obj, field.attname)
+            if value is None and (getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)):
+                value = timezone.now()
+            elif isinstance(field, models.FileField):
+                value = value.name if value else ''
+            yield field, value
+
+    def load(self, objs):
+        if not objs:
+            return
+        if connection.vendor == 'postgresql':
+            buffer = io.StringIO()
+            for obj in objs:
+                buffer.write('\t'.join(copy_value(value) for _, value in self.values(obj)))
+                buffer.write('\n')
+            buffer.seek(0)
+            with connection.cursor() as cursor:
+                cursor.copy_expert(f'COPY {self.table} ({self.columns}) FROM STDIN', buffer)
+        else:
+            placeholders = ', '.join(['%s'] * len(self.fields))
+            rows = [
+                [field.get_db_prep_save(value, connection) for field, value in self.values(obj)]
+                for obj in objs
+            ]
+            with connection.cursor() as cursor:
+                cursor.executemany(f'INSERT INTO {self.table} ({self.columns}) VALUES ({placeholders})', rows)
+        self.count += len(objs)
+
+    def next_id(self):
+        return (self.model.objects.aggregate(models.Max('pk'))['pk__max'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a consistent synthetic dataset (users, appointments, transactions, reviews, '
+        'notifications) on top of the real service catalog. Use --catalog-only to just '
+        'create or update the service menu.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help=f'{USERS_PER_SCALE} users and {APPOINTMENTS_PER_SCALE} appointments per unit')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; each seed loads a distinct dataset')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per COPY/INSERT batch')
+        parser.add_argument('--password', default='verdelle-dataset', help='Password for every generated user')
+        parser.add_argument('--catalog-only', action='store_true', help='Only create or update the service catalog')
+        parser.add_argument('--no-gallery', action='store_true', help='Skip the placeholder gallery images')
+
+    def handle(self, *args, **options):
+        categories, services = ensure_catalog()
+        self.stdout.write(f'Catalog: {categories} categories, {services} services')
+        if options['catalog_only']:
+            return
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = f"gen{options['seed']}-"
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(f"A dataset for seed {options['seed']} is already loaded; pick another --seed")
+
+        self.services = list(Service.objects.filter(is_active=True).only('id', 'name', 'duration', 'price'))
+        if not options['no_gallery']:
+            self.create_gallery()
+
+        started = timezone.now()
+        user_ids = self.create_users(int(USERS_PER_SCALE * options['scale']), options['password'])
+        self.create_appointments(int(APPOINTMENTS_PER_SCALE * options['scale']), user_ids)
+        self.reset_sequences()
+        # Reviews and notifications were loaded without signals
+        recompute_ratings()
+        bump_versions(Review)
+        reconcile_unread_counts()
+
+        self.stdout.write('')
+        elapsed = (timezone.now() - started).total_seconds()
+        summary = ', '.join(f'{loader.count} {name}' for name, loader in self.loaders.items())
+        self.stdout.write(self.style.SUCCESS(f'Loaded {len(user_ids)} users, {summary} in {elapsed:.1f}s'))
+
+    # -- catalog extras --------------------------------------------------------
+
+    def create_gallery(self):
+        from PIL import Image
+
+        existing = set(GalleryImage.objects.values_list('title', flat=True))
+        for index, entry in enumerate(GALLERY):
+            if entry['title'] in existing:
+                continue
+            buffer = io.BytesIO()
+            color = tuple(self.rng.randrange(120, 256) for _ in range(3))
+            Image.new('RGB', (800, 800), color).save(buffer, 'JPEG', quality=80)
+            name = default_storage.save(f'gallery/placeholder_{index + 1}.jpg', ContentFile(buffer.getvalue()))
+            service = self.services[index % len(self.services)] if self.services else None
+            GalleryImage.objects.create(image=name, service=service, **entry)
+
+    # -- people ----------------------------------------------------------------
+
+    def create_users(self, count, password):
+        loader = TableLoader(User)
+        password_hash = make_password(password)
+        first_id = loader.next_id()
+        now = timezone.now()
+        batch = []
+        for index in range(count):
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            joined = now - timedelta(days=self.rng.randint(0, 3 * 365), seconds=self.rng.randint(0, 86399))
+            batch.append(User(
+                id=first_id + index,
+                username=f'{self.prefix}{index}',
+                password=password_hash,
+                first_name=first,
+                last_name=last,
+                email=f'{first.lower()}.{last.lower()}.{self.prefix}{index}@example.com',
+                phone_number=self.phone_number(),
+                preferred_contact=self.rng.choices(['email', 'phone', 'sms'], [6, 2, 2])[0],
+                date_joined=joined,
+                created_at=joined,
+                updated_at=joined,
+            ))
+            if len(batch) >= self.batch_size:
+                self.flush(loader, batch)
+        self.flush(loader, batch)
+        return list(range(first_id, first_id + count))
+
+    def phone_number(self):
+        return f"2547{self.rng.randint(0, 99999999):08d}"
+
+    # -- bookings --------------------------------------------------------------
+
+    def booking_days(self):
+        """
+        Days to fill, newest first. The salon takes one client at a time, so
+        history reaches as far back as the volume requires, and stays clear of
+        days that already have bookings.
+        """
+        day = timezone.localdate() + timedelta(days=FUTURE_DAYS)
+        earliest = Appointment.objects.aggregate(models.Min('appointment_date'))['appointment_date__min']
+        if earliest is not None and earliest <= day:
+            day = earliest - timedelta(days=1)
+        while True:
+            yield day
+            day -= timedelta(days=1)
+
+    def day_slots(self, day):
+        """Back-to-back (start_minutes, service) bookings for one day"""
+        opening = to_minutes(settings.BOOKING_OPENING_TIME)
+        closing = to_minutes(settings.BOOKING_CLOSING_TIME)
+        step = settings.BOOKING_SLOT_INTERVAL
+        cursor = opening + step * self.rng.choice([0, 0, 1, 2])
+        while True:
+            service = self.rng.choice(self.services)
+            if cursor + service.duration > closing:
+                return
+            yield cursor, service
+            end = cursor + service.duration
+            # Round up to the booking grid and leave the odd gap between clients
+            cursor = -(-end // step) * step + step * self.rng.choice([0, 0, 0, 1, 2])
+
+    def create_appointments(self, count, user_ids):
+        if not self.services:
+            raise CommandError('No active services to book')
+
+        self.loaders = {
+            'appointments': TableLoader(Appointment),
+            'transactions': TableLoader(Transaction),
+            'reviews': TableLoader(Review),
+            'notifications': TableLoader(Notification),
+        }
+        self.next_ids = {name: loader.next_id() for name, loader in self.loaders.items()}
+        self.batches = {name: [] for name in self.loaders}
+        self.users = {}
+        today = timezone.localdate()
+
+        created = 0
+        for day in self.booking_days():
+            for start, service in self.day_slots(day):
+                if created >= count:
+                    self.flush_all()
+                    return
+                user_id = self.rng.choice(user_ids) if user_ids and self.rng.random() < REGISTERED_BOOKING_RATE else None
+                self.add_booking(day, start, service, user_id, today)
+                created += 1
+            if len(self.batches['appointments']) >= self.batch_size:
+                self.flush_all()
+        self.flush_all()
+
+    def add_booking(self, day, start, service, user_id, today):
+        rng = self.rng
+        starts_at = timezone.make_aware(datetime.combine(day, time(start // 60, start % 60)))
+        booked_at = starts_at - timedelta(days=rng.randint(1, 21), minutes=rng.randint(0, 600))
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        phone = self.phone_number()
+
+        if day < today:
+            status = rng.choices(['completed', 'cancelled', 'confirmed'], [85, 10, 5])[0]
+        else:
+            status = rng.choices(['confirmed', 'pending', 'cancelled'], [60, 35, 5])[0]
+        paid = status == 'completed' or (status == 'confirmed' and rng.random() < 0.9)
+
+        appointment = Appointment(
+            id=self.take_id('appointments'),
+            user_id=user_id,
+            customer_name=f'{first} {last}',
+            customer_email=f'{first.lower()}.{last.lower()}@example.com',
+            customer_phone=phone,
+            service_id=service.id,
+            appointment_date=day,
+            appointment_time=time(start // 60, start % 60),
+            duration=service.duration,
+            status=status,
+            created_at=booked_at,
+            updated_at=booked_at,
+        )
+        self.batches['appointments'].append(appointment)
+
+        if user_id:
+            self.add_notification(user_id, 'Appointment Booked',
+                                  f'Your {service.name} appointment on {day} at {appointment.appointment_time:%H:%M} '
+                                  f'has been received.', booked_at, today)
+
+        if paid:
+            paid_at = booked_at + timedelta(minutes=rng.randint(1, 30))
+            receipt = f'S{appointment.id:09d}'
+            appointment.payment_status = 'completed'
+            appointment.payment_phone = phone
+            appointment.mpesa_checkout_request_id = f'ws_CO_{self.prefix}{appointment.id}'
+            appointment.mpesa_transaction_id = receipt
+            appointment.amount_paid = service.price
+            appointment.payment_date = paid_at
+            appointment.updated_at = paid_at
+            if user_id:
+                if rng.random() < 0.05:
+                    # A cancelled first attempt before the successful push
+                    self.add_transaction(appointment, service, user_id, phone, booked_at, 'cancelled', '1032',
+                                         'Request cancelled by user', None, None)
+                self.add_transaction(appointment, service, user_id, phone, paid_at - timedelta(seconds=40),
+                                     'completed', '0', 'The service request is processed successfully.',
+                                     receipt, paid_at)
+                self.add_notification(user_id, 'Payment Successful',
+                                      f'Your payment of KES {service.price} for {service.name} on {day} has been '
+                                      f'confirmed.', paid_at, today)
+        elif status == 'pending' and user_id and rng.random() < 0.3:
+            appointment.payment_status = 'failed'
+            appointment.payment_phone = phone
+            appointment.payment_error = 'DS timeout user cannot be reached'
+            self.add_transaction(appointment, service, user_id, phone, booked_at, 'failed', '1037',
+                                 'DS timeout user cannot be reached', None, None)
+
+        if status == 'completed' and rng.random() < 0.08:
+            reviewed_at = starts_at + timedelta(hours=rng.randint(2, 72))
+            self.batches['reviews'].append(Review(
+                id=self.take_id('reviews'),
+                customer_name=appointment.customer_name,
+                rating=rng.choices([5, 4, 3, 2, 1], [55, 28, 10, 4, 3])[0],
+                comment=rng.choice(REVIEW_COMMENTS),
+                service_id=service.id,
+                appointment_id=appointment.id,
+                is_approved=rng.random() < 0.9,
+                created_at=reviewed_at,
+            ))
+
+    def add_transaction(self, appointment, service, user_id, phone, initiated_at, status, result_code,
+                        result_description, receipt, completed_at):
+        self.batches['transactions'].append(Transaction(
+            id=self.take_id('transactions'),
+            user_id=user_id,
+            appointment_id=appointment.id,
+            mpesa_transaction_id=receipt,
+            mpesa_checkout_request_id=appointment.mpesa_checkout_request_id or f'ws_CO_{self.prefix}{appointment.id}',
+            phone_number=phone,
+            amount=service.price,
+            status=status,
+            result_code=result_code,
+            result_description=result_description,
+            initiated_at=initiated_at,
+            completed_at=completed_at,
+            account_reference='Verdelle Nails',
+            transaction_description=f'Payment for {service.name}',
+        ))
+
+    def add_notification(self, user_id, title, message, created_at, today):
+        # Older notifications have almost always been read
+        age = (today - created_at.date()).days
+        self.batches['notifications'].append(Notification(
+            id=self.take_id('notifications'),
+            user_id=user_id,
+            title=title,
+            message=message,
+            notification_type='appointment',
+            is_read=self.rng.random() < (0.97 if age > 14 else 0.3),
+            created_at=created_at,
+        ))
+
+    def take_id(self, name):
+        value = self.next_ids[name]
+        self.next_ids[name] += 1
+        return value
+
+    # -- writing ---------------------------------------------------------------
+
+    def flush(self, loader, batch):
+        with transaction.atomic():
+            loader.load(batch)
+        batch.clear()
+
+    def flush_all(self):
+        # Parents first so foreign keys resolve within the batch
+        with transaction.atomic():
+            for name in ['appointments', 'transactions', 'reviews', 'notifications']:
+                self.loaders[name].load(self.batches[name])
+                self.batches[name].clear()
+        self.stdout.write(f"  {self.loaders['appointments'].count} appointments", ending='\r')
+        self.stdout.flush()
+
+    def reset_sequences(self):
+        """Explicit primary keys bypass the sequences; move them past the new rows"""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Appointment, Transaction, Review, Notification]
+        )
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
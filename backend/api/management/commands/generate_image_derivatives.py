@@ -0,0 +1,62 @@
+from collections import defaultdict
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from api.conditional import FAMILIES_BY_MODEL, bump_families
+from api.images import create_pool, generate_derivatives, record_derivatives
+from api.models import GalleryImage, Service, User
+
+SOURCES = {
+    'gallery': (GalleryImage, 'image'),
+    'services': (Service, 'image'),
+    'profiles': (User, 'profile_picture'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Backfill responsive image derivatives for existing gallery, service and profile images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=sorted(SOURCES), action='append', help='Limit to these image sets')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default IMAGE_DERIVATIVE_WORKERS)')
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives that already exist')
+
+    def handle(self, *args, **options):
+        names = defaultdict(set)
+        for key in options['only'] or SOURCES:
+            model, field_name = SOURCES[key]
+            for name in (
+                model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                .values_list(field_name, flat=True)
+            ):
+                names[name].add(key)
+
+        self.stdout.write(f'Generating derivatives for {len(names)} image(s)')
+        generated = skipped = failed = recorded = 0
+        with create_pool(options['workers']) as pool:
+            futures = {pool.submit(generate_derivatives, name, options['force']): name for name in sorted(names)}
+            for future in as_completed(futures):
+                try:
+                    written = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'✗ {futures[future]}: {e}')
+                    continue
+                if written:
+                    generated += 1
+                else:
+                    skipped += 1
+                for key in names[futures[future]]:
+                    recorded += record_derivatives(*SOURCES[key], futures[future])
+
+        if recorded:
+            # Serialized srcsets changed; stale ETags must not validate
+            bump_families({
+                family for key in options['only'] or SOURCES
+                for family in FAMILIES_BY_MODEL.get(SOURCES[key][0].__name__, [])
+            })
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Generated {generated}, skipped {skipped} up-to-date, {failed} failed'
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.callback_queue import drain_callbacks, queue_stats
+
+
+class Command(BaseCommand):
+    help = 'Drain the queue of stored M-Pesa callbacks and apply them to appointments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls when running continuously')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed = drain_callbacks()
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} callback(s)'))
+            return
+
+        self.stdout.write(f"Consuming M-Pesa callbacks (poll every {options['interval']}s)")
+        while True:
+            close_old_connections()
+            processed = drain_callbacks()
+            if processed:
+                stats = queue_stats()
+                self.stdout.write(
+                    f"Processed {processed} callback(s); depth={stats['depth']} "
+                    f"lag={stats['recent_processing_lag_seconds']:.2f}s"
+                )
+            time.sleep(options['interval'])
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.reconciliation import reconcile_stale_payments
+
+
+class Command(BaseCommand):
+    help = "Query Daraja about STK pushes whose callback never arrived and apply the results"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Reconcile once and exit')
+        parser.add_argument('--interval', type=float, default=300.0, help='Seconds between passes when running continuously')
+        parser.add_argument('--older-than', type=int, help='Seconds a push must have been initiated (default: MPESA_RECONCILE_AFTER)')
+        parser.add_argument('--workers', type=int, help='Concurrent Daraja queries (default: MPESA_RECONCILE_WORKERS)')
+        parser.add_argument('--rate', type=float, help='Daraja queries per second (default: MPESA_RECONCILE_RATE)')
+        parser.add_argument('--limit', type=int, help='Most checkouts queried per pass')
+
+    def reconcile(self, options):
+        outcomes = reconcile_stale_payments(
+            older_than=options['older_than'],
+            workers=options['workers'],
+            rate=options['rate'],
+            limit=options['limit'],
+        )
+        resolved = sum(outcomes[key] for key in ('completed', 'cancelled', 'failed'))
+        summary = (
+            f"Checked {outcomes['checked']} stale payment(s), resolved {resolved}: "
+            f"completed={outcomes['completed']} cancelled={outcomes['cancelled']} failed={outcomes['failed']} "
+            f"pending={outcomes['pending']} skipped={outcomes['skipped']}"
+        )
+        return outcomes['checked'], summary
+
+    def handle(self, *args, **options):
+        if options['once']:
+            _, summary = self.reconcile(options)
+            self.stdout.write(self.style.SUCCESS(summary))
+            return
+
+        self.stdout.write(f"Reconciling stale payments every {options['interval']}s")
+        while True:
+            close_old_connections()
+            checked, summary = self.reconcile(options)
+            if checked:
+                self.stdout.write(summary)
+            time.sleep(options['interval'])
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.notifications import reconcile_unread_counts
+
+
+class Command(BaseCommand):
+    help = "Correct users' unread notification counters that drifted from their notifications"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Reconcile once and exit')
+        parser.add_argument('--interval', type=float, default=3600.0, help='Seconds between passes when running continuously')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users checked per UPDATE')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            corrected = reconcile_unread_counts(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Corrected {corrected} unread counter(s)'))
+            return
+
+        self.stdout.write(f"Reconciling unread counters every {options['interval']}s")
+        while True:
+            close_old_connections()
+            corrected = reconcile_unread_counts(options['batch_size'])
+            if corrected:
+                self.stdout.write(f'Corrected {corrected} unread counter(s)')
+            time.sleep(options['interval'])
@@ -0,0 +1,195 @@
+"""
+Prometheus metrics for HTTP requests, SQL queries, Daraja calls and duplicate
+payment initiations.
+
+``MetricsMiddleware`` times every request and, through a database
+``execute_wrapper`` installed on each connection, counts the SQL queries it
+runs and the time spent in them. The per-request counter lives in a context
+variable so it follows the request into ``sync_to_async`` threads under
+ASGI. Series are labelled by view (the DRF viewset or function view name)
+and action, not by raw path, so cardinality stays bounded.
+
+Under gunicorn each worker keeps its own samples; with
+PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py) prometheus_client writes
+them to shared files and ``metrics_view`` aggregates all workers. Without it
+(runserver, shell) the in-process registry is served instead.
+"""
+import hmac
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_safe
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUEST_LABELS = ['view', 'action', 'method']
+
+http_requests = Counter(
+    'verdelle_http_requests_total', 'HTTP requests by view, action and status',
+    REQUEST_LABELS + ['status'],
+)
+http_request_duration = Histogram(
+    'verdelle_http_request_duration_seconds', 'Time to produce the response (excludes streamed bodies)',
+    REQUEST_LABELS, buckets=LATENCY_BUCKETS,
+)
+http_response_size = Histogram(
+    'verdelle_http_response_size_bytes', 'Response body size when known',
+    REQUEST_LABELS, buckets=SIZE_BUCKETS,
+)
+db_queries = Histogram(
+    'verdelle_db_queries_per_request', 'SQL queries executed per request',
+    REQUEST_LABELS, buckets=QUERY_COUNT_BUCKETS,
+)
+db_query_duration = Histogram(
+    'verdelle_db_query_seconds_per_request', 'Time spent in SQL per request',
+    REQUEST_LABELS, buckets=LATENCY_BUCKETS,
+)
+daraja_requests = Counter(
+    'verdelle_daraja_requests_total', 'Outbound Daraja API calls by endpoint and HTTP status',
+    ['endpoint', 'status'],
+)
+daraja_request_duration = Histogram(
+    'verdelle_daraja_request_duration_seconds', 'Outbound Daraja API call latency',
+    ['endpoint'], buckets=LATENCY_BUCKETS,
+)
+payment_duplicate_requests = Counter(
+    'verdelle_payment_duplicate_requests_total', 'Payment initiations answered without a new STK push',
+    ['reason'],
+)
+
+
+def observe_daraja_call(endpoint, status, duration):
+    """Record one outbound Daraja call; status is the HTTP code or 'error'"""
+    daraja_requests.labels(endpoint, status).inc()
+    daraja_request_duration.labels(endpoint).observe(duration)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+current_queries = ContextVar('metrics_current_queries', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper that charges each query to the current request, if any"""
+    queries = current_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.count += 1
+        queries.duration += time.perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder, dispatch_uid='metrics_query_recorder')
+
+
+def view_labels(request):
+    """(view, action) for the resolved view, e.g. ('AppointmentViewSet', 'list')"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved', ''
+    func = match.func
+    actions = getattr(func, 'actions', None)
+    if actions:
+        return func.cls.__name__, actions.get(request.method.lower(), '')
+    # @api_view names its wrapper class after the decorated function
+    cls = getattr(func, 'cls', None)
+    return (cls or func).__name__, ''
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled or request.path == '/metrics':
+            return self.get_response(request)
+
+        queries = QueryCounter()
+        token = current_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        self.observe(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled or request.path == '/metrics':
+            return await self.get_response(request)
+
+        queries = QueryCounter()
+        token = current_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        self.observe(request, response, time.perf_counter() - start, queries)
+        return response
+
+    @staticmethod
+    def observe(request, response, duration, queries):
+        labels = (*view_labels(request), request.method)
+        http_requests.labels(*labels, str(response.status_code)).inc()
+        http_request_duration.labels(*labels).observe(duration)
+        db_queries.labels(*labels).observe(queries.count)
+        db_query_duration.labels(*labels).observe(queries.duration)
+        if not response.streaming:
+            http_response_size.labels(*labels).observe(len(response.content))
+        elif response.has_header('Content-Length'):
+            http_response_size.labels(*labels).observe(int(response['Content-Length']))
+
+
+@require_safe
+def metrics_view(request):
+    """
+    Prometheus text exposition; requires ``Bearer METRICS_TOKEN``.
+
+    Without a token the endpoint only answers with DEBUG on; in production
+    it is a 404, so an unconfigured deployment does not publish its metrics.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token and not settings.DEBUG:
+        raise Http404('Metrics are not enabled')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(supplied, token):
+            return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
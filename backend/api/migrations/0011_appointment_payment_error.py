@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-16 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_contactmessage_admin_reply_contactmessage_replied_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='payment_error',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='payment_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('initiating', 'Initiating'), ('initiated', 'Initiated'), ('pending_verification', 'Pending Verification'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-16 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_mpesacallback'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('mpesa_checkout_request_id', ''), _negated=True), fields=['mpesa_checkout_request_id'], name='appt_checkout_request_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('mpesa_transaction_id', ''), _negated=True), fields=['mpesa_transaction_id'], name='appt_mpesa_receipt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', 'cancelled'), _negated=True), fields=['appointment_date', 'appointment_time'], name='appt_active_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['user', '-appointment_date', '-appointment_time'], name='appt_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['-created_at'], name='review_approved_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-16 23:28
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_counts(apps, schema_editor):
+    User = apps.get_model('api', 'User')
+    Notification = apps.get_model('api', 'Notification')
+    unread = Notification.objects.filter(user=OuterRef('pk'), is_read=False).order_by().values('user')
+    User.objects.filter(notifications__is_read=False).distinct().update(
+        unread_notifications=Coalesce(Subquery(unread.annotate(unread=Count('id')).values('unread')), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notifications',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
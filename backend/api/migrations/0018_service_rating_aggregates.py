@@ -0,0 +1,47 @@
+# Generated by Django 5.0.1 on 2026-10-16 23:31
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+def backfill_ratings(apps, schema_editor):
+    Service = apps.get_model('api', 'Service')
+    Review = apps.get_model('api', 'Review')
+    approved = Review.objects.filter(service=OuterRef('pk'), is_approved=True).order_by().values('service')
+    count = Coalesce(Subquery(approved.annotate(n=Count('id')).values('n')), 0)
+    total = Coalesce(Subquery(approved.annotate(total=Sum('rating')).values('total')), 0)
+    average = Coalesce(
+        Cast(Cast(total, FloatField()) / NullIf(count, 0), DecimalField(max_digits=3, decimal_places=2)),
+        Value(Decimal('0')),
+        output_field=DecimalField(max_digits=3, decimal_places=2),
+    )
+    Service.objects.update(rating_count=count, rating_sum=total, rating_avg=average)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_user_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-16 23:39
+
+import api.constraints
+import django.contrib.postgres.fields.ranges
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_durations(apps, schema_editor):
+    Appointment = apps.get_model('api', 'Appointment')
+    Service = apps.get_model('api', 'Service')
+    Appointment.objects.update(duration=Subquery(Service.objects.filter(pk=OuterRef('service_id')).values('duration')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_service_rating_aggregates'),
+    ]
+
+    operations = [
+        # Needs a role allowed to CREATE EXTENSION (or btree_gist already installed)
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='appointment',
+            name='duration',
+            field=models.PositiveIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_durations, migrations.RunPython.noop),
+        # Fails if live appointments already overlap; cancel or move them first
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=api.constraints.PostgresExclusionConstraint(condition=models.Q(('status', 'cancelled'), _negated=True), expressions=[('appointment_date', '='), (models.Func(models.Func(models.F('appointment_date'), models.F('appointment_time'), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), models.Func(models.Func(models.F('appointment_date'), models.F('appointment_time'), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), models.Func(models.F('duration'), output_field=models.DurationField(), template='make_interval(mins => %(expressions)s)'), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), function='TSRANGE', output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()), '&&')], name='appt_no_overlap', violation_error_message='This time slot is already booked.'),
+        ),
+    ]
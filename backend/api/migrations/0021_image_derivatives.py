@@ -0,0 +1,59 @@
+# Generated by Django 5.0.1 on 2026-10-17 00:03
+
+import hashlib
+import posixpath
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+IMAGE_FIELDS = [('GalleryImage', 'image'), ('Service', 'image'), ('User', 'profile_picture')]
+
+
+def largest_jpeg_name(name, width):
+    # The naming scheme of api.images.derivative_name when this migration was
+    # written, copied so later changes there cannot alter the backfill
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    digest = hashlib.sha1(name.encode()).hexdigest()[:10]
+    return posixpath.join('derivatives', directory, f'{stem}.w{width}.{digest}.jpg')
+
+
+def record_existing_derivatives(apps, schema_editor):
+    # One storage check per image, once, instead of one per serialized row
+    widths = getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', [320, 640, 1024])
+    if not widths:
+        return
+    for model_name, field_name in IMAGE_FIELDS:
+        model = apps.get_model('api', model_name)
+        names = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+        for name in set(names.values_list(field_name, flat=True)):
+            # The largest JPEG is written last and marks a finished job
+            if default_storage.exists(largest_jpeg_name(name, max(widths))):
+                model.objects.filter(**{field_name: name}).update(**{f'{field_name}_derivatives': name})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_mpesacallback_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galleryimage',
+            name='image_derivatives',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='image_derivatives',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_derivatives',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(record_existing_derivatives, migrations.RunPython.noop),
+    ]
@@ -1,22 +1,39 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .constraints import booking_exclusion
+from .search import PostgresGinIndex, search_vector, trigram_index
+
+# Columns behind the search indexes below; the views and admin search the same ones
+USER_SEARCH_FIELDS = ['username', 'email', 'first_name', 'last_name', 'phone_number']
+SERVICE_SEARCH_FIELDS = [('name', 'A'), ('description', 'B')]
+TRANSACTION_SEARCH_FIELDS = ['mpesa_transaction_id', 'phone_number', 'account_reference']
+
 
 class User(AbstractUser):
     """Custom User model with additional fields"""
     phone_number = models.CharField(max_length=20, blank=True)
     date_of_birth = models.DateField(null=True, blank=True)
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    # Name of the picture whose derivatives exist, set by api.images
+    profile_picture_derivatives = models.CharField(max_length=100, blank=True, default='', editable=False)
     preferred_contact = models.CharField(
         max_length=10, 
         choices=[('email', 'Email'), ('phone', 'Phone'), ('sms', 'SMS')],
         default='email'
     )
     loyalty_points = models.IntegerField(default=0)
+    # Denormalized count of unread notifications, maintained by api.notifications
+    unread_notifications = models.IntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            trigram_index(USER_SEARCH_FIELDS, name='user_search_trgm_idx'),
+        ]
+
     def __str__(self):
         return self.email
 
@@ -48,14 +65,23 @@ class Service(models.Model):
     duration = models.IntegerField(help_text="Duration in minutes")
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to='services/', blank=True, null=True)
+    # Name of the image whose derivatives exist, set by api.images
+    image_derivatives = models.CharField(max_length=100, blank=True, default='', editable=False)
     is_featured = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     display_order = models.IntegerField(default=0)
+    # Approved-review aggregates, maintained incrementally by api.ratings
+    rating_count = models.IntegerField(default=0, editable=False)
+    rating_sum = models.IntegerField(default=0, editable=False)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['category__display_order', 'display_order', 'name']
+        indexes = [
+            PostgresGinIndex(search_vector(SERVICE_SEARCH_FIELDS), name='service_search_idx'),
+        ]
 
     def __str__(self):
         if self.category:
@@ -68,6 +94,8 @@ class GalleryImage(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='gallery/')
+    # Name of the image whose derivatives exist, set by api.images
+    image_derivatives = models.CharField(max_length=100, blank=True, default='', editable=False)
     service = models.ForeignKey(Service, on_delete=models.SET_NULL, null=True, blank=True, related_name='gallery_images')
     is_featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -91,6 +119,7 @@ class Appointment(models.Model):
 
     PAYMENT_STATUS_CHOICES = [
         ('pending', 'Pending'),
+        ('initiating', 'Initiating'),
         ('initiated', 'Initiated'),
         ('pending_verification', 'Pending Verification'),
         ('completed', 'Completed'),
@@ -106,6 +135,8 @@ class Appointment(models.Model):
     service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='appointments')
     appointment_date = models.DateField()
     appointment_time = models.TimeField()
+    # Minutes booked, copied from the service so the overlap constraint needs no join
+    duration = models.PositiveIntegerField(editable=False)
     notes = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     
@@ -116,16 +147,72 @@ class Appointment(models.Model):
     mpesa_transaction_id = models.CharField(max_length=100, blank=True)
     amount_paid = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     payment_date = models.DateTimeField(null=True, blank=True)
+    payment_error = models.CharField(max_length=255, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['appointment_date', 'appointment_time']
+        indexes = [
+            # Callback lookup by CheckoutRequestID and manual receipt checks
+            models.Index(
+                fields=['mpesa_checkout_request_id'],
+                name='appt_checkout_request_idx',
+                condition=~models.Q(mpesa_checkout_request_id=''),
+            ),
+            models.Index(
+                fields=['mpesa_transaction_id'],
+                name='appt_mpesa_receipt_idx',
+                condition=~models.Q(mpesa_transaction_id=''),
+            ),
+            # Booking conflict checks only consider live appointments
+            models.Index(
+                fields=['appointment_date', 'appointment_time'],
+                name='appt_active_slot_idx',
+                condition=~models.Q(status='cancelled'),
+            ),
+            models.Index(
+                fields=['user', '-appointment_date', '-appointment_time'],
+                name='appt_user_date_idx',
+            ),
+            # Keyset pagination order for the admin list
+            models.Index(
+                fields=['-appointment_date', '-appointment_time', 'id'],
+                name='appt_date_keyset_idx',
+            ),
+        ]
+        # Live appointments may not overlap (PostgreSQL only, see api/constraints.py)
+        constraints = [booking_exclusion()]
 
     def __str__(self):
         return f"{self.customer_name} - {self.service.name} on {self.appointment_date}"
 
+    def save(self, *args, **kwargs):
+        if self.duration is None:
+            self.duration = self.service.duration
+        super().save(*args, **kwargs)
+
+
+class ReviewQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """update() that keeps Service rating aggregates in step, e.g. the admin's bulk approve"""
+        from .conditional import bump_versions
+        from .ratings import RATING_FIELDS, apply_rating_changes, rating_changes, review_rows
+
+        if not RATING_FIELDS & kwargs.keys():
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            # Lock the rows so a concurrent change cannot slip between the snapshots
+            pks = list(self.select_for_update().order_by().values_list('pk', flat=True))
+            affected = self.model.objects.using(self.db).filter(pk__in=pks)
+            before = review_rows(affected)
+            updated = super().update(**kwargs)
+            apply_rating_changes(rating_changes(before, review_rows(affected)))
+            if updated:
+                bump_versions(Review)
+        return updated
+
 
 class Review(models.Model):
     """Customer reviews"""
@@ -137,8 +224,17 @@ class Review(models.Model):
     is_approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ReviewQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['-created_at'],
+                name='review_approved_recent_idx',
+                condition=models.Q(is_approved=True),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.customer_name} - {self.rating} stars"
@@ -183,6 +279,10 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_recent_idx'),
+            models.Index(fields=['user', '-created_at', 'id'], name='notif_user_keyset_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
@@ -225,7 +325,35 @@ class Transaction(models.Model):
         indexes = [
             models.Index(fields=['mpesa_transaction_id']),
             models.Index(fields=['user', '-initiated_at']),
+            models.Index(fields=['-initiated_at', 'id'], name='txn_initiated_keyset_idx'),
+            trigram_index(TRANSACTION_SEARCH_FIELDS, name='txn_search_trgm_idx'),
         ]
     
     def __str__(self):
         return f"{self.user.username} - {self.amount} - {self.status}"
+
+
+class MpesaCallback(models.Model):
+    """Raw M-Pesa callbacks, persisted before processing (write-ahead queue)"""
+    checkout_request_id = models.CharField(max_length=100, blank=True, db_index=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Earliest retry after a failed attempt (null: due now)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['received_at']
+        indexes = [
+            models.Index(
+                fields=['received_at'],
+                name='mpesa_callback_pending_idx',
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        state = 'processed' if self.processed_at else 'pending'
+        return f"{self.checkout_request_id} ({state})"
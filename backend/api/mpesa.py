@@ -1,12 +1,187 @@
+import asyncio
+import os
 import requests
 import base64
+import hashlib
+import threading
+import time
+import weakref
 from datetime import datetime
+import httpx
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
 import logging
 
+from .metrics import observe_daraja_call
+
 logger = logging.getLogger(__name__)
 
 
+class AccessTokenCache:
+    """
+    Process-wide cache for Daraja OAuth tokens.
+
+    Tokens are stored in Django's cache so every thread and every gunicorn
+    worker reuses the same token until shortly before it expires. Refreshes
+    are single-flight: a thread lock serialises threads in this process and a
+    cache lock (``cache.add``) serialises workers, so a burst of checkouts
+    results in one OAuth round trip.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._local = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _cache_key(client):
+        digest = hashlib.sha256(f"{client.base_url}:{client.consumer_key}".encode()).hexdigest()[:16]
+        return f'mpesa:access_token:{digest}'
+
+    @staticmethod
+    def _is_fresh(entry):
+        margin = getattr(settings, 'MPESA_TOKEN_REFRESH_MARGIN', 60)
+        return bool(entry) and entry['expires_at'] - margin > time.time()
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _lookup(self, key):
+        entry = self._local.get(key)
+        if self._is_fresh(entry):
+            return entry
+        entry = cache.get(key)
+        if self._is_fresh(entry):
+            self._local[key] = entry
+            return entry
+        return None
+
+    def get_token(self, client):
+        """Return a valid access token for ``client``, refreshing it if needed"""
+        key = self._cache_key(client)
+
+        entry = self._lookup(key)
+        if entry:
+            self._count('hits')
+            return entry['token']
+
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            entry = self._lookup(key)
+            if entry:
+                self._count('hits')
+                return entry['token']
+
+            lock_key = f'{key}:lock'
+            lock_timeout = getattr(settings, 'MPESA_TOKEN_LOCK_TIMEOUT', 10)
+            have_lock = cache.add(lock_key, 1, lock_timeout)
+            if not have_lock:
+                # Another worker is refreshing; wait for it to publish the token
+                deadline = time.time() + lock_timeout
+                while time.time() < deadline:
+                    time.sleep(0.1)
+                    entry = self._lookup(key)
+                    if entry:
+                        self._count('hits')
+                        return entry['token']
+                logger.warning("Timed out waiting for another worker to refresh the M-Pesa token")
+
+            try:
+                self._count('misses')
+                token, expires_in = client.request_access_token()
+                if not token:
+                    return None
+                entry = {'token': token, 'expires_at': time.time() + expires_in}
+                self._local[key] = entry
+                cache.set(key, entry, expires_in)
+                return token
+            finally:
+                if have_lock:
+                    cache.delete(lock_key)
+
+    def peek(self, client):
+        """Token from this process's memory only (no cache I/O), or None"""
+        entry = self._local.get(self._cache_key(client))
+        return entry['token'] if self._is_fresh(entry) else None
+
+    def invalidate(self, client):
+        """Drop the cached token, e.g. after Daraja rejected it"""
+        key = self._cache_key(client)
+        with self._lock:
+            self._local.pop(key, None)
+            cache.delete(key)
+
+    def stats(self):
+        with self._stats_lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+token_cache = AccessTokenCache()
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    Return the keep-alive HTTP session shared by every MpesaClient in this
+    worker process.
+
+    Connections to Daraja are pooled so token fetches, STK pushes and status
+    queries reuse an open TCP/TLS connection instead of handshaking per call.
+    The session is rebuilt after a fork so workers never share sockets.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                pool_size = getattr(settings, 'MPESA_HTTP_POOL_SIZE', 10)
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=False)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+                _session_pid = pid
+    return _session
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client():
+    """
+    Return the httpx.AsyncClient for the running event loop.
+
+    Under uvicorn each worker runs one loop for its lifetime, so this is a
+    per-worker keep-alive pool; clients are keyed by loop because an async
+    client cannot be shared between loops.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        max_connections = getattr(settings, 'MPESA_ASYNC_MAX_CONNECTIONS', 100)
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=getattr(settings, 'MPESA_HTTP_POOL_SIZE', 10),
+            ),
+            timeout=httpx.Timeout(
+                getattr(settings, 'MPESA_READ_TIMEOUT', 30),
+                connect=getattr(settings, 'MPESA_CONNECT_TIMEOUT', 5),
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
 class MpesaClient:
     """M-Pesa Daraja API client for STK Push payments"""
     
@@ -17,9 +192,15 @@ class MpesaClient:
         self.passkey = getattr(settings, 'MPESA_PASSKEY', '')
         self.callback_url = getattr(settings, 'MPESA_CALLBACK_URL', '')
         self.environment = getattr(settings, 'MPESA_ENVIRONMENT', 'sandbox')
+        self.timeout = (
+            getattr(settings, 'MPESA_CONNECT_TIMEOUT', 5),
+            getattr(settings, 'MPESA_READ_TIMEOUT', 30),
+        )
         
         # Set API URLs based on environment
-        if self.environment == 'production':
+        if getattr(settings, 'MPESA_API_BASE_URL', ''):
+            self.base_url = settings.MPESA_API_BASE_URL.rstrip('/')
+        elif self.environment == 'production':
             self.base_url = 'https://api.safaricom.co.ke'
         else:
             self.base_url = 'https://sandbox.safaricom.co.ke'
@@ -28,8 +209,54 @@ class MpesaClient:
         self.stk_push_url = f'{self.base_url}/mpesa/stkpush/v1/processrequest'
         self.query_url = f'{self.base_url}/mpesa/stkpushquery/v1/query'
     
+    @property
+    def session(self):
+        """
+        This process's pooled session, looked up on every call: a client
+        built before gunicorn forks must not keep using the parent's sockets.
+        """
+        return get_http_session()
+
+    def _send(self, method, endpoint, url, **kwargs):
+        """Send a Daraja request on the shared session and record its latency"""
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            observe_daraja_call(endpoint, status, time.perf_counter() - start)
+
+    async def _asend(self, method, endpoint, url, **kwargs):
+        """Async counterpart of _send on the event loop's httpx client"""
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            response = await get_async_http_client().request(method, url, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            observe_daraja_call(endpoint, status, time.perf_counter() - start)
+
     def get_access_token(self):
-        """Get OAuth access token from M-Pesa API"""
+        """Get OAuth access token, reusing the shared cached token when valid"""
+        return token_cache.get_token(self)
+
+    async def aget_access_token(self):
+        """
+        Async get_access_token. The in-memory token is returned directly; a
+        refresh (roughly hourly) runs the sync, single-flight path in a thread.
+        """
+        return token_cache.peek(self) or await sync_to_async(self.get_access_token, thread_sensitive=False)()
+
+    def request_access_token(self):
+        """
+        Fetch a new OAuth access token from M-Pesa API
+
+        Returns:
+            tuple: (access_token, expires_in seconds), or (None, 0) on failure
+        """
         try:
             logger.info(f"Attempting to get access token from: {self.auth_url}")
             logger.info(f"Using consumer key: {self.consumer_key[:10]}...")
@@ -43,7 +270,7 @@ class MpesaClient:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.get(self.auth_url, headers=headers)
+            response = self._send('GET', 'oauth', self.auth_url, headers=headers)
             
             logger.info(f"Auth response status: {response.status_code}")
             if response.status_code != 200:
@@ -53,11 +280,11 @@ class MpesaClient:
             
             json_response = response.json()
             logger.info("Access token obtained successfully")
-            return json_response.get('access_token')
+            return json_response.get('access_token'), int(json_response.get('expires_in', 3599))
         
         except Exception as e:
             logger.error(f"Error getting M-Pesa access token: {str(e)}")
-            return None
+            return None, 0
     
     def generate_password(self):
         """Generate password for STK push"""
@@ -66,26 +293,8 @@ class MpesaClient:
         encoded = base64.b64encode(data_to_encode.encode())
         return encoded.decode('utf-8'), timestamp
     
-    def stk_push(self, phone_number, amount, account_reference, transaction_desc):
-        """
-        Initiate STK Push payment
-        
-        Args:
-            phone_number (str): Customer phone number in format 254XXXXXXXXX
-            amount (int): Amount to charge
-            account_reference (str): Account reference (e.g., appointment ID)
-            transaction_desc (str): Transaction description
-        
-        Returns:
-            dict: API response with CheckoutRequestID or error
-        """
-        access_token = self.get_access_token()
-        if not access_token:
-            return {
-                'success': False,
-                'error': 'Failed to get access token'
-            }
-        
+    def _stk_push_request(self, access_token, phone_number, amount, account_reference, transaction_desc):
+        """Headers and payload for an STK push"""
         password, timestamp = self.generate_password()
         
         headers = {
@@ -116,29 +325,59 @@ class MpesaClient:
             'AccountReference': account_reference,
             'TransactionDesc': transaction_desc
         }
+        return headers, payload
+
+    @staticmethod
+    def _stk_push_result(json_response):
+        logger.info(f"M-Pesa STK push response: {json_response}")
+        
+        if json_response.get('ResponseCode') == '0':
+            return {
+                'success': True,
+                'CheckoutRequestID': json_response.get('CheckoutRequestID'),
+                'MerchantRequestID': json_response.get('MerchantRequestID'),
+                'ResponseDescription': json_response.get('ResponseDescription'),
+                'CustomerMessage': json_response.get('CustomerMessage')
+            }
+        else:
+            error_msg = json_response.get('errorMessage') or json_response.get('ResponseDescription', 'Payment initiation failed')
+            logger.error(f"M-Pesa error: {error_msg}")
+            return {
+                'success': False,
+                'error': error_msg
+            }
+
+    def stk_push(self, phone_number, amount, account_reference, transaction_desc):
+        """
+        Initiate STK Push payment
+        
+        Args:
+            phone_number (str): Customer phone number in format 254XXXXXXXXX
+            amount (int): Amount to charge
+            account_reference (str): Account reference (e.g., appointment ID)
+            transaction_desc (str): Transaction description
+        
+        Returns:
+            dict: API response with CheckoutRequestID or error
+        """
+        access_token = self.get_access_token()
+        if not access_token:
+            return {
+                'success': False,
+                'error': 'Failed to get access token'
+            }
+        
+        headers, payload = self._stk_push_request(
+            access_token, phone_number, amount, account_reference, transaction_desc
+        )
         
         try:
             logger.info(f"Initiating STK push with payload: {payload}")
-            response = requests.post(self.stk_push_url, json=payload, headers=headers)
-            
-            json_response = response.json()
-            logger.info(f"M-Pesa STK push response: {json_response}")
+            response = self._send('POST', 'stk_push', self.stk_push_url, json=payload, headers=headers)
+            if response.status_code == 401:
+                token_cache.invalidate(self)
             
-            if json_response.get('ResponseCode') == '0':
-                return {
-                    'success': True,
-                    'CheckoutRequestID': json_response.get('CheckoutRequestID'),
-                    'MerchantRequestID': json_response.get('MerchantRequestID'),
-                    'ResponseDescription': json_response.get('ResponseDescription'),
-                    'CustomerMessage': json_response.get('CustomerMessage')
-                }
-            else:
-                error_msg = json_response.get('errorMessage') or json_response.get('ResponseDescription', 'Payment initiation failed')
-                logger.error(f"M-Pesa error: {error_msg}")
-                return {
-                    'success': False,
-                    'error': error_msg
-                }
+            return self._stk_push_result(response.json())
         
         except requests.exceptions.RequestException as e:
             logger.error(f"HTTP error initiating STK push: {str(e)}")
@@ -154,6 +393,53 @@ class MpesaClient:
                 'success': False,
                 'error': str(e)
             }
+
+    async def astk_push(self, phone_number, amount, account_reference, transaction_desc):
+        """
+        Async stk_push for the async payment views.
+
+        Under ASGI (settings.ASGI_MODE) the push goes out on the worker's
+        httpx.AsyncClient, so waiting on Daraja holds no thread. Under WSGI
+        every async view runs in a short-lived event loop that cannot keep a
+        connection pool, so the sync stk_push runs in a thread instead and
+        keeps using the keep-alive requests session.
+        """
+        if not getattr(settings, 'ASGI_MODE', False):
+            return await sync_to_async(self.stk_push, thread_sensitive=False)(
+                phone_number, amount, account_reference, transaction_desc
+            )
+
+        access_token = await self.aget_access_token()
+        if not access_token:
+            return {
+                'success': False,
+                'error': 'Failed to get access token'
+            }
+
+        headers, payload = self._stk_push_request(
+            access_token, phone_number, amount, account_reference, transaction_desc
+        )
+
+        try:
+            logger.info(f"Initiating STK push with payload: {payload}")
+            response = await self._asend('POST', 'stk_push', self.stk_push_url, json=payload, headers=headers)
+            if response.status_code == 401:
+                await sync_to_async(token_cache.invalidate, thread_sensitive=False)(self)
+
+            return self._stk_push_result(response.json())
+
+        except httpx.HTTPError as e:
+            logger.error(f"HTTP error initiating STK push: {str(e)}")
+            return {
+                'success': False,
+                'error': f'Network error: {str(e)}'
+            }
+        except Exception as e:
+            logger.error(f"Error initiating STK push: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
     
     def query_transaction(self, checkout_request_id):
         """
@@ -191,7 +477,9 @@ class MpesaClient:
         
         try:
             logger.info(f"Sending query request to: {self.query_url}")
-            response = requests.post(self.query_url, json=payload, headers=headers)
+            response = self._send('POST', 'stk_query', self.query_url, json=payload, headers=headers)
+            if response.status_code == 401:
+                token_cache.invalidate(self)
             
             json_response = response.json()
             logger.info(f"Query response: {json_response}")
@@ -211,3 +499,17 @@ class MpesaClient:
                 'success': False,
                 'error': str(e)
             }
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_mpesa_client():
+    """Return the MpesaClient shared by this process"""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = MpesaClient()
+    return _default_client
@@ -0,0 +1,81 @@
+"""
+Per-user unread notification counter.
+
+``User.unread_notifications`` mirrors the number of the user's unread
+notifications so the badge endpoint reads one column instead of running a
+COUNT. Every write path adjusts it with F() arithmetic in the same
+transaction as the notification rows:
+
+- create / delete: signals (one notification) or ``create_notifications``
+  (bulk_create, which sends no signals)
+- read / unread: ``set_read``, which flips rows with a conditional UPDATE
+  and moves the counter by the number of rows that actually changed, so
+  concurrent mark-all-read calls cannot count a notification twice
+
+Writes outside these paths drift the counter until ``reconcile_unread_counts``
+(the reconcile_unread_notifications command) recomputes it.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Notification, User
+
+
+def adjust_unread(deltas):
+    """Apply {user_id: delta}; users sharing a delta are updated in one statement"""
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(user_id)
+    for delta, user_ids in by_delta.items():
+        User.objects.filter(pk__in=user_ids).update(
+            unread_notifications=Greatest(F('unread_notifications') + delta, Value(0))
+        )
+
+
+def create_notifications(notifications, batch_size=None):
+    """bulk_create that also counts the new unread notifications"""
+    with transaction.atomic():
+        created = Notification.objects.bulk_create(notifications, batch_size=batch_size)
+        adjust_unread(Counter(notification.user_id for notification in created if not notification.is_read))
+    return created
+
+
+def set_read(queryset, is_read=True):
+    """Mark the queryset's notifications read (or unread); returns how many changed"""
+    to_change = queryset.filter(is_read=not is_read)
+    changed_total = 0
+    with transaction.atomic():
+        user_ids = to_change.order_by().values_list('user_id', flat=True).distinct()
+        for user_id in list(user_ids):
+            changed = to_change.filter(user_id=user_id).update(is_read=is_read)
+            adjust_unread({user_id: -changed if is_read else changed})
+            changed_total += changed
+    return changed_total
+
+
+def actual_unread_count():
+    return Coalesce(Subquery(
+        Notification.objects.filter(user=OuterRef('pk'), is_read=False)
+        .order_by().values('user').annotate(unread=Count('id')).values('unread')
+    ), 0)
+
+
+def reconcile_unread_counts(batch_size=1000):
+    """Recompute counters that drifted from the notification rows; returns users corrected"""
+    corrected = 0
+    last_id = 0
+    while True:
+        ids = list(User.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return corrected
+        last_id = ids[-1]
+        corrected += (
+            User.objects.filter(pk__in=ids)
+            .alias(actual=actual_unread_count())
+            .exclude(unread_notifications=F('actual'))
+            .update(unread_notifications=actual_unread_count())
+        )
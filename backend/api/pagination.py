@@ -0,0 +1,174 @@
+import datetime
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder cuts datetimes and times to milliseconds, which would
+    make a cursor skip rows whose keys differ only in the microseconds.
+    """
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def keyset_condition(ordering, position, reverse=False):
+    """
+    Rows strictly after ``position`` in ``ordering``, compared on every column:
+    (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z) ...
+
+    '-field' compares with < instead; ``reverse`` selects the rows before.
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, position):
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        lookup = 'lt' if descending != reverse else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a composite ordering.
+
+    The cursor stores the value of every ``ordering`` column of the last (or,
+    for the previous page, first) row, and the next page filters on all of
+    them with ``keyset_condition``, so each page is an index range scan with
+    no OFFSET or COUNT(*) at any depth. The last ordering column must be
+    unique (e.g. 'id') and none may be NULL.
+    """
+    ordering = None
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii')))
+            position, reverse = cursor['p'], bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError, BinasciiError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, row, reverse):
+        position = [getattr(row, field.lstrip('-')) for field in self.ordering]
+        cursor = json.dumps({'p': position, 'r': int(reverse)}, cls=CursorEncoder, separators=(',', ':'))
+        return replace_query_param(self.base_url, self.cursor_query_param, b64encode(cursor.encode()).decode('ascii'))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(keyset_condition(self.ordering, position, reverse))
+            except Exception:
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            # We came back from the row after this page
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to keyset (cursor) pagination when
+    the client asks for it with ?pagination=cursor (or follows a ?cursor= link).
+
+    Cursor pages filter on every column of the ordering key instead of using
+    OFFSET and skip the COUNT(*), so deep pages cost the same as the first
+    one. Subclasses set ``cursor_ordering``; it should match the view's
+    default ordering, end in a unique column and be backed by an index.
+    """
+    cursor_ordering = None
+
+    def __init__(self):
+        self._cursor_paginator = None
+
+    def use_cursor(self, request):
+        return 'cursor' in request.query_params or request.query_params.get('pagination') == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_cursor(request):
+            return super().paginate_queryset(queryset, request, view)
+        self._cursor_paginator = KeysetPagination()
+        self._cursor_paginator.ordering = self.cursor_ordering
+        return self._cursor_paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self._cursor_paginator is not None:
+            return self._cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class TransactionPagination(OptionalCursorPagination):
+    cursor_ordering = ('-initiated_at', 'id')
+
+
+class AppointmentPagination(OptionalCursorPagination):
+    cursor_ordering = ('-appointment_date', '-appointment_time', 'id')
+
+
+class NotificationPagination(OptionalCursorPagination):
+    cursor_ordering = ('-created_at', 'id')
@@ -0,0 +1,113 @@
+"""
+Wake-ups for clients long-polling an appointment's payment status.
+
+Waiters are asyncio events registered per appointment in this process.
+``publish_payment_status`` wakes them once the surrounding transaction
+commits. On PostgreSQL it also sends ``NOTIFY payment_status`` so a listener
+thread in every other worker process wakes its own waiters.
+"""
+from collections import defaultdict
+import logging
+import os
+import select
+import threading
+import time
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'payment_status'
+
+
+class PaymentStatusWaiters:
+    """Registry of asyncio events waiting on appointment payment changes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = defaultdict(set)
+
+    def register(self, appointment_id, loop, event):
+        with self._lock:
+            self._waiters[appointment_id].add((loop, event))
+
+    def unregister(self, appointment_id, loop, event):
+        with self._lock:
+            waiting = self._waiters.get(appointment_id)
+            if waiting is not None:
+                waiting.discard((loop, event))
+                if not waiting:
+                    del self._waiters[appointment_id]
+
+    def notify(self, appointment_id):
+        with self._lock:
+            waiting = list(self._waiters.get(appointment_id, ()))
+        for loop, event in waiting:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiting request's loop has already closed
+                pass
+
+
+waiters = PaymentStatusWaiters()
+
+
+def publish_payment_status(appointment_id):
+    """Signal that an appointment's payment status changed"""
+    appointment_id = int(appointment_id)
+    if connection.vendor == 'postgresql':
+        # Delivered to listeners when the transaction commits
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, str(appointment_id)])
+    transaction.on_commit(lambda: waiters.notify(appointment_id))
+
+
+class NotificationListener(threading.Thread):
+    """Relays PostgreSQL NOTIFY payment_status messages to local waiters"""
+
+    def __init__(self):
+        super().__init__(name='payment-status-listener', daemon=True)
+
+    def run(self):
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                logger.warning(f"Payment status listener disconnected: {e}")
+                time.sleep(5)
+
+    def _listen(self):
+        pg_connection = connection.get_new_connection(connection.get_connection_params())
+        try:
+            pg_connection.autocommit = True
+            with pg_connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            while True:
+                if select.select([pg_connection], [], [], 30) == ([], [], []):
+                    continue
+                pg_connection.poll()
+                while pg_connection.notifies:
+                    notice = pg_connection.notifies.pop(0)
+                    try:
+                        waiters.notify(int(notice.payload))
+                    except ValueError:
+                        logger.warning(f"Ignoring malformed payment notification: {notice.payload!r}")
+        finally:
+            pg_connection.close()
+
+
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def ensure_listener():
+    """Start this process's NOTIFY listener on first use (PostgreSQL only)"""
+    global _listener_pid
+    if connection.vendor != 'postgresql':
+        return
+    pid = os.getpid()
+    with _listener_lock:
+        if _listener_pid != pid:
+            NotificationListener().start()
+            _listener_pid = pid
@@ -0,0 +1,195 @@
+from datetime import datetime
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.timezone import make_aware
+
+from .models import Appointment, Transaction, Notification
+from .payment_events import publish_payment_status
+
+logger = logging.getLogger(__name__)
+
+# Daraja result codes for a push the customer cancelled or let time out
+CANCELLED_RESULT_CODES = ['1032', '1037', '2032']
+FINAL_PAYMENT_STATUSES = ['completed', 'cancelled', 'failed']
+
+
+class UnknownCheckoutRequest(LookupError):
+    """A callback for a CheckoutRequestID that no appointment has recorded (yet)"""
+
+
+def parse_callback_metadata(stk_callback):
+    """Flatten CallbackMetadata.Item into a name -> value dict"""
+    items = stk_callback.get('CallbackMetadata', {}).get('Item', [])
+    return {item.get('Name'): item.get('Value') for item in items}
+
+
+def parse_transaction_date(value):
+    """Parse Daraja's YYYYMMDDHHMMSS timestamps, falling back to now"""
+    if value:
+        try:
+            return make_aware(datetime.strptime(str(value), '%Y%m%d%H%M%S'))
+        except Exception as e:
+            logger.warning(f"Could not parse transaction date: {value}, error: {e}")
+    return timezone.now()
+
+
+def apply_stk_result(checkout_request_id, result_code, result_desc, metadata=None):
+    """
+    Apply the outcome of an STK push to its appointment.
+
+    This is the single place payment state transitions happen for both the
+    Daraja callback and status queries. It is idempotent: a result for an
+    appointment that already reached a final payment status is ignored, with
+    one exception. A payment completed without its receipt (settled by a
+    status query, which carries no metadata) takes the receipt details from
+    a later successful callback.
+
+    Returns:
+        str: the resulting payment status, or None if nothing was updated
+    """
+    result_code = str(result_code)
+    metadata = metadata or {}
+
+    with transaction.atomic():
+        appointment = (
+            Appointment.objects.select_for_update()
+            .filter(mpesa_checkout_request_id=checkout_request_id)
+            .first()
+        )
+        if appointment is None:
+            logger.error(f"No appointment found for CheckoutRequestID: {checkout_request_id}")
+            return None
+
+        if receipt_missing(appointment) and result_code == '0' and metadata.get('MpesaReceiptNumber'):
+            _fill_receipt(appointment, checkout_request_id, metadata)
+            publish_payment_status(appointment.id)
+            return appointment.payment_status
+
+        if appointment.payment_status in FINAL_PAYMENT_STATUSES:
+            logger.info(
+                f"Ignoring duplicate result for appointment {appointment.id} "
+                f"(already {appointment.payment_status})"
+            )
+            return None
+
+        if result_code == '0':
+            _complete_payment(appointment, checkout_request_id, result_code, result_desc, metadata)
+        elif result_code in CANCELLED_RESULT_CODES:
+            logger.info(f"Payment CANCELLED for appointment {appointment.id}: {result_desc}")
+            appointment.payment_status = 'cancelled'
+            appointment.save()
+        else:
+            logger.warning(f"Payment FAILED for appointment {appointment.id} - Code: {result_code}, Desc: {result_desc}")
+            appointment.payment_status = 'failed'
+            appointment.payment_error = str(result_desc)[:255]
+            appointment.save()
+
+        publish_payment_status(appointment.id)
+        return appointment.payment_status
+
+
+def apply_stk_callback(callback_data):
+    """
+    Apply a raw Daraja STK callback payload.
+
+    Raises UnknownCheckoutRequest if no appointment carries the callback's
+    CheckoutRequestID: the callback can beat the commit that records it, so
+    the callback queue keeps the row and retries it later.
+    """
+    stk_callback = callback_data.get('Body', {}).get('stkCallback', {})
+    checkout_request_id = stk_callback.get('CheckoutRequestID', '')
+    result = apply_stk_result(
+        checkout_request_id,
+        stk_callback.get('ResultCode', ''),
+        stk_callback.get('ResultDesc', ''),
+        parse_callback_metadata(stk_callback),
+    )
+    if result is None and checkout_request_id and not (
+        Appointment.objects.filter(mpesa_checkout_request_id=checkout_request_id).exists()
+    ):
+        raise UnknownCheckoutRequest(f"No appointment found for CheckoutRequestID: {checkout_request_id}")
+    return result
+
+
+def receipt_missing(appointment):
+    """True for a completed payment whose M-Pesa receipt has not been seen yet"""
+    return appointment.payment_status == 'completed' and not appointment.mpesa_transaction_id
+
+
+def _fill_receipt(appointment, checkout_request_id, metadata):
+    """Record a late callback's receipt details on a payment completed without them"""
+    mpesa_receipt = str(metadata['MpesaReceiptNumber'])
+    logger.info(f"Recording late receipt {mpesa_receipt} for appointment {appointment.id}")
+
+    appointment.mpesa_transaction_id = mpesa_receipt
+    appointment.amount_paid = metadata.get('Amount') or appointment.amount_paid
+    appointment.payment_phone = metadata.get('PhoneNumber') or appointment.payment_phone
+    if metadata.get('TransactionDate'):
+        appointment.payment_date = parse_transaction_date(metadata['TransactionDate'])
+    appointment.save()
+
+    if Transaction.objects.filter(mpesa_transaction_id=mpesa_receipt).exists():
+        return
+    Transaction.objects.filter(
+        appointment=appointment,
+        mpesa_checkout_request_id=checkout_request_id,
+        mpesa_transaction_id__isnull=True,
+    ).update(
+        mpesa_transaction_id=mpesa_receipt,
+        phone_number=appointment.payment_phone,
+        amount=appointment.amount_paid,
+        completed_at=appointment.payment_date,
+    )
+
+
+def _complete_payment(appointment, checkout_request_id, result_code, result_desc, metadata):
+    logger.info(f"Payment SUCCESSFUL for appointment {appointment.id}")
+
+    mpesa_receipt = metadata.get('MpesaReceiptNumber') or ''
+    amount_paid = metadata.get('Amount') or appointment.service.price
+    phone_number = metadata.get('PhoneNumber') or appointment.payment_phone
+    transaction_date = parse_transaction_date(metadata.get('TransactionDate', ''))
+
+    logger.info(f"Payment details - Receipt: {mpesa_receipt}, Amount: {amount_paid}, Phone: {phone_number}")
+
+    appointment.payment_status = 'completed'
+    appointment.status = 'confirmed'
+    appointment.mpesa_transaction_id = mpesa_receipt
+    appointment.amount_paid = amount_paid
+    appointment.payment_date = transaction_date
+    appointment.payment_phone = phone_number
+    appointment.save()
+
+    if appointment.user_id is None:
+        return
+
+    receipt_taken = bool(mpesa_receipt) and Transaction.objects.filter(
+        mpesa_transaction_id=mpesa_receipt
+    ).exists()
+    if receipt_taken:
+        logger.info(f"Transaction already exists for receipt {mpesa_receipt}")
+    else:
+        record = Transaction.objects.create(
+            user_id=appointment.user_id,
+            appointment=appointment,
+            mpesa_transaction_id=mpesa_receipt or None,
+            mpesa_checkout_request_id=checkout_request_id,
+            phone_number=phone_number,
+            amount=amount_paid,
+            status='completed',
+            result_code=result_code,
+            result_description=result_desc,
+            completed_at=transaction_date,
+            account_reference='Verdelle Nails',
+            transaction_description=f'Payment for {appointment.service.name}'
+        )
+        logger.info(f"Transaction record created: ID {record.id}, Receipt: {mpesa_receipt}")
+
+    Notification.objects.create(
+        user_id=appointment.user_id,
+        title='Payment Successful',
+        message=f'Your payment of KES {amount_paid} for {appointment.service.name} on {appointment.appointment_date} has been confirmed.',
+        notification_type='appointment'
+    )
@@ -0,0 +1,77 @@
+"""
+Rating aggregates on Service.
+
+``rating_count``, ``rating_sum`` and ``rating_avg`` cover approved reviews
+and are moved by deltas with F() arithmetic, so listing or ordering services
+by rating needs no join or GROUP BY. A review counts toward its service while
+it is approved; every write path diffs that contribution before and after:
+
+- Review.save() / delete(): signals
+- Review.objects...update(): ``ReviewQuerySet.update`` (the admin's bulk
+  approve), which snapshots the affected rows around the UPDATE
+
+``recompute_ratings`` rebuilds the columns from the review rows, for bulk
+loads that bypass both.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from .models import Review, Service
+
+RATING_FIELDS = {'service', 'service_id', 'rating', 'is_approved'}
+
+
+def contribution(rows):
+    """{service_id: [count, sum]} for (service_id, rating, is_approved) rows"""
+    totals = defaultdict(lambda: [0, 0])
+    for service_id, rating, is_approved in rows:
+        if is_approved and service_id is not None:
+            totals[service_id][0] += 1
+            totals[service_id][1] += rating
+    return totals
+
+
+def rating_changes(before, after):
+    """Per-service (count, sum) deltas between two sets of review rows"""
+    old, new = contribution(before), contribution(after)
+    changes = {}
+    for service_id in old.keys() | new.keys():
+        count = new[service_id][0] - old[service_id][0]
+        total = new[service_id][1] - old[service_id][1]
+        if count or total:
+            changes[service_id] = (count, total)
+    return changes
+
+
+def average(count, total):
+    return Coalesce(
+        Cast(Cast(total, FloatField()) / NullIf(count, 0), DecimalField(max_digits=3, decimal_places=2)),
+        Value(Decimal('0')),
+        output_field=DecimalField(max_digits=3, decimal_places=2),
+    )
+
+
+def apply_rating_changes(changes):
+    for service_id, (count, total) in changes.items():
+        new_count = F('rating_count') + count
+        new_sum = F('rating_sum') + total
+        # SET expressions all read the row as it was before the UPDATE
+        Service.objects.filter(pk=service_id).update(
+            rating_count=new_count, rating_sum=new_sum, rating_avg=average(new_count, new_sum)
+        )
+
+
+def review_rows(queryset):
+    return list(queryset.order_by().values_list('service_id', 'rating', 'is_approved'))
+
+
+def recompute_ratings(services=None):
+    """Rebuild the aggregates of ``services`` (default: all) from approved reviews"""
+    approved = Review.objects.filter(service=OuterRef('pk'), is_approved=True).order_by().values('service')
+    count = Coalesce(Subquery(approved.annotate(n=Count('id')).values('n')), 0)
+    total = Coalesce(Subquery(approved.annotate(total=Sum('rating')).values('total')), 0)
+    queryset = Service.objects.all() if services is None else services
+    return queryset.update(rating_count=count, rating_sum=total, rating_avg=average(count, total))
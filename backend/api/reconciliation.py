@@ -0,0 +1,117 @@
+"""
+Reconciliation of STK pushes whose callback never arrived.
+
+An appointment stays ``payment_status='initiated'`` until Daraja calls back.
+``reconcile_stale_payments`` asks Daraja's STK query endpoint about pushes
+that have waited longer than ``MPESA_RECONCILE_AFTER`` seconds and applies
+each final answer through ``apply_stk_result``, the same transition the
+callback uses, so a late callback and a reconciliation cannot both apply.
+A status query carries no receipt, so a payment it completes has an empty
+``mpesa_transaction_id`` until a late callback fills it in.
+
+Queries run on a bounded thread pool behind a shared rate limit (Daraja
+throttles per consumer key); all of them reuse the process's cached OAuth
+token. Results are applied on the calling thread, so the job holds a single
+database connection.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Appointment
+from .mpesa import get_mpesa_client
+from .payments import apply_stk_result
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def stale_checkouts(older_than, limit=None):
+    """(appointment id, CheckoutRequestID) of pushes initiated before ``older_than`` seconds ago"""
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    queryset = (
+        Appointment.objects.filter(payment_status='initiated', updated_at__lte=cutoff)
+        .exclude(mpesa_checkout_request_id='')
+        .order_by('updated_at')
+        .values_list('id', 'mpesa_checkout_request_id')
+    )
+    return list(queryset[:limit] if limit else queryset)
+
+
+def query_result(client, limiter, checkout_request_id):
+    """(ResultCode, ResultDesc) from Daraja, or None while it has no final answer"""
+    limiter.wait()
+    response = client.query_transaction(checkout_request_id)
+    if not response.get('success'):
+        # Includes Daraja's HTTP 500 "The transaction is being processed"
+        return None
+    data = response['data']
+    if data.get('ResultCode') in (None, ''):
+        return None
+    return str(data['ResultCode']), data.get('ResultDesc', '')
+
+
+def reconcile_stale_payments(older_than=None, workers=None, rate=None, limit=None):
+    """
+    Query and settle stale initiated checkouts.
+
+    Returns a Counter of outcomes: 'checked', the resulting payment statuses
+    ('completed', 'cancelled', 'failed'), 'pending' (no final answer yet) and
+    'skipped' (settled by a callback in the meantime).
+    """
+    older_than = settings.MPESA_RECONCILE_AFTER if older_than is None else older_than
+    workers = workers or settings.MPESA_RECONCILE_WORKERS
+    rate = settings.MPESA_RECONCILE_RATE if rate is None else rate
+
+    outcomes = Counter()
+    checkouts = stale_checkouts(older_than, limit)
+    if not checkouts:
+        return outcomes
+
+    client = get_mpesa_client()
+    if not client.get_access_token():
+        logger.error("Payment reconciliation skipped: could not get an M-Pesa access token")
+        return outcomes
+
+    limiter = RateLimiter(rate)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mpesa-reconcile') as pool:
+        futures = {
+            pool.submit(query_result, client, limiter, checkout_id): (appointment_id, checkout_id)
+            for appointment_id, checkout_id in checkouts
+        }
+        for future in as_completed(futures):
+            appointment_id, checkout_id = futures[future]
+            outcomes['checked'] += 1
+            result = future.result()
+            if result is None:
+                outcomes['pending'] += 1
+                continue
+            result_code, result_desc = result
+            logger.info(f"Reconciling appointment {appointment_id}: ResultCode {result_code} ({result_desc})")
+            payment_status = apply_stk_result(checkout_id, result_code, result_desc, {})
+            outcomes[payment_status or 'skipped'] += 1
+    return outcomes
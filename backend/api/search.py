@@ -0,0 +1,131 @@
+"""
+PostgreSQL full-text and trigram search.
+
+DRF's SearchFilter and the admin compile a search to ``ILIKE '%term%'`` on
+every field, which scans the table. Here:
+
+- Full text: a weighted ``SearchVector`` matched against a prefix
+  ``tsquery`` and ranked with ``SearchRank``. The vector expression is built by
+  ``search_vector()`` for both the GIN index and the query, so the planner
+  can match them.
+- Trigram: ``icontains`` is compiled to ``UPPER(col) LIKE UPPER('%term%')``,
+  which a GIN ``gin_trgm_ops`` index on ``UPPER(col)`` serves (see
+  ``trigram_index()``). Matches are ranked by ``TrigramSimilarity``.
+
+On other databases ``RankedSearchFilter`` falls back to SearchFilter and the
+indexes are not created (``PostgresGinIndex``).
+"""
+import re
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connections
+from django.db.models import Q
+from django.db.models.functions import Greatest, Upper
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+SEARCH_CONFIG = 'english'
+
+
+def search_vector(weighted_fields):
+    """Weighted tsvector over [(field, weight), ...]"""
+    vector = None
+    for field, weight in weighted_fields:
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+class PostgresGinIndex(GinIndex):
+    """
+    GinIndex that other backends (SQLite in development) silently skip.
+
+    Skipping in the migration operation alone is not enough: SQLite rebuilds
+    the whole table on most ALTERs and recreates every index of the model.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return ''
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+    def remove_sql(self, model, schema_editor, **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return ''
+        return super().remove_sql(model, schema_editor, **kwargs)
+
+
+def trigram_index(fields, name):
+    """One multi-column GIN trigram index over UPPER(field) for icontains lookups"""
+    return PostgresGinIndex(*(OpClass(Upper(field), name='gin_trgm_ops') for field in fields), name=name)
+
+
+def prefix_query(terms):
+    """tsquery requiring every term as a word prefix ('mani' finds 'manicure')"""
+    words = [re.sub(r'\W+', '', term) for term in terms]
+    words = [word for word in words if word]
+    if not words:
+        return None
+    return SearchQuery(' & '.join(f'{word}:*' for word in words), config=SEARCH_CONFIG, search_type='raw')
+
+
+def contains_any(fields, term):
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__icontains': term})
+    return condition
+
+
+def full_text_search(queryset, weighted_fields, query):
+    """Rows whose vector matches the tsquery, annotated with ``search_rank``"""
+    vector = search_vector(weighted_fields)
+    queryset = queryset.alias(search_document=vector).filter(search_document=query)
+    return queryset.annotate(search_rank=SearchRank(vector, query))
+
+
+def trigram_search(queryset, fields, terms):
+    """Rows containing every term in some field, annotated with ``search_rank``"""
+    for term in terms:
+        queryset = queryset.filter(contains_any(fields, term))
+    text = ' '.join(terms)
+    similarities = [TrigramSimilarity(field, text) for field in fields]
+    rank = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+    return queryset.annotate(search_rank=rank)
+
+
+class RankedSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for SearchFilter that uses the indexes above.
+
+    Views declare ``search_vector_fields = [(field, weight), ...]`` for full
+    text or ``trigram_search_fields = [...]`` for substring search, and keep
+    ``search_fields`` for the non-PostgreSQL fallback. Results are ordered by
+    relevance unless the client passes ?ordering=, so list this backend after
+    OrderingFilter.
+
+    Full-text search matches (stemmed) word prefixes, so on PostgreSQL
+    'mani' finds 'Manicure' but 'cure' no longer does; trigram search keeps
+    SearchFilter's substring semantics.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        vector_fields = getattr(view, 'search_vector_fields', None)
+        trigram_fields = getattr(view, 'trigram_search_fields', None)
+        query = prefix_query(terms) if vector_fields else None
+        if query is not None:
+            queryset = full_text_search(queryset, vector_fields, query)
+        elif trigram_fields:
+            queryset = trigram_search(queryset, trigram_fields, terms)
+        else:
+            # Nothing indexable (e.g. only punctuation): plain substring search
+            return super().filter_queryset(request, queryset, view)
+
+        if api_settings.ORDERING_PARAM not in request.query_params:
+            tiebreak = queryset.query.order_by or queryset.model._meta.ordering or ['pk']
+            queryset = queryset.order_by('-search_rank', *tiebreak)
+        return queryset
@@ -1,16 +1,28 @@
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.db import IntegrityError, transaction
 from .models import Service, ServiceCategory, GalleryImage, Appointment, Review, ContactMessage, User, Transaction, Notification
+from .availability import availability, booking_overlaps, booking_window, in_booking_window
+from .appointment_status import STATUS_TRANSITIONS
+from .constraints import SLOT_TAKEN_MESSAGE, booking_exclusion_enforced, is_booking_conflict
+from .images import srcset_for
 
 # --- USER SERIALIZERS ---
 class UserSerializer(serializers.ModelSerializer):
+    profile_picture_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'phone_number', 
-                  'date_of_birth', 'profile_picture', 'preferred_contact', 'loyalty_points', 
+                  'date_of_birth', 'profile_picture', 'profile_picture_srcset', 'preferred_contact', 'loyalty_points', 
                   'is_active', 'is_staff', 'is_superuser', 'date_joined', 'created_at']
         read_only_fields = ['id', 'loyalty_points', 'created_at', 'date_joined']
 
+    def get_profile_picture_srcset(self, obj):
+        return srcset_for(obj.profile_picture, self.context.get('request'))
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8, style={'input_type': 'password'})
     password_confirm = serializers.CharField(write_only=True, min_length=8, style={'input_type': 'password'})
@@ -52,12 +64,17 @@ class LoginSerializer(serializers.Serializer):
 # --- SERVICE SERIALIZERS (Crucial for your page!) ---
 class ServiceSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Service
         # Note: 'duration' is included here!
         fields = ['id', 'category', 'category_name', 'name', 'description', 'duration', 
-                  'price', 'image', 'is_featured', 'is_active', 'created_at']
+                  'price', 'image', 'image_srcset', 'is_featured', 'is_active',
+                  'rating_count', 'rating_sum', 'rating_avg', 'created_at']
+
+    def get_image_srcset(self, obj):
+        return srcset_for(obj.image, self.context.get('request'))
 
 class ServiceCategorySerializer(serializers.ModelSerializer):
     services = serializers.SerializerMethodField()
@@ -67,15 +84,23 @@ class ServiceCategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'focus', 'icon', 'display_order', 'services']
     
     def get_services(self, obj):
-        services = obj.services.filter(is_active=True)
+        # Viewsets prefetch active services into `active_services`
+        services = getattr(obj, 'active_services', None)
+        if services is None:
+            services = obj.services.filter(is_active=True).select_related('category')
         return ServiceSerializer(services, many=True).data
 
 # --- OTHER SERIALIZERS ---
 class GalleryImageSerializer(serializers.ModelSerializer):
     service_name = serializers.CharField(source='service.name', read_only=True)
+    image_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = GalleryImage
-        fields = ['id', 'title', 'description', 'image', 'service', 'service_name', 'is_featured', 'created_at']
+        fields = ['id', 'title', 'description', 'image', 'image_srcset', 'service', 'service_name', 'is_featured', 'created_at']
+
+    def get_image_srcset(self, obj):
+        return srcset_for(obj.image, self.context.get('request'))
 
 class AppointmentSerializer(serializers.ModelSerializer):
     service_name = serializers.CharField(source='service.name', read_only=True)
@@ -90,20 +115,61 @@ class AppointmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'service_price', 'service_name', 'mpesa_transaction_id', 
                            'payment_date', 'created_at']
 
+    def validate_appointment_date(self, value):
+        if (self.instance is None or value != self.instance.appointment_date) and not in_booking_window(value):
+            first, last = booking_window()
+            raise serializers.ValidationError(f'Appointments can be booked from {first} to {last}.')
+        return value
+
     def validate(self, data):
-        appointment_date = data.get('appointment_date')
-        appointment_time = data.get('appointment_time')
-        if appointment_date and appointment_time:
-            existing = Appointment.objects.filter(
-                appointment_date=appointment_date,
-                appointment_time=appointment_time
-            ).exclude(status='cancelled')
-            if self.instance:
-                existing = existing.exclude(pk=self.instance.pk)
-            if existing.exists():
-                raise serializers.ValidationError("This time slot is already booked.")
+        service = data.get('service')
+        if service is not None and (self.instance is None or service.pk != self.instance.service_id):
+            # The booking keeps the length the service had when it was booked
+            data['duration'] = service.duration
+        if booking_exclusion_enforced():
+            # The exclusion constraint rejects overlaps on write; see save()
+            return data
+
+        if not {'appointment_date', 'appointment_time', 'duration'} & data.keys():
+            return data
+        appointment_date = data.get('appointment_date', getattr(self.instance, 'appointment_date', None))
+        appointment_time = data.get('appointment_time', getattr(self.instance, 'appointment_time', None))
+        duration = data.get('duration', getattr(self.instance, 'duration', None))
+        status = data.get('status', getattr(self.instance, 'status', None))
+        if appointment_date and appointment_time and duration is not None and status != 'cancelled':
+            exclude_id = self.instance.pk if self.instance else None
+            # The in-memory index turns most conflicts away without a query;
+            # it can lag other workers, so the database has the last word
+            if not availability.is_available(appointment_date, appointment_time, duration, exclude_id):
+                raise serializers.ValidationError(SLOT_TAKEN_MESSAGE)
+            if booking_overlaps(appointment_date, appointment_time, duration, exclude_id):
+                # Booked by another worker since this one loaded the day
+                availability.invalidate([appointment_date])
+                raise serializers.ValidationError(SLOT_TAKEN_MESSAGE)
         return data
 
+    def save(self, **kwargs):
+        try:
+            # Savepoint, so a rejected booking leaves an outer transaction usable
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError as e:
+            if not is_booking_conflict(e):
+                raise
+            date = self.validated_data.get('appointment_date') or self.instance.appointment_date
+            # Another worker booked the slot; reload the day for the next slot listing
+            availability.invalidate([date])
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [SLOT_TAKEN_MESSAGE]})
+
+class AppointmentBulkUpdateSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.APPOINTMENT_BULK_UPDATE_MAX,
+    )
+    status = serializers.ChoiceField(choices=sorted(STATUS_TRANSITIONS))
+    payment_status = serializers.ChoiceField(choices=Appointment.PAYMENT_STATUS_CHOICES, required=False)
+
 class ReviewSerializer(serializers.ModelSerializer):
     service_name = serializers.CharField(source='service.name', read_only=True)
     class Meta:
@@ -125,7 +191,7 @@ class NotificationSerializer(serializers.ModelSerializer):
 
 class TransactionSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
-    appointment_id = serializers.IntegerField(source='appointment.id', read_only=True)
+    appointment_id = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Transaction
@@ -0,0 +1,117 @@
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .availability import availability
+from .conditional import FAMILIES_BY_MODEL, bump_families, bump_versions
+from .images import record_derivatives, record_field, schedule_derivatives
+from .models import Appointment, GalleryImage, Notification, Review, Service, ServiceCategory, Transaction, User
+from .notifications import adjust_unread
+from .ratings import apply_rating_changes, rating_changes, review_rows
+from .views import invalidate_admin_summary
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, **kwargs):
+    availability.appointment_changed(instance)
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, **kwargs):
+    availability.appointment_removed(instance.pk)
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, **kwargs):
+    # Read-state changes go through notifications.set_read, which adjusts the counter itself
+    if created and not instance.is_read:
+        adjust_unread({instance.user_id: 1})
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread({instance.user_id: -1})
+
+
+def review_state(review):
+    return [(review.service_id, review.rating, review.is_approved)]
+
+
+@receiver(pre_save, sender=Review)
+def review_saving(sender, instance, **kwargs):
+    # The stored row, so post_save can move the service aggregates by the difference
+    instance._rating_before = [] if instance._state.adding else review_rows(Review.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, **kwargs):
+    apply_rating_changes(rating_changes(getattr(instance, '_rating_before', []), review_state(instance)))
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    apply_rating_changes(rating_changes(review_state(instance), []))
+
+
+def catalog_changed(sender, **kwargs):
+    bump_versions(sender)
+
+
+for catalog_model in (Service, ServiceCategory, GalleryImage, Review):
+    post_save.connect(catalog_changed, sender=catalog_model, dispatch_uid=f'etag_saved_{catalog_model.__name__}')
+    post_delete.connect(catalog_changed, sender=catalog_model, dispatch_uid=f'etag_deleted_{catalog_model.__name__}')
+
+
+def summary_rows_changed(sender, **kwargs):
+    # Status and revenue figures can move on any appointment or transaction write
+    transaction.on_commit(invalidate_admin_summary)
+
+
+def summary_count_changed(sender, created=True, **kwargs):
+    # Users, services and gallery images only count; edits (e.g. last_login) change nothing
+    if created:
+        transaction.on_commit(invalidate_admin_summary)
+
+
+for summary_model, handler in (
+    (Appointment, summary_rows_changed),
+    (Transaction, summary_rows_changed),
+    (User, summary_count_changed),
+    (Service, summary_count_changed),
+    (GalleryImage, summary_count_changed),
+):
+    post_save.connect(handler, sender=summary_model, dispatch_uid=f'summary_saved_{summary_model.__name__}')
+    post_delete.connect(handler, sender=summary_model, dispatch_uid=f'summary_deleted_{summary_model.__name__}')
+
+
+IMAGE_FIELDS = {
+    GalleryImage: 'image',
+    Service: 'image',
+    User: 'profile_picture',
+}
+
+
+def image_saved(sender, instance, update_fields=None, **kwargs):
+    field_name = IMAGE_FIELDS[sender]
+    if update_fields is not None and field_name not in update_fields:
+        return
+    name = getattr(instance, field_name).name
+    if name and getattr(instance, record_field(field_name)) != name:
+        transaction.on_commit(lambda: schedule_derivatives(name, lambda: derivatives_done(sender, field_name, name)))
+
+
+def derivatives_done(model, field_name, name):
+    # Runs on the pool's callback thread, which keeps no connection between jobs
+    try:
+        if record_derivatives(model, field_name, name):
+            # The serialized srcset appears now
+            families = FAMILIES_BY_MODEL.get(model.__name__)
+            if families:
+                bump_families(families)
+    finally:
+        connections.close_all()
+
+
+for image_model in IMAGE_FIELDS:
+    post_save.connect(image_saved, sender=image_model, dispatch_uid=f'derivatives_{image_model.__name__}')
@@ -0,0 +1,45 @@
+"""
+Streaming response bodies that stay streamed under ASGI.
+
+Django's StreamingHttpResponse consumes a synchronous iterator under ASGI by
+running ``list()`` over it in a thread (``sync_to_async(list)``), i.e. the
+whole body is built in memory before the first byte goes out. Exports and
+media files would then lose the constant memory use they were written for.
+
+``streaming_content`` hands the iterator back unchanged under WSGI and wraps
+it in an async generator under ASGI (settings.ASGI_MODE), which pulls one
+chunk at a time on the sync thread. Producers that touch the ORM keep working
+because every ``next()`` runs on the same thread (thread_sensitive).
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+_EXHAUSTED = object()
+
+
+def batched(chunks, size):
+    """Join consecutive chunks into one of ``size`` pieces to cut per-chunk overhead"""
+    chunks = iter(chunks)
+    while batch := list(islice(chunks, size)):
+        yield batch[0][:0].join(batch)
+
+
+async def aiterate(chunks):
+    """Async generator over a sync iterator, one thread hop per chunk"""
+    chunks = iter(chunks)
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(chunks, _EXHAUSTED)) is not _EXHAUSTED:
+            yield chunk
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming_content(chunks):
+    if getattr(settings, 'ASGI_MODE', False):
+        return aiterate(chunks)
+    return chunks
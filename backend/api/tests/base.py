@@ -0,0 +1,110 @@
+"""
+Shared fixtures for the API tests.
+
+Tests run against whatever DATABASE_URL points at (SQLite is enough for all
+but the PostgreSQL-only checks, which skip themselves), with a private
+in-memory cache so ETag versions, idempotency entries and tokens never leak
+into a developer's file cache.
+"""
+import datetime
+import itertools
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.availability import availability
+from api.models import Appointment, GalleryImage, Notification, Review, Service, ServiceCategory, Transaction, User
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'api-tests'}}
+
+# For tests that render admin pages, which need no collectstatic manifest this way
+PLAIN_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+_sequence = itertools.count(1)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class VerdelleTestCase(APITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        availability.invalidate()
+
+    def login(self, user):
+        self.client.force_authenticate(user)
+        return user
+
+
+def make_user(**fields):
+    n = next(_sequence)
+    fields.setdefault('username', f'user{n}')
+    fields.setdefault('email', f'user{n}@example.com')
+    return User.objects.create_user(password='secret-pass-1', **fields)
+
+
+def make_staff(**fields):
+    return make_user(is_staff=True, **fields)
+
+
+def make_category(**fields):
+    n = next(_sequence)
+    fields.setdefault('name', f'Category {n}')
+    fields.setdefault('description', 'Nail care')
+    fields.setdefault('focus', 'Hands')
+    return ServiceCategory.objects.create(**fields)
+
+
+def make_service(category=None, **fields):
+    n = next(_sequence)
+    fields.setdefault('name', f'Service {n}')
+    fields.setdefault('description', 'A nail service')
+    fields.setdefault('duration', 60)
+    fields.setdefault('price', Decimal('1500.00'))
+    return Service.objects.create(category=category, **fields)
+
+
+def make_appointment(service, user=None, date=None, time=None, **fields):
+    n = next(_sequence)
+    fields.setdefault('customer_name', f'Customer {n}')
+    fields.setdefault('customer_email', f'customer{n}@example.com')
+    fields.setdefault('customer_phone', '0712345678')
+    return Appointment.objects.create(
+        service=service,
+        user=user,
+        appointment_date=date or datetime.date(2030, 1, 1) + datetime.timedelta(days=n),
+        appointment_time=time or datetime.time(10, 0),
+        **fields,
+    )
+
+
+def make_review(service, rating=5, is_approved=True, **fields):
+    fields.setdefault('customer_name', 'Reviewer')
+    fields.setdefault('comment', 'Lovely')
+    return Review.objects.create(service=service, rating=rating, is_approved=is_approved, **fields)
+
+
+def make_gallery_image(service=None, **fields):
+    n = next(_sequence)
+    fields.setdefault('title', f'Look {n}')
+    fields.setdefault('image', f'gallery/look-{n}.jpg')
+    return GalleryImage.objects.create(service=service, **fields)
+
+
+def make_transaction(user, appointment=None, **fields):
+    n = next(_sequence)
+    fields.setdefault('mpesa_transaction_id', f'RCPT{n:06d}')
+    fields.setdefault('phone_number', '254712345678')
+    fields.setdefault('amount', Decimal('1500.00'))
+    fields.setdefault('status', 'completed')
+    return Transaction.objects.create(user=user, appointment=appointment, **fields)
+
+
+def make_notification(user, **fields):
+    fields.setdefault('title', 'Hello')
+    fields.setdefault('message', 'Something happened')
+    return Notification.objects.create(user=user, **fields)
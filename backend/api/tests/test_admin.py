@@ -0,0 +1,68 @@
+"""
+Overlapping appointment edits in the admin are form errors, not 500s.
+"""
+import datetime
+from unittest import mock
+
+from django.contrib.messages import get_messages
+from django.db import IntegrityError
+from django.test import Client, override_settings
+
+from api.constraints import BOOKING_EXCLUSION_CONSTRAINT, SLOT_TAKEN_MESSAGE
+from api.models import Appointment
+
+from .base import PLAIN_STORAGES, VerdelleTestCase, make_appointment, make_service, make_staff
+
+DAY = datetime.date(2030, 6, 1)
+
+
+@override_settings(STORAGES=PLAIN_STORAGES)
+class AppointmentAdminTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        admin_user = make_staff(is_superuser=True)
+        self.admin = Client()
+        self.admin.force_login(admin_user)
+        self.service = make_service(duration=60)
+        make_appointment(self.service, date=DAY, time=datetime.time(10, 0))
+        self.appointment = make_appointment(self.service, date=DAY, time=datetime.time(12, 0))
+        self.url = f'/admin/api/appointment/{self.appointment.pk}/change/'
+
+    def post(self, **changes):
+        data = {
+            'customer_name': self.appointment.customer_name,
+            'customer_email': self.appointment.customer_email,
+            'customer_phone': self.appointment.customer_phone,
+            'service': self.service.pk,
+            'appointment_date': DAY.isoformat(),
+            'appointment_time': '12:00',
+            'status': 'pending',
+            'payment_status': 'pending',
+        }
+        data.update(changes)
+        return self.admin.post(self.url, data)
+
+    def test_free_slot_is_saved(self):
+        response = self.post(appointment_time='11:00')
+        self.assertEqual(response.status_code, 302)
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.appointment_time, datetime.time(11, 0))
+
+    def test_overlap_is_a_form_error(self):
+        response = self.post(appointment_time='10:30')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, SLOT_TAKEN_MESSAGE)
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.appointment_time, datetime.time(12, 0))
+
+    def test_cancelled_appointment_may_overlap(self):
+        self.assertEqual(self.post(appointment_time='10:30', status='cancelled').status_code, 302)
+
+    def test_constraint_violation_is_reported(self):
+        # Another booking wins the slot after the form check
+        conflict = IntegrityError(f'conflicting key value violates exclusion constraint "{BOOKING_EXCLUSION_CONSTRAINT}"')
+        with mock.patch.object(Appointment, 'save', side_effect=conflict):
+            response = self.post(appointment_time='11:00')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], self.url)
+        self.assertIn(SLOT_TAKEN_MESSAGE, [str(message) for message in get_messages(response.wsgi_request)])
@@ -0,0 +1,98 @@
+"""
+GET /api/admin/summary/: dashboard figures from aggregates, served from the
+cache until a write that changes them.
+"""
+import datetime
+from decimal import Decimal
+
+from django.test import override_settings
+
+from .base import (
+    VerdelleTestCase, make_appointment, make_gallery_image, make_service, make_staff, make_transaction, make_user,
+)
+
+URL = '/api/admin/summary/'
+
+
+# Gallery writes here run on-commit hooks; keep them from starting the image pool
+@override_settings(IMAGE_DERIVATIVES_ENABLED=False)
+class AdminSummaryTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = self.login(make_staff())
+        self.customer = make_user()
+        self.service = make_service(name='Gel Manicure')
+        make_service()
+        make_gallery_image()
+        for i in range(4):
+            make_appointment(self.service, date=datetime.date(2030, 5, 1 + i), customer_name=f'Pending {i}')
+        for i in range(2):
+            make_appointment(
+                self.service, date=datetime.date(2030, 6, 1 + i), status='completed', amount_paid=Decimal('1500.00')
+            )
+        make_transaction(self.customer, amount=Decimal('700.00'))
+        make_transaction(self.customer, status='pending', mpesa_transaction_id=None)
+
+    def summary(self):
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_figures(self):
+        data = self.summary()
+        self.assertEqual(data['total_appointments'], 6)
+        self.assertEqual(data['pending_appointments'], 4)
+        self.assertEqual(data['pending_transactions'], 1)
+        self.assertEqual(data['appointment_revenue'], '3000.00')
+        self.assertEqual(data['transaction_revenue'], '700.00')
+        self.assertEqual(data['total_revenue'], '3700.00')
+        self.assertEqual(data['total_users'], 2)
+        self.assertEqual(data['total_services'], 2)
+        self.assertEqual(data['total_gallery_items'], 1)
+
+        recent = data['recent_activities']
+        self.assertEqual(len(recent), 5)
+        self.assertEqual(recent[0]['appointment_date'], datetime.date(2030, 6, 2))
+        self.assertIn('Gel Manicure', recent[0]['description'])
+        self.assertIn('(completed)', recent[0]['description'])
+
+    def test_served_from_the_cache(self):
+        self.summary()
+        with self.assertNumQueries(0):
+            self.summary()
+
+    def test_writes_invalidate(self):
+        self.summary()
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = make_appointment(self.service)
+        self.assertEqual(self.summary()['total_appointments'], 7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.status = 'completed'
+            appointment.amount_paid = Decimal('1500.00')
+            appointment.save()
+        self.assertEqual(self.summary()['appointment_revenue'], '4500.00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_transaction(self.customer, amount=Decimal('300.00'))
+        self.assertEqual(self.summary()['transaction_revenue'], '1000.00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_user()
+            make_gallery_image().delete()
+        data = self.summary()
+        self.assertEqual((data['total_users'], data['total_gallery_items']), (3, 1))
+
+    def test_edits_that_change_no_figure_keep_the_cache(self):
+        self.summary()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer.first_name = 'Wanjiru'
+            self.customer.save()
+            self.service.description = 'Longer lasting'
+            self.service.save()
+        with self.assertNumQueries(0):
+            self.summary()
+
+    def test_staff_only(self):
+        self.login(self.customer)
+        self.assertEqual(self.client.get(URL).status_code, 403)
@@ -0,0 +1,102 @@
+"""
+The availability index stays bounded, the public endpoint only answers for
+the booking window, and a stale index cannot let an overlapping booking in.
+"""
+import datetime
+
+from django.test import override_settings
+from django.utils import timezone
+
+from api.availability import AvailabilityIndex, availability, booking_overlaps
+from api.models import Appointment
+
+from .base import VerdelleTestCase, make_appointment, make_service, make_user
+
+
+class AvailabilityIndexTests(VerdelleTestCase):
+    @override_settings(AVAILABILITY_CACHE_MAX_DAYS=3)
+    def test_least_recently_used_days_are_dropped(self):
+        index = AvailabilityIndex()
+        days = [datetime.date(2030, 5, day) for day in range(1, 6)]
+        for day in days[:3]:
+            index.day(day)
+        index.day(days[0])
+        index.day(days[3])
+        index.day(days[4])
+        self.assertEqual(list(index._days), [days[0], days[3], days[4]])
+
+    def test_dropped_days_forget_their_appointments(self):
+        index = AvailabilityIndex()
+        appointment = make_appointment(make_service())
+        index.day(appointment.appointment_date)
+        self.assertIn(appointment.pk, index._dates_by_id)
+        index.invalidate()
+        self.assertEqual(index._dates_by_id, {})
+
+    def test_booking_overlaps(self):
+        service = make_service(duration=60)
+        day = datetime.date(2030, 5, 1)
+        make_appointment(service, date=day, time=datetime.time(10, 0))
+        make_appointment(service, date=day, time=datetime.time(14, 0), status='cancelled')
+        self.assertTrue(booking_overlaps(day, '10:30', 30))
+        self.assertTrue(booking_overlaps(day, '09:30', 60))
+        self.assertFalse(booking_overlaps(day, '09:00', 60))
+        self.assertFalse(booking_overlaps(day, '11:00', 60))
+        self.assertFalse(booking_overlaps(day, '14:00', 60))
+
+
+class AvailabilityEndpointTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = make_service()
+
+    def get(self, date):
+        return self.client.get('/api/appointments/availability/', {'date': date, 'service': self.service.id})
+
+    def test_booking_window(self):
+        today = timezone.localdate()
+        self.assertEqual(self.get(today.isoformat()).status_code, 200)
+        self.assertEqual(self.get((today - datetime.timedelta(days=1)).isoformat()).status_code, 400)
+        with override_settings(BOOKING_WINDOW_DAYS=30):
+            self.assertEqual(self.get((today + datetime.timedelta(days=30)).isoformat()).status_code, 200)
+            self.assertEqual(self.get((today + datetime.timedelta(days=31)).isoformat()).status_code, 400)
+
+
+class BookingTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login(make_user())
+        self.service = make_service(duration=60)
+        self.day = timezone.localdate() + datetime.timedelta(days=1)
+
+    def book(self, at, day=None):
+        return self.client.post('/api/appointments/', {
+            'customer_name': 'Amani',
+            'customer_email': 'amani@example.com',
+            'customer_phone': '0712345678',
+            'service': self.service.id,
+            'appointment_date': (day or self.day).isoformat(),
+            'appointment_time': at,
+        })
+
+    def test_stale_index_does_not_allow_an_overlap(self):
+        availability.day(self.day)
+        # Another worker's booking: no signal reaches this process's index
+        Appointment.objects.bulk_create([Appointment(
+            service=self.service, appointment_date=self.day, appointment_time=datetime.time(10, 0), duration=60,
+            customer_name='Other', customer_email='other@example.com', customer_phone='0700000000',
+        )])
+        self.assertTrue(availability.is_available(self.day, '10:30', 60))
+        response = self.book('10:30')
+        self.assertEqual(response.status_code, 400, response.data)
+        self.assertEqual(Appointment.objects.filter(appointment_date=self.day).count(), 1)
+
+    def test_free_slot_is_booked(self):
+        self.assertEqual(self.book('10:00').status_code, 201)
+        self.assertEqual(self.book('11:00').status_code, 201)
+        self.assertEqual(self.book('10:30').status_code, 400)
+
+    def test_dates_outside_the_window_are_rejected(self):
+        response = self.book('10:00', day=timezone.localdate() - datetime.timedelta(days=1))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('appointment_date', response.data)
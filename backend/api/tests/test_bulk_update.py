@@ -0,0 +1,98 @@
+"""
+POST /api/appointments/bulk-update/: per-ID results, one notification per
+customer, and a query count that does not grow with the batch.
+"""
+import datetime
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.availability import availability
+from api.models import Appointment, Notification, User
+
+from .base import VerdelleTestCase, make_appointment, make_service, make_staff, make_user
+
+URL = '/api/appointments/bulk-update/'
+
+
+class BulkUpdateTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login(make_staff())
+        self.service = make_service(name='Gel Manicure')
+        self.alice, self.bob = make_user(), make_user()
+
+    def post(self, ids, status, **extra):
+        return self.client.post(URL, {'ids': ids, 'status': status, **extra}, format='json')
+
+    def test_per_id_results(self):
+        pending = make_appointment(self.service, user=self.alice)
+        confirmed = make_appointment(self.service, user=self.alice, status='confirmed')
+        completed = make_appointment(self.service, user=self.bob, status='completed')
+        ids = [pending.pk, confirmed.pk, completed.pk, 999999, pending.pk]
+
+        response = self.post(ids, 'confirmed', payment_status='completed')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['results'], [
+            {'id': pending.pk, 'result': 'updated'},
+            {'id': confirmed.pk, 'result': 'unchanged'},
+            {'id': completed.pk, 'result': 'invalid_transition', 'status': 'completed'},
+            {'id': 999999, 'result': 'not_found'},
+        ])
+        pending.refresh_from_db()
+        completed.refresh_from_db()
+        self.assertEqual((pending.status, pending.payment_status), ('confirmed', 'completed'))
+        self.assertEqual(completed.status, 'completed')
+
+    def test_one_notification_per_customer(self):
+        alice_ids = [
+            make_appointment(self.service, user=self.alice, time=datetime.time(10 + i, 0)).pk for i in range(3)
+        ]
+        bob_id = make_appointment(self.service, user=self.bob).pk
+        guest_id = make_appointment(self.service).pk
+        skipped_id = make_appointment(self.service, user=self.bob, status='completed').pk
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post([*alice_ids, bob_id, guest_id, skipped_id], 'cancelled')
+        self.assertEqual(response.data['updated'], 5)
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "api_notification"')]
+        self.assertEqual(len(inserts), 1)
+
+        [alice_note] = Notification.objects.filter(user=self.alice)
+        self.assertEqual(alice_note.title, 'Appointment Cancelled')
+        self.assertIn('Your 3 appointments have been cancelled', alice_note.message)
+        self.assertEqual(alice_note.message.count('Gel Manicure'), 3)
+        [bob_note] = Notification.objects.filter(user=self.bob)
+        self.assertIn('Your Gel Manicure appointment on', bob_note.message)
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(User.objects.get(pk=self.alice.pk).unread_notifications, 1)
+        self.assertEqual(User.objects.get(pk=self.bob.pk).unread_notifications, 1)
+
+    def test_query_count_does_not_grow(self):
+        def count(n):
+            users = [make_user() for _ in range(n)]
+            ids = [make_appointment(self.service, user=user).pk for user in users]
+            with CaptureQueriesContext(connection) as queries:
+                self.post(ids, 'confirmed')
+            return len(queries)
+        self.assertEqual(count(2), count(6))
+
+    def test_cancelling_frees_the_slots(self):
+        appointment = make_appointment(self.service, user=self.alice, status='confirmed')
+        day, start = appointment.appointment_date, appointment.appointment_time
+        self.assertFalse(availability.is_available(day, start, 30))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post([appointment.pk], 'cancelled')
+        self.assertTrue(availability.is_available(day, start, 30))
+
+    def test_validation(self):
+        self.assertEqual(self.post([], 'confirmed').status_code, 400)
+        self.assertEqual(self.post([1], 'pending').status_code, 400)
+        self.assertEqual(self.post(['x'], 'confirmed').status_code, 400)
+
+    def test_staff_only(self):
+        appointment = make_appointment(self.service, user=self.alice)
+        self.login(self.alice)
+        self.assertEqual(self.post([appointment.pk], 'cancelled').status_code, 403)
+        self.assertEqual(Appointment.objects.get(pk=appointment.pk).status, 'pending')
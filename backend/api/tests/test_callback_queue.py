@@ -0,0 +1,120 @@
+"""
+Failed callbacks back off instead of being retried in a tight loop, a
+callback that beats its STK push's commit is kept for a retry, and web
+processes start draining the queue as soon as they boot.
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.apps import apps
+from django.test import override_settings
+from django.utils import timezone
+
+from api.callback_queue import drain_callbacks, process_pending_callbacks, serving_requests, start_consumer
+from api.models import MpesaCallback
+
+from .base import VerdelleTestCase, make_appointment, make_service
+
+
+def queue(n=1):
+    return [
+        MpesaCallback.objects.create(checkout_request_id=f'ws_CO_{i}', payload={'Body': {'stkCallback': {}}})
+        for i in range(n)
+    ]
+
+
+@override_settings(MPESA_CALLBACK_MAX_ATTEMPTS=3, MPESA_CALLBACK_RETRY_BACKOFF=10)
+class CallbackQueueTests(VerdelleTestCase):
+    def test_applied_callbacks_are_marked_processed(self):
+        queue(3)
+        with mock.patch('api.callback_queue.apply_stk_callback') as apply:
+            self.assertEqual(drain_callbacks(), 3)
+        self.assertEqual(apply.call_count, 3)
+        self.assertFalse(MpesaCallback.objects.filter(processed_at__isnull=True).exists())
+
+    def test_failing_batch_stops_the_drain(self):
+        queue(2)
+        with mock.patch('api.callback_queue.apply_stk_callback', side_effect=RuntimeError('db down')) as apply:
+            self.assertEqual(drain_callbacks(), 0)
+        self.assertEqual(apply.call_count, 2)
+        for entry in MpesaCallback.objects.all():
+            self.assertEqual(entry.attempts, 1)
+            self.assertIsNone(entry.processed_at)
+            self.assertEqual(entry.last_error, 'db down')
+            self.assertGreater(entry.next_attempt_at, timezone.now() + timedelta(seconds=5))
+
+    def test_retries_wait_for_the_backoff(self):
+        [entry] = queue()
+        with mock.patch('api.callback_queue.apply_stk_callback', side_effect=RuntimeError('boom')):
+            self.assertEqual(process_pending_callbacks(), (0, 1))
+            # Not due yet
+            self.assertEqual(process_pending_callbacks(), (0, 0))
+
+            MpesaCallback.objects.filter(pk=entry.pk).update(next_attempt_at=timezone.now())
+            process_pending_callbacks()
+            entry.refresh_from_db()
+            self.assertEqual(entry.attempts, 2)
+            # Doubled: 10s after the first failure, 20s after the second
+            self.assertGreater(entry.next_attempt_at, timezone.now() + timedelta(seconds=15))
+
+            MpesaCallback.objects.filter(pk=entry.pk).update(next_attempt_at=timezone.now())
+            process_pending_callbacks()
+        entry.refresh_from_db()
+        self.assertEqual(entry.attempts, 3)
+        self.assertIsNotNone(entry.processed_at)
+
+
+def stk_callback(checkout_request_id, result_code=0):
+    return {'Body': {'stkCallback': {
+        'CheckoutRequestID': checkout_request_id,
+        'ResultCode': result_code,
+        'ResultDesc': 'Processed',
+        'CallbackMetadata': {'Item': [{'Name': 'MpesaReceiptNumber', 'Value': 'RCPT1'}, {'Name': 'Amount', 'Value': 1500}]},
+    }}}
+
+
+class UnknownCheckoutTests(VerdelleTestCase):
+    def test_callback_before_the_push_is_recorded_is_retried(self):
+        entry = MpesaCallback.objects.create(checkout_request_id='ws_CO_early', payload=stk_callback('ws_CO_early'))
+        self.assertEqual(process_pending_callbacks(), (0, 1))
+        entry.refresh_from_db()
+        self.assertIsNone(entry.processed_at)
+        self.assertEqual(entry.attempts, 1)
+        self.assertIn('ws_CO_early', entry.last_error)
+        self.assertIsNotNone(entry.next_attempt_at)
+
+        # The STK push commits its CheckoutRequestID, then the retry applies
+        appointment = make_appointment(
+            make_service(), payment_status='initiated', mpesa_checkout_request_id='ws_CO_early'
+        )
+        MpesaCallback.objects.filter(pk=entry.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(process_pending_callbacks(), (1, 0))
+        appointment.refresh_from_db()
+        self.assertEqual((appointment.payment_status, appointment.mpesa_transaction_id), ('completed', 'RCPT1'))
+
+    def test_duplicate_for_a_final_payment_is_processed(self):
+        make_appointment(make_service(), payment_status='cancelled', mpesa_checkout_request_id='ws_CO_done')
+        entry = MpesaCallback.objects.create(checkout_request_id='ws_CO_done', payload=stk_callback('ws_CO_done'))
+        self.assertEqual(process_pending_callbacks(), (1, 0))
+        entry.refresh_from_db()
+        self.assertIsNotNone(entry.processed_at)
+
+
+class ConsumerStartupTests(VerdelleTestCase):
+    def test_serving_requests(self):
+        self.assertTrue(serving_requests(['/usr/bin/gunicorn', 'verdelle_nails.wsgi']))
+        self.assertTrue(serving_requests(['manage.py', 'runserver']))
+        self.assertFalse(serving_requests(['manage.py', 'migrate']))
+        self.assertFalse(serving_requests(['/app/backend/manage.py', 'test', 'api']))
+
+    def test_ready_starts_the_consumer_only_when_serving(self):
+        config = apps.get_app_config('api')
+        for serving, starts in ((True, 1), (False, 0)):
+            with mock.patch('api.callback_queue.serving_requests', return_value=serving), \
+                    mock.patch('api.callback_queue.start_consumer') as start:
+                config.ready()
+            self.assertEqual(start.call_count, starts)
+
+    @override_settings(MPESA_CALLBACK_CONSUMER='off')
+    def test_disabled_consumer(self):
+        self.assertIsNone(start_consumer())
@@ -0,0 +1,83 @@
+"""
+Catalog ETags: a matching If-None-Match is a 304 without a query, and any
+write to a model a family serializes changes that family's ETag.
+"""
+from .base import VerdelleTestCase, make_category, make_gallery_image, make_review, make_service, make_user
+
+URLS = {
+    'services': '/api/services/',
+    'service-categories': '/api/service-categories/',
+    'gallery': '/api/gallery/',
+    'reviews': '/api/reviews/',
+}
+
+
+class ConditionalGetTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = make_category()
+        self.service = make_service(category=self.category)
+        self.review = make_review(self.service)
+        make_gallery_image(service=self.service)
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def etags(self):
+        return {family: self.etag(url) for family, url in URLS.items()}
+
+    def changed_families(self, write):
+        before = self.etags()
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        after = self.etags()
+        return {family for family in URLS if before[family] != after[family]}
+
+    def test_matching_etag_is_not_modified_without_queries(self):
+        for url in URLS.values():
+            etag = self.etag(url)
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_stale_etag_gets_the_new_body(self):
+        etag = self.etag('/api/services/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.name = 'Renamed'
+            self.service.save()
+        response = self.client.get('/api/services/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Renamed', response.content.decode())
+
+    def test_service_write(self):
+        def write():
+            self.service.price = 2500
+            self.service.save()
+        self.assertEqual(self.changed_families(write), set(URLS))
+
+    def test_category_write(self):
+        def write():
+            self.category.name = 'Toes'
+            self.category.save()
+        self.assertEqual(self.changed_families(write), {'services', 'service-categories'})
+
+    def test_review_write(self):
+        def write():
+            self.review.rating = 3
+            self.review.save()
+        self.assertEqual(self.changed_families(write), {'services', 'service-categories', 'reviews'})
+
+    def test_review_delete(self):
+        self.assertEqual(self.changed_families(self.review.delete), {'services', 'service-categories', 'reviews'})
+
+    def test_unrelated_write_keeps_etags(self):
+        self.assertEqual(self.changed_families(make_user), set())
+
+    def test_credentialed_requests_are_private(self):
+        self.assertIn('public', self.client.get('/api/services/')['Cache-Control'])
+        response = self.client.get('/api/services/', HTTP_AUTHORIZATION='Bearer token')
+        self.assertIn('private', response['Cache-Control'])
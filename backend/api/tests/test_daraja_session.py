@@ -0,0 +1,87 @@
+"""
+Daraja calls share one keep-alive session per process, against the local
+stub from benchmarks/: one TCP connection serves the token fetch and every
+STK push, and each request carries the configured timeouts.
+"""
+import threading
+from unittest import mock
+
+from django.test import override_settings
+
+from api.mpesa import MpesaClient, get_http_session
+from benchmarks.stub_daraja import StubDarajaServer
+
+from .base import VerdelleTestCase
+
+
+class CountingStub(StubDarajaServer):
+    """Stub Daraja that counts accepted TCP connections"""
+    connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+    def handle_error(self, request, client_address):
+        # A client that timed out closes the socket before the stub answers
+        pass
+
+
+def start_counting_stub(latency=0.0):
+    server = CountingStub(('127.0.0.1', 0), latency=latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class DarajaSessionTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stub = start_counting_stub()
+        self.addCleanup(self.stub.server_close)
+        self.addCleanup(self.stub.shutdown)
+        # A session of our own, so pooled sockets never outlive the stub
+        self.enterContext(mock.patch('api.mpesa._session', None))
+        self.enterContext(override_settings(MPESA_API_BASE_URL=self.stub.base_url))
+
+    def push(self, client):
+        return client.stk_push('0712345678', 1500, 'Verdelle Nails', 'Payment')
+
+    def test_calls_reuse_one_connection(self):
+        clients = [MpesaClient(), MpesaClient()]
+        for i in range(6):
+            self.assertTrue(self.push(clients[i % 2])['success'])
+        self.assertEqual(self.stub.counts['/mpesa/stkpush/v1/processrequest'], 6)
+        self.assertEqual(self.stub.counts['/oauth/v1/generate'], 1)
+        self.assertEqual(self.stub.connections, 1)
+        self.assertIs(clients[0].session, clients[1].session)
+
+    @override_settings(MPESA_HTTP_POOL_SIZE=7)
+    def test_pool_size(self):
+        adapter = get_http_session().get_adapter('https://sandbox.safaricom.co.ke')
+        self.assertEqual(adapter._pool_maxsize, 7)
+        # Daraja calls are not idempotent, so the adapter never retries them
+        self.assertEqual(adapter.max_retries.total, 0)
+
+    @override_settings(MPESA_CONNECT_TIMEOUT=2, MPESA_READ_TIMEOUT=7)
+    def test_every_request_carries_the_timeouts(self):
+        client = MpesaClient()
+        with mock.patch.object(get_http_session(), 'request', wraps=get_http_session().request) as request:
+            self.push(client)
+        self.assertEqual(request.call_count, 2)
+        for call in request.call_args_list:
+            self.assertEqual(call.kwargs['timeout'], (2, 7))
+
+
+class DarajaTimeoutTests(VerdelleTestCase):
+    def test_slow_daraja_fails_fast_without_a_retry(self):
+        stub = start_counting_stub(latency=0.5)
+        self.addCleanup(stub.server_close)
+        self.addCleanup(stub.shutdown)
+        self.enterContext(mock.patch('api.mpesa._session', None))
+        self.enterContext(override_settings(MPESA_API_BASE_URL=stub.base_url, MPESA_READ_TIMEOUT=0.1))
+        client = MpesaClient()
+        with mock.patch.object(client, 'get_access_token', return_value='token'):
+            result = client.stk_push('0712345678', 1500, 'Verdelle Nails', 'Payment')
+        self.assertFalse(result['success'])
+        self.assertIn('Network error', result['error'])
+        self.assertEqual(stub.counts['/mpesa/stkpush/v1/processrequest'], 1)
@@ -0,0 +1,76 @@
+"""
+Streamed exports contain exactly the rows of the filtered queryset.
+"""
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import override_settings
+
+from api.models import Appointment, Transaction
+from api.views import APPOINTMENT_EXPORT_COLUMNS, TRANSACTION_EXPORT_COLUMNS
+
+from .base import VerdelleTestCase, make_appointment, make_service, make_staff, make_transaction, make_user
+
+
+def csv_value(value):
+    return '' if value is None else str(value)
+
+
+# Several database chunks per export
+@override_settings(EXPORT_CHUNK_SIZE=3)
+class ExportTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = make_user()
+        service = make_service()
+        for i in range(8):
+            appointment = make_appointment(
+                service, user=self.customer, status='cancelled' if i % 3 == 0 else 'confirmed', notes=f'Line, "{i}"\nnext'
+            )
+            make_transaction(self.customer if i % 2 else make_user(), appointment=appointment)
+
+    def export(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def expected(self, queryset, columns):
+        return list(queryset.values_list(*columns))
+
+    def assertCSV(self, url, queryset, columns):
+        rows = list(csv.reader(io.StringIO(self.export(url))))
+        self.assertEqual(rows[0], [column.replace('__', '_') for column in columns])
+        self.assertEqual(rows[1:], [[csv_value(v) for v in row] for row in self.expected(queryset, columns)])
+
+    def assertNDJSON(self, url, queryset, columns):
+        lines = self.export(url).splitlines()
+        labels = [column.replace('__', '_') for column in columns]
+        expected = [
+            json.loads(json.dumps(dict(zip(labels, row)), cls=DjangoJSONEncoder))
+            for row in self.expected(queryset, columns)
+        ]
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+    def test_appointments_csv(self):
+        self.login(make_staff())
+        queryset = Appointment.objects.order_by('-appointment_date', '-appointment_time', 'id')
+        self.assertCSV('/api/appointments/export/?format=csv', queryset, APPOINTMENT_EXPORT_COLUMNS)
+
+    def test_appointments_ndjson_filtered(self):
+        self.login(make_staff())
+        queryset = Appointment.objects.filter(status='cancelled').order_by('-appointment_date', '-appointment_time', 'id')
+        self.assertNDJSON('/api/appointments/export/?format=ndjson&status=cancelled', queryset, APPOINTMENT_EXPORT_COLUMNS)
+
+    def test_transactions_ndjson(self):
+        self.login(make_staff())
+        queryset = Transaction.objects.order_by('-initiated_at', 'id')
+        self.assertNDJSON('/api/transactions/export/?format=ndjson', queryset, TRANSACTION_EXPORT_COLUMNS)
+
+    def test_customer_exports_only_their_transactions(self):
+        self.login(self.customer)
+        queryset = Transaction.objects.filter(user=self.customer).order_by('-initiated_at', 'id')
+        self.assertEqual(queryset.count(), 4)
+        self.assertCSV('/api/transactions/export/?format=csv', queryset, TRANSACTION_EXPORT_COLUMNS)
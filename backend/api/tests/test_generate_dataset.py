@@ -0,0 +1,86 @@
+"""
+generate_dataset bulk-loads a synthetic dataset with explicit primary keys;
+afterwards the ORM must still be able to create rows of its own.
+"""
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Max
+
+from api.models import Appointment, Notification, Review, Service, Transaction, User
+
+from .base import VerdelleTestCase, make_transaction, make_user
+
+
+class GenerateDatasetTests(VerdelleTestCase):
+    def generate(self, *args):
+        out = StringIO()
+        call_command('generate_dataset', '--no-gallery', *args, stdout=out)
+        return out.getvalue()
+
+    def test_small_scale_load(self):
+        out = self.generate('--scale', '0.01', '--batch-size', '25')
+        self.assertIn('Loaded 10 users', out)
+        self.assertEqual(User.objects.filter(username__startswith='gen0-').count(), 10)
+        self.assertEqual(Appointment.objects.count(), 100)
+        self.assertTrue(Service.objects.filter(is_active=True).exists())
+
+        # Every booking is for a catalog service and every payment for a booking
+        self.assertFalse(Appointment.objects.filter(service__isnull=True).exists())
+        self.assertTrue(Transaction.objects.exists())
+        self.assertFalse(Transaction.objects.exclude(appointment__in=Appointment.objects.all()).exists())
+        paid = Appointment.objects.filter(payment_status='completed')
+        self.assertEqual(
+            Transaction.objects.filter(status='completed').count(),
+            paid.filter(user__isnull=False).count(),
+        )
+        self.assertTrue(Notification.objects.exists())
+
+        # No two bookings share a slot
+        slots = Appointment.objects.values_list('appointment_date', 'appointment_time')
+        self.assertEqual(len(set(slots)), 100)
+
+    def test_orm_creates_after_the_load(self):
+        self.generate('--scale', '0.01')
+        loaded = {
+            model: model.objects.aggregate(Max('pk'))['pk__max']
+            for model in (User, Appointment, Transaction)
+        }
+
+        user = make_user()
+        appointment = Appointment.objects.create(
+            user=user,
+            customer_name='Amani Otieno',
+            customer_email='amani@example.com',
+            customer_phone='0712345678',
+            service=Service.objects.first(),
+            appointment_date=datetime.date(2040, 1, 2),
+            appointment_time=datetime.time(10, 0),
+        )
+        transaction = make_transaction(user, appointment=appointment)
+
+        self.assertGreater(user.pk, loaded[User])
+        self.assertGreater(appointment.pk, loaded[Appointment])
+        self.assertGreater(transaction.pk, loaded[Transaction])
+
+    def test_second_seed_loads_alongside(self):
+        self.generate('--scale', '0.01')
+        self.generate('--scale', '0.01', '--seed', '1')
+        self.assertEqual(User.objects.filter(username__startswith='gen').count(), 20)
+        self.assertEqual(Appointment.objects.count(), 200)
+        self.assertEqual(len(set(Appointment.objects.values_list('appointment_date', 'appointment_time'))), 200)
+
+    def test_seed_already_loaded(self):
+        self.generate('--scale', '0.01')
+        with self.assertRaises(CommandError):
+            self.generate('--scale', '0.01')
+
+    def test_catalog_only(self):
+        out = self.generate('--catalog-only')
+        self.assertIn('Catalog:', out)
+        self.assertTrue(Service.objects.exists())
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Appointment.objects.exists())
+        self.assertFalse(Review.objects.exists())
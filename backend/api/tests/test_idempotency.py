@@ -0,0 +1,136 @@
+"""
+Idempotent payment initiation: one Daraja call per payment attempt, however
+often or concurrently the client retries.
+"""
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
+
+from api.idempotency import in_flight_cache_key
+from api.models import Appointment
+from api.views import initiate_payment
+
+from .base import VerdelleTestCase, make_appointment, make_service
+
+URL = '/api/mpesa/initiate/'
+PHONE = '254712345678'
+
+
+@override_settings(MPESA_ASYNC_STK_PUSH=False)
+class PaymentIdempotencyTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.appointment = make_appointment(make_service())
+        self.calls = 0
+        self.stk_result = {'success': True, 'CheckoutRequestID': 'ws_CO_1', 'MerchantRequestID': 'm-1'}
+        self.stk_delay = 0
+        patcher = mock.patch('api.views.get_mpesa_client')
+        patcher.start().return_value.astk_push = self.astk_push
+        self.addCleanup(patcher.stop)
+
+    async def astk_push(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.stk_delay)
+        if isinstance(self.stk_result, Exception):
+            raise self.stk_result
+        return self.stk_result
+
+    def initiate(self, key=None, phone_number=PHONE):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key is not None else {}
+        body = {'appointment_id': self.appointment.pk, 'phone_number': phone_number}
+        return self.client.post(URL, body, format='json', **headers)
+
+    def set_status(self, payment_status):
+        Appointment.objects.filter(pk=self.appointment.pk).update(payment_status=payment_status)
+
+    def test_same_key_is_replayed(self):
+        first = self.initiate('key-1')
+        self.assertEqual(first.status_code, 200)
+        self.set_status('failed')
+
+        # The explicit key replays even once the push is no longer in flight
+        second = self.initiate('key-1')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(self.calls, 1)
+
+    def test_reused_key_with_a_different_body(self):
+        self.initiate('key-1')
+        response = self.initiate('key-1', phone_number='254700000000')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.calls, 1)
+
+    def test_failed_response_is_replayed_to_its_key_only(self):
+        self.stk_result = {'success': False, 'error': 'Invalid phone'}
+        self.assertEqual(self.initiate('key-1').status_code, 400)
+        self.assertEqual(self.initiate('key-1')['Idempotent-Replayed'], 'true')
+        self.stk_result = {'success': True, 'CheckoutRequestID': 'ws_CO_2'}
+        self.assertEqual(self.initiate().status_code, 200)
+        self.assertEqual(self.calls, 2)
+
+    def test_keyless_retry_is_replayed_while_in_flight(self):
+        first = self.initiate()
+        for payment_status in ('initiated', 'initiating'):
+            self.set_status(payment_status)
+            response = self.initiate()
+            self.assertEqual(response['Idempotent-Replayed'], 'true')
+            self.assertEqual(response.json(), first.json())
+        self.assertEqual(self.calls, 1)
+
+        # A new phone number is a new attempt
+        self.set_status('initiated')
+        self.assertNotIn('Idempotent-Replayed', self.initiate(phone_number='254700000000'))
+        self.assertEqual(self.calls, 2)
+
+    def test_keyless_retry_after_failure_sends_a_new_push(self):
+        self.initiate()
+        self.set_status('failed')
+        response = self.initiate()
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(self.calls, 2)
+
+    def test_request_in_flight_is_not_repeated(self):
+        cache.add(in_flight_cache_key(self.appointment.pk), 1)
+        response = self.initiate('key-1')
+        self.assertEqual(response.status_code, 202)
+        self.assertIn('already being processed', response.json()['message'])
+        self.assertEqual(self.calls, 0)
+
+    def test_concurrent_requests_with_one_key(self):
+        self.stk_delay = 0.2
+        factory = RequestFactory()
+
+        def request():
+            body = json.dumps({'appointment_id': self.appointment.pk, 'phone_number': PHONE})
+            return factory.post(URL, body, content_type='application/json', HTTP_IDEMPOTENCY_KEY='key-1')
+
+        async def both():
+            return await asyncio.gather(initiate_payment(request()), initiate_payment(request()))
+
+        responses = async_to_sync(both)()
+        self.assertEqual(sorted(r.status_code for r in responses), [200, 202])
+        self.assertEqual(self.calls, 1)
+        # The winner's response is what the next retry gets
+        self.assertEqual(self.initiate('key-1')['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.calls, 1)
+
+    def test_error_releases_the_claim(self):
+        self.stk_result = RuntimeError('connection reset')
+        self.assertEqual(self.initiate('key-1').status_code, 500)
+        self.assertIsNone(cache.get(in_flight_cache_key(self.appointment.pk)))
+
+        # A 5xx is not stored, so the same key tries again
+        self.stk_result = {'success': True, 'CheckoutRequestID': 'ws_CO_2'}
+        response = self.initiate('key-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(self.calls, 2)
+
+    def test_invalid_key(self):
+        self.assertEqual(self.initiate('x' * 256).status_code, 400)
+        self.assertEqual(self.calls, 0)
@@ -0,0 +1,89 @@
+"""
+Serialized srcsets come from the recorded derivative name on the row, never
+from a storage lookup per image.
+"""
+import importlib
+import tempfile
+from unittest import mock
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+
+from api.images import create_pool, derivative_name, derivative_widths, record_derivatives, srcset_for
+from api.models import GalleryImage
+from api.signals import derivatives_done
+
+from .base import VerdelleTestCase, make_gallery_image
+
+
+class DerivativeRecordTests(VerdelleTestCase):
+    def test_srcset_only_for_the_recorded_image(self):
+        image = make_gallery_image()
+        self.assertIsNone(srcset_for(image.image))
+        self.assertEqual(record_derivatives(GalleryImage, 'image', image.image.name), 1)
+        image.refresh_from_db()
+        srcset = srcset_for(image.image)
+        self.assertEqual(sorted(srcset), ['jpeg', 'srcset', 'webp'])
+        self.assertIn(' 320w, ', srcset['srcset']['webp'])
+
+        # A new upload has no derivatives until its own job finishes
+        image.image = 'gallery/replacement.jpg'
+        self.assertIsNone(srcset_for(image.image))
+
+    def test_record_skips_rows_with_another_image(self):
+        image = make_gallery_image()
+        name = image.image.name
+        GalleryImage.objects.filter(pk=image.pk).update(image='gallery/newer.jpg')
+        self.assertEqual(record_derivatives(GalleryImage, 'image', name), 0)
+        self.assertEqual(GalleryImage.objects.get(pk=image.pk).image_derivatives, '')
+
+    def test_gallery_list_does_not_touch_storage(self):
+        for _ in range(3):
+            record_derivatives(GalleryImage, 'image', make_gallery_image().image.name)
+        make_gallery_image()
+        with mock.patch('api.images.default_storage.exists', side_effect=AssertionError('storage lookup')):
+            response = self.client.get('/api/gallery/')
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual(sum(row['image_srcset'] is not None for row in rows), 3)
+
+    def test_finished_job_records_and_changes_the_etag(self):
+        image = make_gallery_image()
+        etag = self.client.get('/api/gallery/')['ETag']
+        with mock.patch('api.signals.connections.close_all'):
+            derivatives_done(GalleryImage, 'image', image.image.name)
+        self.assertEqual(GalleryImage.objects.get(pk=image.pk).image_derivatives, image.image.name)
+        self.assertNotEqual(self.client.get('/api/gallery/')['ETag'], etag)
+
+    def test_saving_a_recorded_image_schedules_nothing(self):
+        with mock.patch('api.signals.schedule_derivatives') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                image = make_gallery_image()
+            self.assertEqual(schedule.call_count, 1)
+            record_derivatives(GalleryImage, 'image', image.image.name)
+            image.refresh_from_db()
+            with self.captureOnCommitCallbacks(execute=True):
+                image.title = 'Renamed'
+                image.save()
+            self.assertEqual(schedule.call_count, 1)
+
+
+class BackfillMigrationTests(VerdelleTestCase):
+    def test_backfill_records_images_with_finished_derivatives(self):
+        migration = importlib.import_module('api.migrations.0021_image_derivatives')
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        with override_settings(MEDIA_ROOT=root.name):
+            done, pending = make_gallery_image(), make_gallery_image()
+            # The migration's copy of the naming scheme must find what images.py writes
+            default_storage.save(derivative_name(done.image.name, derivative_widths()[-1], 'jpeg'), ContentFile(b'x'))
+            migration.record_existing_derivatives(apps, None)
+
+        self.assertEqual(GalleryImage.objects.get(pk=done.pk).image_derivatives, done.image.name)
+        self.assertEqual(GalleryImage.objects.get(pk=pending.pk).image_derivatives, '')
+
+    def test_pool_spawns_its_processes(self):
+        with create_pool(1) as pool:
+            self.assertEqual(pool._mp_context.get_start_method(), 'spawn')
@@ -0,0 +1,88 @@
+"""
+The hot lookups of migration 0013 are answered from its indexes.
+
+PostgreSQL only. Sequential scans are disabled for each EXPLAIN, so the test
+checks that every lookup can use its index (the partial index predicates
+match the queries the app sends) without depending on table statistics.
+"""
+import datetime
+import re
+from unittest import skipUnless
+
+from django.db import connection
+
+from api.models import Appointment, Notification, Review
+
+from .base import VerdelleTestCase, make_notification, make_review, make_service, make_user
+
+ROWS = 500
+
+SCAN_RE = re.compile(r'(?:Index Scan|Index Only Scan) using (\w+)|Bitmap Index Scan on (\w+)')
+
+
+def index_scans(queryset):
+    """Names of the indexes an EXPLAIN of ``queryset`` scans"""
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    return {name for pair in SCAN_RE.findall(queryset.explain()) for name in pair if name}
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN plans are checked on PostgreSQL')
+class HotLookupIndexTests(VerdelleTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        others = [make_user() for _ in range(3)]
+        service = make_service(duration=30)
+        start = datetime.date(2030, 1, 1)
+        Appointment.objects.bulk_create([
+            Appointment(
+                user=(others + [cls.user])[i % 4], service=service, duration=30,
+                customer_name=f'Customer {i}', customer_email=f'c{i}@example.com', customer_phone='0712345678',
+                appointment_date=start + datetime.timedelta(days=i // 16),
+                appointment_time=datetime.time(9 + (i % 16) // 2, 30 * (i % 2)),
+                status='cancelled' if i % 5 == 0 else 'confirmed',
+                mpesa_checkout_request_id=f'ws_CO_{i}' if i % 3 else '',
+                mpesa_transaction_id=f'RCPT{i}' if i % 3 == 1 else '',
+            )
+            for i in range(ROWS)
+        ])
+        for i in range(ROWS // 10):
+            make_notification(cls.user, is_read=bool(i % 2))
+            make_review(service, is_approved=bool(i % 2))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, queryset, name):
+        scans = index_scans(queryset)
+        self.assertIn(name, scans, queryset.explain())
+
+    def test_checkout_request_lookup(self):
+        # payments.apply_stk_result
+        self.assertUsesIndex(Appointment.objects.filter(mpesa_checkout_request_id='ws_CO_7'), 'appt_checkout_request_idx')
+
+    def test_receipt_lookup(self):
+        # Duplicate receipt checks in verify_manual_payment
+        self.assertUsesIndex(Appointment.objects.filter(mpesa_transaction_id='RCPT7'), 'appt_mpesa_receipt_idx')
+
+    def test_active_slots_of_a_day(self):
+        # availability.AvailabilityIndex._load
+        queryset = (
+            Appointment.objects.filter(appointment_date=datetime.date(2030, 1, 5))
+            .exclude(status='cancelled')
+            .values_list('id', 'appointment_time', 'duration')
+        )
+        self.assertUsesIndex(queryset, 'appt_active_slot_idx')
+
+    def test_user_appointments(self):
+        # A page of a customer's GET /api/appointments/
+        queryset = Appointment.objects.filter(user=self.user).order_by('-appointment_date', '-appointment_time')[:12]
+        self.assertUsesIndex(queryset, 'appt_user_date_idx')
+
+    def test_unread_notifications(self):
+        queryset = Notification.objects.filter(user=self.user, is_read=False).order_by('-created_at')[:12]
+        self.assertUsesIndex(queryset, 'notif_user_read_recent_idx')
+
+    def test_approved_reviews(self):
+        queryset = Review.objects.filter(is_approved=True).order_by('-created_at')[:12]
+        self.assertUsesIndex(queryset, 'review_approved_recent_idx')
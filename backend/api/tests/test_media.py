@@ -0,0 +1,64 @@
+"""
+/media/ Range handling: one satisfiable range is a 206, an unsatisfiable one
+a 416, and anything else (several ranges, malformed) the whole file.
+"""
+import tempfile
+from pathlib import Path
+
+from django.test import RequestFactory, override_settings
+
+from verdelle_nails.media import serve_media
+
+from .base import VerdelleTestCase
+
+
+class MediaRangeTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.body = bytes(range(256)) * 4
+        Path(root.name, 'photo.jpg').write_bytes(self.body)
+        self.enterContext(override_settings(MEDIA_ROOT=root.name, ASGI_MODE=False))
+
+    def get(self, byte_range=None, **headers):
+        if byte_range is not None:
+            headers['HTTP_RANGE'] = byte_range
+        response = serve_media(RequestFactory().get('/media/photo.jpg', **headers), 'photo.jpg')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_single_range(self):
+        response, body = self.get('bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.body)}')
+        self.assertEqual(body, self.body[10:20])
+
+    def test_suffix_and_open_ranges(self):
+        self.assertEqual(self.get('bytes=-5')[1], self.body[-5:])
+        self.assertEqual(self.get('bytes=1020-')[1], self.body[1020:])
+        # An end past the file is clamped
+        self.assertEqual(self.get('bytes=1000-5000')[1], self.body[1000:])
+
+    def test_multiple_ranges_get_the_whole_file(self):
+        response, body = self.get('bytes=0-1,5-6')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Content-Range'))
+        self.assertEqual(body, self.body)
+
+    def test_malformed_range_gets_the_whole_file(self):
+        for header in ('bytes=abc', 'items=0-1', 'bytes=-'):
+            response, body = self.get(header)
+            self.assertEqual(response.status_code, 200, header)
+            self.assertEqual(body, self.body)
+
+    def test_unsatisfiable_range(self):
+        for header in (f'bytes={len(self.body)}-', 'bytes=20-10'):
+            response, _ = self.get(header)
+            self.assertEqual(response.status_code, 416, header)
+            self.assertEqual(response['Content-Range'], f'bytes */{len(self.body)}')
+
+    def test_if_range_mismatch_gets_the_whole_file(self):
+        response, body = self.get('bytes=0-1', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.body)
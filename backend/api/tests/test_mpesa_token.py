@@ -0,0 +1,115 @@
+"""
+The Daraja OAuth token is fetched once and shared: concurrent misses make a
+single token request, and the token is refreshed ahead of its expiry.
+"""
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from api.mpesa import AccessTokenCache, MpesaClient, get_http_session
+
+from .base import VerdelleTestCase
+
+
+class FakeClient:
+    """The attributes AccessTokenCache reads, with a slow, counted token request"""
+    base_url = 'https://sandbox.example'
+    consumer_key = 'key'
+
+    def __init__(self, expires_in=3599, delay=0):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def request_access_token(self):
+        with self._lock:
+            self.requests += 1
+            token = f'token-{self.requests}'
+        time.sleep(self.delay)
+        return token, self.expires_in
+
+
+@override_settings(MPESA_TOKEN_REFRESH_MARGIN=60, MPESA_TOKEN_LOCK_TIMEOUT=5)
+class AccessTokenCacheTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tokens = AccessTokenCache()
+
+    def test_concurrent_misses_make_one_request(self):
+        client = FakeClient(delay=0.2)
+        start = threading.Barrier(8)
+        results = []
+
+        def fetch():
+            start.wait()
+            results.append(self.tokens.get_token(client))
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(client.requests, 1)
+        self.assertEqual(results, ['token-1'] * 8)
+        self.assertEqual(self.tokens.stats(), {'hits': 7, 'misses': 1})
+
+    def test_waits_for_another_worker_to_refresh(self):
+        client = FakeClient()
+        key = AccessTokenCache._cache_key(client)
+        # Another worker holds the refresh lock and publishes its token shortly
+        cache.add(f'{key}:lock', 1)
+        publish = threading.Timer(0.3, cache.set, (key, {'token': 'theirs', 'expires_at': time.time() + 3599}))
+        publish.start()
+        self.addCleanup(publish.cancel)
+
+        self.assertEqual(self.tokens.get_token(client), 'theirs')
+        self.assertEqual(client.requests, 0)
+        self.assertEqual(self.tokens.stats(), {'hits': 1, 'misses': 0})
+
+    def test_other_processes_reuse_the_shared_token(self):
+        client = FakeClient()
+        self.tokens.get_token(client)
+        # A fresh process has nothing in memory but finds the token in the cache
+        self.assertEqual(AccessTokenCache().get_token(client), 'token-1')
+        self.assertEqual(client.requests, 1)
+
+    def test_refreshes_before_expiry(self):
+        client = FakeClient(expires_in=3600)
+        now = time.time()
+        with mock.patch('api.mpesa.time.time', return_value=now):
+            self.assertEqual(self.tokens.get_token(client), 'token-1')
+        # Still inside the refresh margin
+        with mock.patch('api.mpesa.time.time', return_value=now + 3539):
+            self.assertEqual(self.tokens.get_token(client), 'token-1')
+        # 60 s before Daraja would expire it
+        with mock.patch('api.mpesa.time.time', return_value=now + 3541):
+            self.assertEqual(self.tokens.peek(client), None)
+            self.assertEqual(self.tokens.get_token(client), 'token-2')
+        self.assertEqual(self.tokens.stats(), {'hits': 1, 'misses': 2})
+
+    def test_invalidate(self):
+        client = FakeClient()
+        self.tokens.get_token(client)
+        self.tokens.invalidate(client)
+        self.assertEqual(self.tokens.get_token(client), 'token-2')
+
+    def test_failed_request_is_not_cached(self):
+        client = FakeClient()
+        with mock.patch.object(client, 'request_access_token', return_value=(None, 0)):
+            self.assertIsNone(self.tokens.get_token(client))
+        self.assertEqual(self.tokens.get_token(client), 'token-1')
+
+
+class ClientSessionTests(VerdelleTestCase):
+    def test_client_built_before_a_fork_uses_the_child_session(self):
+        client = MpesaClient()
+        parent_session = client.session
+        self.assertIs(parent_session, get_http_session())
+        with mock.patch('api.mpesa.os.getpid', return_value=-1):
+            self.assertIsNot(client.session, parent_session)
+            self.assertIs(client.session, get_http_session())
@@ -0,0 +1,105 @@
+"""
+The per-user unread counter follows every write path, and
+reconcile_unread_counts repairs it when something bypasses them.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+
+from api.models import Notification, User
+from api.notifications import create_notifications, reconcile_unread_counts, set_read
+
+from .base import VerdelleTestCase, make_notification, make_user
+
+
+class UnreadCounterTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.other = make_user()
+
+    def counter(self, user=None):
+        return User.objects.get(pk=(user or self.user).pk).unread_notifications
+
+    def assertExact(self, user=None):
+        user = user or self.user
+        actual = Notification.objects.filter(user=user, is_read=False).count()
+        self.assertEqual(self.counter(user), actual)
+        return actual
+
+    def unread_badge(self):
+        # Authentication loads the counter with the user row
+        self.login(User.objects.get(pk=self.user.pk))
+        return self.client.get('/api/notifications/unread-count/').data['unread_count']
+
+    def test_create(self):
+        make_notification(self.user)
+        make_notification(self.user)
+        make_notification(self.user, is_read=True)
+        create_notifications([Notification(user=self.user, title='Bulk', message='m') for _ in range(3)])
+        create_notifications([Notification(user=self.other, title='Bulk', message='m', is_read=True)])
+        self.assertEqual(self.assertExact(), 5)
+        self.assertEqual(self.assertExact(self.other), 0)
+        self.assertEqual(self.unread_badge(), 5)
+
+    def test_mark_read_and_unread(self):
+        first, second = make_notification(self.user), make_notification(self.user)
+        self.login(self.user)
+        url = f'/api/notifications/{first.pk}/'
+        self.assertEqual(self.client.patch(url, {'is_read': True}).status_code, 200)
+        self.assertEqual(self.assertExact(), 1)
+        # Marking an already read notification read again changes nothing
+        self.client.patch(url, {'is_read': True})
+        self.assertEqual(self.assertExact(), 1)
+        self.client.patch(url, {'is_read': False})
+        self.assertEqual(self.assertExact(), 2)
+        self.client.patch(f'/api/notifications/{second.pk}/', {'title': 'Edited'})
+        self.assertEqual(self.assertExact(), 2)
+
+    def test_mark_all_read(self):
+        for _ in range(4):
+            make_notification(self.user)
+        make_notification(self.other)
+        self.login(self.user)
+        self.assertEqual(self.client.post('/api/notifications/mark_all_read/').data['marked'], 4)
+        self.assertEqual(self.client.post('/api/notifications/mark_all_read/').data['marked'], 0)
+        self.assertEqual(self.assertExact(), 0)
+        self.assertEqual(self.assertExact(self.other), 1)
+        self.assertEqual(self.unread_badge(), 0)
+
+    def test_delete(self):
+        unread, read = make_notification(self.user), make_notification(self.user, is_read=True)
+        unread.delete()
+        read.delete()
+        self.assertEqual(self.assertExact(), 0)
+
+    def test_set_read_counts_changed_rows_only(self):
+        for _ in range(3):
+            make_notification(self.user)
+        make_notification(self.other)
+        self.assertEqual(set_read(Notification.objects.all()), 4)
+        self.assertEqual(set_read(Notification.objects.filter(user=self.user), is_read=False), 3)
+        self.assertEqual(self.assertExact(), 3)
+        self.assertEqual(self.assertExact(self.other), 0)
+
+    def test_reconcile_repairs_drift(self):
+        for _ in range(3):
+            make_notification(self.user)
+        # Bypasses the counter
+        Notification.objects.filter(user=self.user).update(is_read=True)
+        Notification.objects.bulk_create([Notification(user=self.other, title='Raw', message='m')])
+        self.assertEqual(self.counter(), 3)
+        self.assertEqual(self.counter(self.other), 0)
+
+        self.assertEqual(reconcile_unread_counts(batch_size=1), 2)
+        self.assertExact()
+        self.assertExact(self.other)
+        self.assertEqual(reconcile_unread_counts(), 0)
+
+    def test_reconcile_command(self):
+        make_notification(self.user)
+        User.objects.filter(pk=self.user.pk).update(unread_notifications=7)
+        out = StringIO()
+        call_command('reconcile_unread_notifications', '--once', stdout=out)
+        self.assertIn('Corrected 1', out.getvalue())
+        self.assertEqual(self.assertExact(), 1)
@@ -0,0 +1,105 @@
+"""
+Cursor pages key on every column of the ordering, so rows sharing the
+leading column (appointments on one date) page without gaps or repeats,
+and timestamps keep their microseconds.
+"""
+from datetime import date, time, timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .base import VerdelleTestCase, make_appointment, make_notification, make_service, make_staff, make_transaction
+
+DAY = date(2030, 3, 1)
+
+
+class CursorPaginationTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login(make_staff())
+        service = make_service(duration=15)
+        # 9 on one date, two of them sharing a time, and 3 on the next day
+        slots = [(DAY, time(9 + i // 2, 0)) for i in range(9)]
+        slots += [(date(2030, 3, 2), time(10 + i, 0)) for i in range(3)]
+        self.appointments = [
+            make_appointment(service, date=day, time=at, status='cancelled' if i % 2 else 'pending')
+            for i, (day, at) in enumerate(slots)
+        ]
+        self.expected = [
+            a.id for a in sorted(
+                self.appointments, key=lambda a: (-a.appointment_date.toordinal(), -self.seconds(a), a.id)
+            )
+        ]
+
+    @staticmethod
+    def seconds(appointment):
+        at = appointment.appointment_time
+        return at.hour * 3600 + at.minute * 60
+
+    def walk(self, url, link):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            ids.append([row['id'] for row in response.data['results']])
+            url = response.data[link]
+        return ids
+
+    def test_pages_forward_through_ties(self):
+        pages = self.walk('/api/appointments/?pagination=cursor&page_size=2', 'next')
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertTrue(all(len(page) == 2 for page in pages))
+
+    def test_pages_back_through_ties(self):
+        response = None
+        url = '/api/appointments/?pagination=cursor&page_size=2'
+        while url:
+            response = self.client.get(url)
+            url = response.data['next']
+        pages = self.walk(response.data['previous'], 'previous')
+        self.assertEqual(sum(reversed(pages), []), self.expected[:-2])
+
+    def test_cursor_filters_on_every_ordering_column(self):
+        first = self.client.get('/api/appointments/?pagination=cursor&page_size=3')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data['next'])
+        select = next(q['sql'] for q in queries if 'FROM "api_appointment"' in q['sql'])
+        where = select.split(' WHERE ', 1)[1]
+        for column in ('"appointment_date"', '"appointment_time"', '"id"'):
+            self.assertIn(column, where)
+        self.assertNotIn('OFFSET', select)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/appointments/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class TimestampCursorTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = self.login(make_staff())
+        # Keys that differ only below the millisecond
+        self.base = timezone.now().replace(microsecond=123000)
+
+    def stamp(self, rows, field):
+        for i, row in enumerate(rows):
+            type(row).objects.filter(pk=row.pk).update(**{field: self.base + timedelta(microseconds=900 - 2 * i)})
+        return [row.pk for row in rows]
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_transactions(self):
+        expected = self.stamp([make_transaction(self.staff) for _ in range(5)], 'initiated_at')
+        self.assertEqual(self.walk('/api/transactions/?pagination=cursor&page_size=2'), expected)
+
+    def test_notifications(self):
+        expected = self.stamp([make_notification(self.staff) for _ in range(5)], 'created_at')
+        self.assertEqual(self.walk('/api/notifications/?pagination=cursor&page_size=2'), expected)
@@ -0,0 +1,47 @@
+"""
+GET /api/mpesa/status/<id>/wait/: held until the payment status changes on
+ASGI workers, answered at once under WSGI so no worker thread is pinned.
+"""
+import time
+
+from django.test import override_settings
+
+from .base import VerdelleTestCase, make_appointment, make_service
+
+
+class WaitForPaymentStatusTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.appointment = make_appointment(make_service(), payment_status='initiated')
+        self.url = f'/api/mpesa/status/{self.appointment.pk}/wait/'
+
+    def timed_get(self, **params):
+        started = time.monotonic()
+        response = self.client.get(self.url, params)
+        return response, time.monotonic() - started
+
+    @override_settings(ASGI_MODE=False)
+    def test_wsgi_answers_without_waiting(self):
+        response, elapsed = self.timed_get(timeout=25)
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(elapsed, 1)
+        data = response.json()
+        self.assertEqual((data['payment_status'], data['changed'], data['long_poll']), ('initiated', False, False))
+
+    @override_settings(ASGI_MODE=True, PAYMENT_WAIT_RECHECK_INTERVAL=0.05)
+    def test_asgi_holds_until_timeout(self):
+        response, elapsed = self.timed_get(timeout=0.3)
+        self.assertGreaterEqual(elapsed, 0.3)
+        data = response.json()
+        self.assertEqual((data['changed'], data['long_poll']), (False, True))
+
+    @override_settings(ASGI_MODE=True)
+    def test_changed_status_returns_at_once(self):
+        response, elapsed = self.timed_get(timeout=25, status='initiating')
+        self.assertLess(elapsed, 1)
+        data = response.json()
+        self.assertEqual((data['payment_status'], data['changed'], data['long_poll']), ('initiated', True, True))
+
+    def test_unknown_appointment(self):
+        response = self.client.get('/api/mpesa/status/999999/wait/')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,100 @@
+"""
+List endpoints run a fixed number of queries however many rows they return.
+
+Each case lists N rows, adds N more and lists again; a serializer that
+touches an unprefetched relation per row makes the second count larger.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base import (
+    VerdelleTestCase, make_appointment, make_category, make_gallery_image, make_notification, make_review,
+    make_service, make_staff, make_transaction, make_user,
+)
+
+# Both sizes fit on one page (PAGE_SIZE is 12)
+ROWS = 3
+
+
+class ListQueryCountTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = make_staff()
+        self.customer = make_user()
+
+    def query_count(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(queries)
+
+    def assertConstantQueries(self, url, add_rows, user=None):
+        if user is not None:
+            self.login(user)
+        add_rows(ROWS)
+        small = self.query_count(url)
+        add_rows(ROWS)
+        large = self.query_count(url)
+        self.assertEqual(small, large, f'{url} ran {small} queries for {ROWS} rows but {large} for {2 * ROWS}')
+
+    def test_services(self):
+        def add(n):
+            for _ in range(n):
+                make_service(category=make_category())
+        self.assertConstantQueries('/api/services/', add)
+
+    def test_service_categories(self):
+        def add(n):
+            for _ in range(n):
+                category = make_category()
+                make_service(category=category)
+                make_service(category=category)
+        self.assertConstantQueries('/api/service-categories/', add)
+
+    def test_gallery(self):
+        def add(n):
+            for _ in range(n):
+                make_gallery_image(service=make_service())
+        self.assertConstantQueries('/api/gallery/', add)
+
+    def test_appointments(self):
+        def add(n):
+            for _ in range(n):
+                make_appointment(make_service(), user=self.customer)
+        self.assertConstantQueries('/api/appointments/', add, user=self.staff)
+
+    def test_own_appointments(self):
+        def add(n):
+            for _ in range(n):
+                make_appointment(make_service(), user=self.customer)
+        self.assertConstantQueries('/api/appointments/', add, user=self.customer)
+
+    def test_reviews(self):
+        def add(n):
+            for _ in range(n):
+                make_review(make_service())
+        self.assertConstantQueries('/api/reviews/', add)
+
+    def test_transactions(self):
+        def add(n):
+            for _ in range(n):
+                make_transaction(make_user(), appointment=make_appointment(make_service()))
+        self.assertConstantQueries('/api/transactions/', add, user=self.staff)
+
+    def test_notifications(self):
+        def add(n):
+            for _ in range(n):
+                make_notification(self.customer)
+        self.assertConstantQueries('/api/notifications/', add, user=self.customer)
+
+    def test_users(self):
+        def add(n):
+            for _ in range(n):
+                make_user()
+        self.assertConstantQueries('/api/users/', add, user=self.staff)
+
+    def test_cursor_pages(self):
+        def add(n):
+            for _ in range(n):
+                make_appointment(make_service(), user=self.customer)
+        self.assertConstantQueries('/api/appointments/?pagination=cursor', add, user=self.staff)
@@ -0,0 +1,98 @@
+"""
+Service rating aggregates match the approved reviews after every write path.
+"""
+from decimal import Decimal
+
+from django.test import Client, override_settings
+
+from api.models import Review, Service
+from api.ratings import recompute_ratings
+
+from .base import PLAIN_STORAGES, VerdelleTestCase, make_review, make_service, make_staff
+
+
+class RatingAggregateTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = make_service()
+        self.other = make_service()
+
+    def assertRating(self, service, count, avg):
+        service = Service.objects.get(pk=service.pk)
+        approved = [review.rating for review in Review.objects.filter(service=service, is_approved=True)]
+        self.assertEqual(len(approved), count)
+        self.assertEqual((service.rating_count, service.rating_sum), (count, sum(approved)))
+        self.assertEqual(service.rating_avg, Decimal(avg))
+
+    def test_only_approved_reviews_count(self):
+        make_review(self.service, rating=5)
+        make_review(self.service, rating=4)
+        make_review(self.service, rating=1, is_approved=False)
+        self.assertRating(self.service, 2, '4.50')
+        self.assertRating(self.other, 0, '0')
+
+    def test_single_approve(self):
+        review = make_review(self.service, rating=3, is_approved=False)
+        review.is_approved = True
+        review.save()
+        self.assertRating(self.service, 1, '3.00')
+        review.is_approved = False
+        review.save()
+        self.assertRating(self.service, 0, '0')
+
+    def test_bulk_approve(self):
+        make_review(self.service, rating=5)
+        for rating in (4, 2):
+            make_review(self.service, rating=rating, is_approved=False)
+        make_review(self.other, rating=1, is_approved=False)
+        reviews = Review.objects.filter(service__in=[self.service, self.other])
+        self.assertEqual(reviews.filter(is_approved=False).update(is_approved=True), 3)
+        self.assertRating(self.service, 3, '3.67')
+        self.assertRating(self.other, 1, '1.00')
+        # Already approved rows do not count twice
+        reviews.update(is_approved=True)
+        self.assertRating(self.service, 3, '3.67')
+
+    @override_settings(STORAGES=PLAIN_STORAGES)
+    def test_admin_bulk_approve_action(self):
+        reviews = [make_review(self.service, rating=rating, is_approved=False) for rating in (5, 4)]
+        admin = Client()
+        admin.force_login(make_staff(is_superuser=True))
+        response = admin.post('/admin/api/review/', {
+            'action': 'approve_reviews', '_selected_action': [review.pk for review in reviews],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertRating(self.service, 2, '4.50')
+
+    def test_edit(self):
+        review = make_review(self.service, rating=5)
+        make_review(self.service, rating=4)
+        review.rating = 2
+        review.save()
+        self.assertRating(self.service, 2, '3.00')
+        # Moving a review moves its contribution
+        review.service = self.other
+        review.save()
+        self.assertRating(self.service, 1, '4.00')
+        self.assertRating(self.other, 1, '2.00')
+        Review.objects.filter(pk=review.pk).update(rating=4)
+        self.assertRating(self.other, 1, '4.00')
+
+    def test_delete(self):
+        first = make_review(self.service, rating=5)
+        make_review(self.service, rating=3)
+        make_review(self.service, rating=4, is_approved=False)
+        first.delete()
+        self.assertRating(self.service, 1, '3.00')
+        Review.objects.filter(service=self.service).delete()
+        self.assertRating(self.service, 0, '0')
+
+    def test_recompute_after_bulk_create(self):
+        Review.objects.bulk_create([
+            Review(service=self.service, rating=rating, is_approved=True, customer_name='Raw', comment='c')
+            for rating in (5, 5, 4)
+        ])
+        self.assertEqual(Service.objects.get(pk=self.service.pk).rating_count, 0)
+        recompute_ratings()
+        self.assertRating(self.service, 3, '4.67')
+        self.assertRating(self.other, 0, '0')
@@ -0,0 +1,113 @@
+"""
+reconcile_payments settles stale STK pushes from Daraja's status query, and a
+late callback still delivers the receipt for a payment settled that way.
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.models import Appointment, Transaction
+from api.payments import apply_stk_callback
+from api.reconciliation import reconcile_stale_payments
+
+from .base import VerdelleTestCase, make_appointment, make_service, make_user
+
+# Daraja query responses, keyed by CheckoutRequestID
+QUERY_RESPONSES = {
+    'ws_CO_paid': {'success': True, 'data': {'ResultCode': '0', 'ResultDesc': 'The service request is processed successfully.'}},
+    'ws_CO_cancelled': {'success': True, 'data': {'ResultCode': '1032', 'ResultDesc': 'Request cancelled by user'}},
+    'ws_CO_failed': {'success': True, 'data': {'ResultCode': '1', 'ResultDesc': 'The balance is insufficient'}},
+    'ws_CO_pending': {'success': False, 'error': 'The transaction is being processed'},
+}
+
+
+class ReconcilePaymentsTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = make_service()
+        self.customer = make_user()
+        self.appointments = {
+            checkout_id: self.initiated(checkout_id, stale=True) for checkout_id in QUERY_RESPONSES
+        }
+        self.client_mock = mock.Mock()
+        self.client_mock.get_access_token.return_value = 'token'
+        self.client_mock.query_transaction.side_effect = QUERY_RESPONSES.__getitem__
+        patcher = mock.patch('api.reconciliation.get_mpesa_client', return_value=self.client_mock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def initiated(self, checkout_id, stale):
+        appointment = make_appointment(
+            self.service, user=self.customer, payment_status='initiated', mpesa_checkout_request_id=checkout_id
+        )
+        if stale:
+            Appointment.objects.filter(pk=appointment.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        return appointment
+
+    def status(self, checkout_id):
+        return Appointment.objects.get(pk=self.appointments[checkout_id].pk).payment_status
+
+    def test_stale_pushes_are_settled(self):
+        fresh = self.initiated('ws_CO_fresh', stale=False)
+        outcomes = reconcile_stale_payments(older_than=600, rate=0)
+
+        self.assertEqual(outcomes['checked'], 4)
+        self.assertEqual(
+            {key: outcomes[key] for key in ('completed', 'cancelled', 'failed', 'pending')},
+            {'completed': 1, 'cancelled': 1, 'failed': 1, 'pending': 1},
+        )
+        self.assertEqual(self.status('ws_CO_paid'), 'completed')
+        self.assertEqual(self.status('ws_CO_cancelled'), 'cancelled')
+        self.assertEqual(self.status('ws_CO_failed'), 'failed')
+        self.assertEqual(self.status('ws_CO_pending'), 'initiated')
+        self.assertEqual(Appointment.objects.get(pk=fresh.pk).payment_status, 'initiated')
+        queried = {call.args[0] for call in self.client_mock.query_transaction.call_args_list}
+        self.assertNotIn('ws_CO_fresh', queried)
+
+    def test_late_callback_fills_in_the_receipt(self):
+        reconcile_stale_payments(older_than=600, rate=0)
+        paid = Appointment.objects.get(pk=self.appointments['ws_CO_paid'].pk)
+        self.assertEqual((paid.payment_status, paid.mpesa_transaction_id), ('completed', ''))
+        [record] = Transaction.objects.filter(appointment=paid)
+        self.assertIsNone(record.mpesa_transaction_id)
+
+        callback = {'Body': {'stkCallback': {
+            'CheckoutRequestID': 'ws_CO_paid',
+            'ResultCode': 0,
+            'ResultDesc': 'Processed',
+            'CallbackMetadata': {'Item': [
+                {'Name': 'MpesaReceiptNumber', 'Value': 'SH12XY34ZA'},
+                {'Name': 'Amount', 'Value': 1500},
+                {'Name': 'TransactionDate', 'Value': 20300101101500},
+                {'Name': 'PhoneNumber', 'Value': 254712345678},
+            ]},
+        }}}
+        self.assertEqual(apply_stk_callback(callback), 'completed')
+        paid.refresh_from_db()
+        record.refresh_from_db()
+        self.assertEqual(paid.mpesa_transaction_id, 'SH12XY34ZA')
+        self.assertEqual(paid.payment_date.year, 2030)
+        self.assertEqual(record.mpesa_transaction_id, 'SH12XY34ZA')
+
+        # Once the receipt is known, further callbacks are duplicates again
+        self.assertIsNone(apply_stk_callback(callback))
+
+    def test_callback_settled_payment_is_skipped(self):
+        Appointment.objects.filter(pk=self.appointments['ws_CO_paid'].pk).update(payment_status='completed')
+        outcomes = reconcile_stale_payments(older_than=600, rate=0)
+        self.assertEqual(outcomes['checked'], 3)
+        self.assertEqual(outcomes['completed'], 0)
+
+    def test_no_token_skips_the_pass(self):
+        self.client_mock.get_access_token.return_value = None
+        self.assertEqual(reconcile_stale_payments(older_than=600, rate=0)['checked'], 0)
+        self.assertEqual(self.status('ws_CO_paid'), 'initiated')
+
+    def test_command(self):
+        out = StringIO()
+        call_command('reconcile_payments', '--once', '--rate', '0', '--older-than', '600', stdout=out)
+        self.assertIn('Checked 4 stale payment(s), resolved 3', out.getvalue())
+        self.assertIn('pending=1', out.getvalue())
@@ -0,0 +1,74 @@
+"""
+Service and user search: ranked full text / trigram on PostgreSQL, plain
+substring SearchFilter elsewhere.
+
+On PostgreSQL service search matches word prefixes ('mani' finds
+'Manicure'), not arbitrary substrings ('cure' does not).
+"""
+from unittest import skipIf, skipUnless
+
+from django.db import connection
+
+from .base import VerdelleTestCase, make_service, make_staff, make_user
+
+is_postgres = connection.vendor == 'postgresql'
+
+
+class SearchTestCase(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        make_service(name='Gel Manicure', description='Long-lasting gel polish')
+        make_service(name='Classic Pedicure', description='Pairs well with a manicure')
+        make_service(name='Acrylic Extensions', description='Sculpted acrylic tips')
+
+    def names(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        return [row['name'] for row in rows]
+
+
+@skipUnless(is_postgres, 'Ranked search runs on PostgreSQL')
+class RankedSearchTests(SearchTestCase):
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.names('/api/services/?search=mani'), ['Gel Manicure', 'Classic Pedicure'])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.names('/api/services/?search=gel%20mani'), ['Gel Manicure'])
+
+    def test_stemmed_words(self):
+        self.assertEqual(self.names('/api/services/?search=extension'), ['Acrylic Extensions'])
+
+    def test_matches_word_prefixes_only(self):
+        self.assertEqual(self.names('/api/services/?search=cure'), [])
+
+    def test_ordering_param_overrides_rank(self):
+        self.assertEqual(
+            self.names('/api/services/?search=mani&ordering=name'), ['Classic Pedicure', 'Gel Manicure']
+        )
+
+    def test_punctuation_only_falls_back_to_substring_search(self):
+        self.assertEqual(self.names('/api/services/?search=-'), ['Gel Manicure'])
+
+
+@skipIf(is_postgres, 'Substring fallback for other databases')
+class FallbackSearchTests(SearchTestCase):
+    def test_substring_match_in_any_field(self):
+        self.assertEqual(
+            sorted(self.names('/api/services/?search=mani')), ['Classic Pedicure', 'Gel Manicure']
+        )
+        self.assertEqual(sorted(self.names('/api/services/?search=cure')), ['Classic Pedicure', 'Gel Manicure'])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.names('/api/services/?search=gel%20mani'), ['Gel Manicure'])
+
+
+class UserSearchTests(VerdelleTestCase):
+    def test_substring_of_any_field(self):
+        # Trigram-indexed icontains on PostgreSQL, SearchFilter elsewhere
+        self.login(make_staff(username='admin'))
+        make_user(username='wanjiku', first_name='Grace', last_name='Wanjiku')
+        make_user(username='achieng', first_name='Mary', last_name='Achieng', phone_number='0722111333')
+        for term, expected in [('njik', ['wanjiku']), ('MARY', ['achieng']), ('111333', ['achieng'])]:
+            response = self.client.get('/api/users/', {'search': term})
+            self.assertEqual([row['username'] for row in response.data['results']], expected, term)
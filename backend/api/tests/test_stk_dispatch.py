@@ -0,0 +1,108 @@
+"""
+Non-blocking STK push initiation: one request claims the appointment and
+queues the job, duplicates are turned away, and a claim whose job was lost
+can be taken over once it is stale.
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+
+from api.models import Appointment
+from api.views import dispatch_stk_push
+
+from .base import VerdelleTestCase, make_appointment, make_service
+
+URL = '/api/mpesa/initiate/'
+
+
+@override_settings(MPESA_ASYNC_STK_PUSH=True, MPESA_INITIATING_TIMEOUT=120)
+class QueueStkPushTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.appointment = make_appointment(make_service())
+        patcher = mock.patch('api.views.get_dispatcher')
+        self.submit = patcher.start().return_value.submit
+        self.submit.return_value = True
+        self.addCleanup(patcher.stop)
+
+    def initiate(self, phone_number='254712345678'):
+        return self.client.post(URL, {'appointment_id': self.appointment.pk, 'phone_number': phone_number}, format='json')
+
+    def row(self):
+        return Appointment.objects.get(pk=self.appointment.pk)
+
+    def test_claim_queues_one_job(self):
+        response = self.initiate()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['payment_status'], 'initiating')
+        self.assertEqual(self.row().payment_status, 'initiating')
+        self.assertEqual(self.row().payment_phone, '254712345678')
+        self.assertEqual(self.submit.call_count, 1)
+        self.assertEqual(self.submit.call_args.args[1:3], (self.appointment.pk, '254712345678'))
+
+    def test_duplicate_claim_queues_nothing(self):
+        self.initiate()
+        # A different phone number is not a replay, so it reaches the claim
+        response = self.initiate('254700000000')
+        self.assertEqual(response.status_code, 202)
+        self.assertIn('already being processed', response.json()['message'])
+        self.assertEqual(self.submit.call_count, 1)
+        self.assertEqual(self.row().payment_phone, '254712345678')
+
+    def test_stale_claim_is_taken_over(self):
+        self.initiate()
+        Appointment.objects.filter(pk=self.appointment.pk).update(updated_at=timezone.now() - timedelta(seconds=121))
+
+        response = self.initiate()
+        self.assertEqual(response.status_code, 202)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(self.submit.call_count, 2)
+        row = self.row()
+        self.assertEqual(row.payment_status, 'initiating')
+        self.assertGreater(row.updated_at, timezone.now() - timedelta(seconds=5))
+
+    def test_fresh_claim_is_not_taken_over(self):
+        self.initiate()
+        Appointment.objects.filter(pk=self.appointment.pk).update(updated_at=timezone.now() - timedelta(seconds=60))
+        self.initiate('254700000000')
+        self.assertEqual(self.submit.call_count, 1)
+
+    def test_completed_payment_is_never_claimed(self):
+        Appointment.objects.filter(pk=self.appointment.pk).update(payment_status='completed')
+        self.assertEqual(self.initiate().status_code, 400)
+        self.assertEqual(self.submit.call_count, 0)
+
+    def test_busy_dispatcher_releases_the_claim(self):
+        self.submit.return_value = False
+        response = self.initiate()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.row().payment_status, 'pending')
+
+
+class DispatchStkPushTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.appointment = make_appointment(make_service(), payment_status='initiating')
+
+    def dispatch(self, **client):
+        with mock.patch('api.views.get_mpesa_client', **client):
+            dispatch_stk_push(self.appointment.pk, '254712345678', 1500, 'Payment')
+        return Appointment.objects.get(pk=self.appointment.pk)
+
+    def test_success_records_the_checkout(self):
+        client = mock.Mock()
+        client.stk_push.return_value = {'success': True, 'CheckoutRequestID': 'ws_CO_1'}
+        row = self.dispatch(return_value=client)
+        self.assertEqual((row.payment_status, row.mpesa_checkout_request_id), ('initiated', 'ws_CO_1'))
+
+    def test_failure_is_recorded(self):
+        client = mock.Mock()
+        client.stk_push.return_value = {'success': False, 'error': 'Invalid phone'}
+        row = self.dispatch(return_value=client)
+        self.assertEqual((row.payment_status, row.payment_error), ('failed', 'Invalid phone'))
+
+    def test_crash_does_not_leave_the_row_initiating(self):
+        row = self.dispatch(side_effect=RuntimeError('no credentials'))
+        self.assertEqual(row.payment_status, 'failed')
@@ -0,0 +1,63 @@
+"""
+Exports and media stay streamed under ASGI: the body is an async iterator
+there, so Django does not collect a sync one into a list first.
+"""
+import tempfile
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, override_settings
+
+from api.exports import export_response
+from api.models import Appointment
+from verdelle_nails.media import serve_media
+
+from .base import VerdelleTestCase, make_appointment, make_service
+
+COLUMNS = ['id', 'customer_name', 'service__name']
+
+
+async def collect(response):
+    return b''.join([chunk async for chunk in response])
+
+
+class ExportStreamingTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        service = make_service()
+        for _ in range(5):
+            make_appointment(service)
+
+    def test_wsgi_body_is_sync(self):
+        response = export_response(Appointment.objects.order_by('id'), COLUMNS, 'appointments')
+        self.assertFalse(response.is_async)
+
+    def test_asgi_body_is_async_and_unchanged(self):
+        queryset = Appointment.objects.order_by('id')
+        expected = b''.join(export_response(queryset, COLUMNS, 'appointments'))
+        with override_settings(ASGI_MODE=True):
+            response = export_response(queryset, COLUMNS, 'appointments')
+        self.assertTrue(response.is_async)
+        self.assertEqual(async_to_sync(collect)(response), expected)
+
+
+class MediaStreamingTests(VerdelleTestCase):
+    def setUp(self):
+        super().setUp()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.body = bytes(range(256)) * 1024
+        Path(root.name, 'photo.jpg').write_bytes(self.body)
+        self.enterContext(override_settings(MEDIA_ROOT=root.name, ASGI_MODE=True))
+
+    def test_full_file(self):
+        response = serve_media(RequestFactory().get('/media/photo.jpg'), 'photo.jpg')
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Length'], str(len(self.body)))
+        self.assertEqual(async_to_sync(collect)(response), self.body)
+
+    def test_range(self):
+        response = serve_media(RequestFactory().get('/media/photo.jpg', HTTP_RANGE='bytes=100-199'), 'photo.jpg')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.is_async)
+        self.assertEqual(async_to_sync(collect)(response), self.body[100:200])
@@ -3,8 +3,8 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     UserViewSet, ServiceViewSet, ServiceCategoryViewSet, GalleryImageViewSet, AppointmentViewSet,
     ReviewViewSet, ContactMessageViewSet, TransactionViewSet, NotificationViewSet,
-    register_view, login_view, logout_view, profile_view, update_profile_view,
-    initiate_payment, mpesa_callback, check_payment_status, verify_manual_payment, approve_manual_payment
+    admin_summary, register_view, login_view, logout_view, profile_view, update_profile_view,
+    initiate_payment, mpesa_callback, mpesa_callback_stats, check_payment_status, wait_for_payment_status, verify_manual_payment, approve_manual_payment
 )
 
 router = DefaultRouter()
@@ -25,9 +25,12 @@ urlpatterns = [
     path('auth/logout/', logout_view, name='logout'),
     path('auth/profile/', profile_view, name='profile'),
     path('auth/profile/update/', update_profile_view, name='update_profile'),
+    path('admin/summary/', admin_summary, name='admin_summary'),
     path('mpesa/initiate/', initiate_payment, name='initiate_payment'),
     path('mpesa/callback/', mpesa_callback, name='mpesa_callback'),
+    path('mpesa/callback/stats/', mpesa_callback_stats, name='mpesa_callback_stats'),
     path('mpesa/status/<int:appointment_id>/', check_payment_status, name='check_payment_status'),
+    path('mpesa/status/<int:appointment_id>/wait/', wait_for_payment_status, name='wait_for_payment_status'),
     path('mpesa/verify/', verify_manual_payment, name='verify_manual_payment'),
     path('mpesa/approve/<int:appointment_id>/', approve_manual_payment, name='approve_manual_payment'),
 ]
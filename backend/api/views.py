@@ -5,15 +5,38 @@ from rest_framework.exceptions import PermissionDenied
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import logout
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.db.models import Count, Prefetch, Q, Sum
+from asgiref.sync import sync_to_async
 from django.views.decorators.csrf import csrf_exempt
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Service, ServiceCategory, GalleryImage, Appointment, Review, ContactMessage, User, Transaction, Notification
+from .models import (
+    Service, ServiceCategory, GalleryImage, Appointment, Review, ContactMessage, User, Transaction, Notification,
+    SERVICE_SEARCH_FIELDS, USER_SEARCH_FIELDS,
+)
 from .serializers import (
     ServiceSerializer, ServiceCategorySerializer, GalleryImageSerializer, AppointmentSerializer,
     ReviewSerializer, ContactMessageSerializer, UserSerializer,
-    RegisterSerializer, LoginSerializer, TransactionSerializer, NotificationSerializer
+    RegisterSerializer, LoginSerializer, TransactionSerializer, NotificationSerializer,
+    AppointmentBulkUpdateSerializer
 )
-from .mpesa import MpesaClient
+from .mpesa import get_mpesa_client
+from .dispatch import get_dispatcher
+from .callback_queue import enqueue_callback, queue_stats
+from .availability import availability, booking_window, in_booking_window
+from .payment_events import ensure_listener, publish_payment_status, waiters
+from .pagination import AppointmentPagination, NotificationPagination, TransactionPagination
+from .exports import EXPORT_RENDERERS, export_response
+from .search import RankedSearchFilter
+from .conditional import ConditionalGetMixin
+from .notifications import set_read
+from .appointment_status import bulk_update_status
+from . import idempotency
+from decimal import Decimal
+import asyncio
 import logging
 import json
 import traceback
@@ -81,11 +104,19 @@ def update_profile_view(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ServiceCategoryViewSet(viewsets.ModelViewSet):
-    queryset = ServiceCategory.objects.all()
+class ServiceCategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = ServiceCategory.objects.prefetch_related(
+        Prefetch(
+            'services',
+            queryset=Service.objects.filter(is_active=True).select_related('category'),
+            to_attr='active_services'
+        )
+    )
     serializer_class = ServiceCategorySerializer
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['display_order', 'name']
+    etag_families = ['service-categories']
+    cache_max_age = 300
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -97,18 +128,22 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAdminUser]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['username', 'email', 'first_name', 'last_name']
+    filter_backends = [filters.OrderingFilter, RankedSearchFilter]
+    search_fields = USER_SEARCH_FIELDS
+    trigram_search_fields = USER_SEARCH_FIELDS
     ordering_fields = ['date_joined', 'username']
 
 
-class ServiceViewSet(viewsets.ModelViewSet):
-    queryset = Service.objects.all()
+class ServiceViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Service.objects.select_related('category')
     serializer_class = ServiceSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, RankedSearchFilter]
     filterset_fields = ['category', 'is_featured']
     search_fields = ['name', 'description']
-    ordering_fields = ['price', 'duration', 'name']
+    search_vector_fields = SERVICE_SEARCH_FIELDS
+    etag_families = ['services']
+    cache_max_age = 300
+    ordering_fields = ['price', 'duration', 'name', 'rating_avg', 'rating_count']
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -117,17 +152,19 @@ class ServiceViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def featured(self, request):
-        featured_services = self.queryset.filter(is_featured=True, is_active=True)
+        featured_services = self.get_queryset().filter(is_featured=True, is_active=True)
         serializer = self.get_serializer(featured_services, many=True)
         return Response(serializer.data)
 
 
-class GalleryImageViewSet(viewsets.ModelViewSet):
-    queryset = GalleryImage.objects.all()
+class GalleryImageViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = GalleryImage.objects.select_related('service')
     serializer_class = GalleryImageSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['service', 'is_featured']
     ordering_fields = ['created_at']
+    etag_families = ['gallery']
+    cache_max_age = 600
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -136,20 +173,40 @@ class GalleryImageViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def featured(self, request):
-        featured_images = self.queryset.filter(is_featured=True)
+        featured_images = self.get_queryset().filter(is_featured=True)
         serializer = self.get_serializer(featured_images, many=True)
         return Response(serializer.data)
 
 
+APPOINTMENT_EXPORT_COLUMNS = [
+    'id', 'user_id', 'customer_name', 'customer_email', 'customer_phone', 'service_id',
+    'service__name', 'service__price', 'appointment_date', 'appointment_time', 'notes', 'status',
+    'payment_status', 'payment_phone', 'mpesa_checkout_request_id', 'mpesa_transaction_id',
+    'amount_paid', 'payment_date', 'created_at'
+]
+
+TRANSACTION_EXPORT_COLUMNS = [
+    'id', 'user_id', 'user__username', 'appointment_id', 'mpesa_transaction_id',
+    'mpesa_checkout_request_id', 'phone_number', 'amount', 'status', 'result_code',
+    'result_description', 'initiated_at', 'completed_at', 'account_reference',
+    'transaction_description'
+]
+
+
 class AppointmentViewSet(viewsets.ModelViewSet):
-    queryset = Appointment.objects.all()
+    queryset = Appointment.objects.select_related('service')
     serializer_class = AppointmentSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status', 'appointment_date', 'payment_status']
     ordering_fields = ['-appointment_date', '-created_at']
-    ordering = ['-appointment_date', '-appointment_time']
+    ordering = ['-appointment_date', '-appointment_time', 'id']
+    pagination_class = AppointmentPagination
 
     def get_permissions(self):
+        if self.action == 'availability':
+            return [permissions.AllowAny()]
+        if self.action == 'bulk_update':
+            return [permissions.IsAdminUser()]
         if self.request.user and self.request.user.is_staff:
             return [permissions.IsAdminUser()]
         return [permissions.IsAuthenticated()]
@@ -163,18 +220,75 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        """Free start times on ?date=YYYY-MM-DD for ?service=<id>"""
+        try:
+            date = parse_date(request.query_params.get('date', ''))
+        except ValueError:
+            date = None
+        if date is None:
+            return Response(
+                {'error': 'date is required in YYYY-MM-DD format'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not in_booking_window(date):
+            first, last = booking_window()
+            return Response(
+                {'error': f'date must be between {first} and {last}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            service = Service.objects.only('id', 'duration').get(id=request.query_params.get('service'))
+        except (Service.DoesNotExist, ValueError, TypeError):
+            return Response(
+                {'error': 'A valid service is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({
+            'date': date,
+            'service': service.id,
+            'duration': service.duration,
+            'slots': availability.free_slots(date, service.duration)
+        })
+
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """Stream the filtered appointments as CSV (default) or ?format=ndjson"""
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, APPOINTMENT_EXPORT_COLUMNS, 'appointments', request.accepted_renderer.format)
+
     def perform_update(self, serializer):
         if not self.request.user.is_staff and serializer.instance.user != self.request.user:
             raise PermissionDenied("You don't have permission to update this appointment")
         serializer.save()
 
+    @action(detail=False, methods=['post'], url_path='bulk-update')
+    def bulk_update(self, request):
+        """Move many appointments to one status in a single UPDATE; reports a result per ID"""
+        serializer = AppointmentBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = bulk_update_status(
+            serializer.validated_data['ids'],
+            serializer.validated_data['status'],
+            serializer.validated_data.get('payment_status'),
+        )
+        return Response({
+            'status': serializer.validated_data['status'],
+            'updated': sum(1 for result in results if result['result'] == 'updated'),
+            'results': results,
+        })
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
-    queryset = Review.objects.filter(is_approved=True)
+class ReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Review.objects.filter(is_approved=True).select_related('service')
     serializer_class = ReviewSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['service', 'rating']
     ordering_fields = ['-created_at', 'rating']
+    # New reviews only appear once approved, so a short lifetime is enough
+    etag_families = ['reviews']
+    cache_max_age = 60
 
     def get_permissions(self):
         if self.action == 'create':
@@ -198,12 +312,13 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
 
 
 class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Transaction.objects.all()
+    queryset = Transaction.objects.select_related('user')
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status', 'initiated_at']
-    ordering = ['-initiated_at']
+    ordering = ['-initiated_at', 'id']
+    pagination_class = TransactionPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -211,26 +326,155 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
             return queryset
         return queryset.filter(user=self.request.user)
 
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """Stream the filtered transactions as CSV (default) or ?format=ndjson"""
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, TRANSACTION_EXPORT_COLUMNS, 'transactions', request.accepted_renderer.format)
+
 
 class NotificationViewSet(viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.OrderingFilter]
-    ordering = ['-created_at']
+    ordering = ['-created_at', 'id']
+    pagination_class = NotificationPagination
 
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
 
+    def perform_update(self, serializer):
+        # Flip is_read through set_read so the user's unread counter follows
+        is_read = serializer.validated_data.pop('is_read', None)
+        notification = serializer.save()
+        if is_read is not None:
+            set_read(self.get_queryset().filter(pk=notification.pk), is_read)
+            notification.is_read = is_read
+
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
-        self.get_queryset().update(is_read=True)
-        return Response({'message': 'All notifications marked as read'})
+        marked = set_read(self.get_queryset())
+        return Response({'message': 'All notifications marked as read', 'marked': marked})
 
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        """Unread badge count; authentication already loaded the counter with the user row"""
+        return Response({'unread_count': request.user.unread_notifications})
 
-@api_view(['POST'])
-@permission_classes([permissions.AllowAny])
-def initiate_payment(request):
+
+def dispatch_stk_push(appointment_id, phone_number, amount, transaction_desc):
+    """
+    Background job for non-blocking payment initiation.
+
+    Sends the STK push and records the CheckoutRequestID (or the failure) on
+    the appointment, where check_payment_status picks it up.
+    """
+    try:
+        result = get_mpesa_client().stk_push(
+            phone_number=phone_number,
+            amount=amount,
+            account_reference='Verdelle Nails',
+            transaction_desc=transaction_desc
+        )
+    except Exception:
+        # Never leave the appointment 'initiating': that blocks every retry
+        logger.exception(f"STK Push job crashed for appointment {appointment_id}")
+        result = {'success': False, 'error': 'Payment initiation failed'}
+    pending = Appointment.objects.filter(id=appointment_id, payment_status='initiating')
+    if result.get('success'):
+        pending.update(
+            mpesa_checkout_request_id=result.get('CheckoutRequestID'),
+            payment_status='initiated',
+            updated_at=timezone.now()
+        )
+        logger.info(f"STK Push initiated successfully for appointment {appointment_id}")
+    else:
+        error = result.get('error', 'Payment initiation failed')
+        pending.update(
+            payment_status='failed',
+            payment_error=str(error)[:255],
+            updated_at=timezone.now()
+        )
+        logger.error(f"STK Push failed for appointment {appointment_id}: {error}")
+    publish_payment_status(appointment_id)
+
+
+def build_admin_summary():
+    """Dashboard counters computed with SQL aggregates"""
+    appointment_stats = Appointment.objects.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        revenue=Sum('amount_paid', filter=Q(status='completed')),
+    )
+    transaction_stats = Transaction.objects.aggregate(
+        pending=Count('id', filter=Q(status__in=['pending', 'initiated'])),
+        revenue=Sum('amount', filter=Q(status='completed')),
+    )
+    appointment_revenue = appointment_stats['revenue'] or Decimal('0')
+    transaction_revenue = transaction_stats['revenue'] or Decimal('0')
+
+    recent = (
+        Appointment.objects.order_by('-appointment_date', '-appointment_time')
+        .values('id', 'appointment_date', 'appointment_time', 'customer_name', 'status', 'service__name')[:5]
+    )
+
+    return {
+        'total_appointments': appointment_stats['total'],
+        'pending_appointments': appointment_stats['pending'],
+        'pending_transactions': transaction_stats['pending'],
+        'appointment_revenue': f'{appointment_revenue:.2f}',
+        'transaction_revenue': f'{transaction_revenue:.2f}',
+        'total_revenue': f'{appointment_revenue + transaction_revenue:.2f}',
+        'total_users': User.objects.count(),
+        'total_services': Service.objects.count(),
+        'total_gallery_items': GalleryImage.objects.count(),
+        'recent_activities': [
+            {
+                'appointment_id': row['id'],
+                'appointment_date': row['appointment_date'],
+                'appointment_time': row['appointment_time'],
+                'description': f"Appointment: {row['service__name'] or 'Service'} - {row['customer_name'] or 'Customer'} ({row['status']})",
+            }
+            for row in recent
+        ],
+        'generated_at': timezone.now(),
+    }
+
+
+ADMIN_SUMMARY_CACHE_KEY = 'admin:summary'
+
+
+def invalidate_admin_summary():
+    cache.delete(ADMIN_SUMMARY_CACHE_KEY)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def admin_summary(request):
+    """
+    Admin dashboard summary, cached for ADMIN_SUMMARY_CACHE_TTL seconds.
+
+    Saves and deletes that change a figure drop the cached copy (see
+    signals.py); queryset.update() sends no signal and waits for the TTL.
+    """
+    summary = cache.get_or_set(
+        ADMIN_SUMMARY_CACHE_KEY,
+        build_admin_summary,
+        getattr(settings, 'ADMIN_SUMMARY_CACHE_TTL', 15)
+    )
+    return Response(summary)
+
+
+def _request_data(request):
+    """Parsed JSON or form body for the plain (non-DRF) async views"""
+    if request.content_type == 'application/json':
+        return json.loads(request.body or b'{}')
+    return request.POST
+
+
+@csrf_exempt
+async def initiate_payment(request):
     """
     Initiate M-Pesa STK Push payment
     
@@ -239,77 +483,173 @@ def initiate_payment(request):
         "appointment_id": 123,
         "phone_number": "254712345678"
     }
+
+    A native async view: under ASGI the Daraja round trip is awaited on the
+    event loop instead of holding a worker thread. ORM work goes through the
+    async ORM API or sync_to_async. With MPESA_ASYNC_STK_PUSH enabled the push
+    is handed to a background dispatcher and the endpoint answers 202
+    straight away; clients follow progress through check_payment_status.
+
+    Retries are idempotent (see api/idempotency.py): send the same
+    Idempotency-Key header to have the first response replayed.
     """
+    if request.method != 'POST':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+
     try:
-        appointment_id = request.data.get('appointment_id')
-        phone_number = request.data.get('phone_number')
+        try:
+            data = _request_data(request)
+        except ValueError:
+            return JsonResponse({'detail': 'JSON parse error'}, status=400)
+        appointment_id = data.get('appointment_id')
+        phone_number = data.get('phone_number')
+        idempotency_key = request.headers.get(idempotency.IDEMPOTENCY_HEADER)
         
         logger.info(f"Payment initiation request - Appointment: {appointment_id}, Phone: {phone_number}")
         
         if not appointment_id or not phone_number:
-            return Response(
+            return JsonResponse(
                 {'error': 'appointment_id and phone_number are required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        try:
-            appointment = Appointment.objects.get(id=appointment_id)
-        except Appointment.DoesNotExist:
-            logger.error(f"Appointment {appointment_id} not found")
-            return Response(
-                {'error': 'Appointment not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Check if already paid
-        if appointment.payment_status == 'completed':
-            return Response(
-                {'error': 'This appointment has already been paid for'},
+
+        if idempotency_key is not None and not 0 < len(idempotency_key) <= idempotency.MAX_KEY_LENGTH:
+            return JsonResponse(
+                {'error': f'{idempotency.IDEMPOTENCY_HEADER} must be 1 to {idempotency.MAX_KEY_LENGTH} characters'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Initialize M-Pesa client
-        mpesa_client = MpesaClient()
-        
-        # Initiate STK Push
-        result = mpesa_client.stk_push(
-            phone_number=phone_number,
-            amount=int(appointment.service.price),
-            account_reference='Verdelle Nails',
-            transaction_desc=f'Payment for {appointment.service.name}'
-        )
-        
-        if result.get('success'):
-            # Update appointment with checkout request ID
-            appointment.mpesa_checkout_request_id = result.get('CheckoutRequestID')
-            appointment.payment_status = 'initiated'
-            appointment.payment_phone = phone_number
-            appointment.save()
-            
-            logger.info(f"STK Push initiated successfully for appointment {appointment.id}")
-            
-            return Response({
-                'success': True,
-                'message': 'Payment prompt sent to your phone. Please enter your M-Pesa PIN.',
-                'CheckoutRequestID': result.get('CheckoutRequestID'),
-                'MerchantRequestID': result.get('MerchantRequestID')
-            })
-        else:
-            logger.error(f"STK Push failed for appointment {appointment.id}: {result.get('error')}")
-            return Response(
-                {'error': result.get('error', 'Payment initiation failed')},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        if not await idempotency.claim(appointment_id):
+            return idempotency.in_flight_response(appointment_id)
+        try:
+            # Read the payment state only once no other request can change it
+            try:
+                appointment = await Appointment.objects.select_related('service').aget(id=appointment_id)
+            except Appointment.DoesNotExist:
+                logger.error(f"Appointment {appointment_id} not found")
+                return JsonResponse(
+                    {'error': 'Appointment not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            response = await idempotency.replay_response(appointment, phone_number, idempotency_key)
+            if response is None:
+                response = await _start_payment(appointment, phone_number)
+                await idempotency.remember_response(appointment, phone_number, response, idempotency_key)
+            return response
+        finally:
+            await idempotency.release(appointment_id)
     
     except Exception as e:
         logger.error(f"Error in initiate_payment: {str(e)}")
         logger.error(traceback.format_exc())
-        return Response(
+        return JsonResponse(
             {'error': f'Server error: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
+async def _start_payment(appointment, phone_number):
+    """Send (or queue) the STK push for ``appointment`` and build the response"""
+    # Check if already paid
+    if appointment.payment_status == 'completed':
+        return JsonResponse(
+            {'error': 'This appointment has already been paid for'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    amount = int(appointment.service.price)
+    transaction_desc = f'Payment for {appointment.service.name}'
+
+    if getattr(settings, 'MPESA_ASYNC_STK_PUSH', False):
+        return await sync_to_async(_queue_stk_push)(appointment, phone_number, amount, transaction_desc)
+    
+    # Shared M-Pesa client (reuses the cached OAuth token)
+    mpesa_client = get_mpesa_client()
+    
+    # Initiate STK Push
+    result = await mpesa_client.astk_push(
+        phone_number=phone_number,
+        amount=amount,
+        account_reference='Verdelle Nails',
+        transaction_desc=transaction_desc
+    )
+    
+    if result.get('success'):
+        await sync_to_async(_record_stk_push)(appointment, result.get('CheckoutRequestID'), phone_number)
+        
+        logger.info(f"STK Push initiated successfully for appointment {appointment.id}")
+        
+        return JsonResponse({
+            'success': True,
+            'message': 'Payment prompt sent to your phone. Please enter your M-Pesa PIN.',
+            'CheckoutRequestID': result.get('CheckoutRequestID'),
+            'MerchantRequestID': result.get('MerchantRequestID')
+        })
+    else:
+        logger.error(f"STK Push failed for appointment {appointment.id}: {result.get('error')}")
+        return JsonResponse(
+            {'error': result.get('error', 'Payment initiation failed')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+def _record_stk_push(appointment, checkout_request_id, phone_number):
+    """Update appointment with checkout request ID"""
+    appointment.mpesa_checkout_request_id = checkout_request_id
+    appointment.payment_status = 'initiated'
+    appointment.payment_phone = phone_number
+    appointment.payment_error = ''
+    appointment.save()
+    publish_payment_status(appointment.id)
+
+
+def _queue_stk_push(appointment, phone_number, amount, transaction_desc):
+    """
+    Record the 'initiating' state and queue the STK push.
+
+    An appointment already 'initiating' is only claimed again once that state
+    is older than MPESA_INITIATING_TIMEOUT, i.e. its job was lost to a
+    restart or crash before it could record a result.
+    """
+    previous_status = appointment.payment_status
+    claimable = ~Q(payment_status__in=['completed', 'initiating']) | Q(
+        payment_status='initiating', updated_at__lt=idempotency.stale_initiating_cutoff()
+    )
+    claimed = Appointment.objects.filter(claimable, id=appointment.id).update(
+        payment_status='initiating',
+        payment_phone=phone_number,
+        mpesa_checkout_request_id='',
+        payment_error='',
+        updated_at=timezone.now()
+    )
+    if not claimed:
+        # A push for this appointment is already on its way
+        return idempotency.in_flight_response(appointment.id)
+
+    accepted = get_dispatcher('mpesa').submit(
+        dispatch_stk_push, appointment.id, phone_number, amount, transaction_desc
+    )
+    if not accepted:
+        Appointment.objects.filter(id=appointment.id, payment_status='initiating').update(
+            payment_status='failed' if previous_status == 'initiating' else previous_status
+        )
+        response = JsonResponse(
+            {'error': 'Payment service is busy. Please try again in a moment.'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        response['Retry-After'] = '5'
+        return response
+
+    logger.info(f"STK Push queued for appointment {appointment.id}")
+    return JsonResponse({
+        'success': True,
+        'message': 'Payment prompt is being sent to your phone. Please enter your M-Pesa PIN.',
+        'appointment_id': appointment.id,
+        'payment_status': 'initiating'
+    }, status=status.HTTP_202_ACCEPTED)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 @csrf_exempt
@@ -317,135 +657,21 @@ def mpesa_callback(request):
     """
     M-Pesa callback endpoint to receive payment confirmation
     This is called by Safaricom when payment is processed
+
+    The payload is persisted with a single INSERT and acknowledged right away;
+    the callback queue consumer applies it to the appointment.
     """
     try:
-        # Log the raw callback data
         callback_data = json.loads(request.body.decode('utf-8'))
-        logger.info(f"M-Pesa Callback received: {json.dumps(callback_data, indent=2)}")
-        
-        # Extract callback data
-        body = callback_data.get('Body', {})
-        stk_callback = body.get('stkCallback', {})
-        
-        result_code = str(stk_callback.get('ResultCode', ''))
-        result_desc = stk_callback.get('ResultDesc', '')
-        checkout_request_id = stk_callback.get('CheckoutRequestID', '')
-        
-        logger.info(f"Processing callback - CheckoutRequestID: {checkout_request_id}, ResultCode: {result_code}")
-        
-        # Find appointment by CheckoutRequestID
-        try:
-            appointment = Appointment.objects.get(mpesa_checkout_request_id=checkout_request_id)
-            logger.info(f"Found appointment {appointment.id} for checkout request {checkout_request_id}")
-        except Appointment.DoesNotExist:
-            logger.error(f"No appointment found for CheckoutRequestID: {checkout_request_id}")
-            return Response({'ResultCode': 0, 'ResultDesc': 'Accepted'})
-        
-        # Process based on result code
-        if result_code == '0':
-            # Payment successful
-            logger.info(f"Payment SUCCESSFUL for appointment {appointment.id}")
-            
-            # Extract callback metadata
-            callback_metadata = stk_callback.get('CallbackMetadata', {})
-            items = callback_metadata.get('Item', [])
-            
-            # Parse metadata items
-            metadata = {}
-            for item in items:
-                name = item.get('Name')
-                value = item.get('Value')
-                metadata[name] = value
-            
-            mpesa_receipt = metadata.get('MpesaReceiptNumber', '')
-            amount_paid = metadata.get('Amount', 0)
-            transaction_date_str = metadata.get('TransactionDate', '')
-            phone_number = metadata.get('PhoneNumber', appointment.payment_phone)
-            
-            logger.info(f"Payment details - Receipt: {mpesa_receipt}, Amount: {amount_paid}, Phone: {phone_number}")
-            
-            # Parse transaction date
-            transaction_date = timezone.now()
-            if transaction_date_str:
-                try:
-                    from datetime import datetime
-                    transaction_date = datetime.strptime(str(transaction_date_str), '%Y%m%d%H%M%S')
-                    from django.utils.timezone import make_aware
-                    transaction_date = make_aware(transaction_date)
-                except Exception as e:
-                    logger.warning(f"Could not parse transaction date: {transaction_date_str}, error: {e}")
-            
-            # Update appointment
-            appointment.payment_status = 'completed'
-            appointment.status = 'confirmed'
-            appointment.mpesa_transaction_id = mpesa_receipt
-            appointment.amount_paid = amount_paid
-            appointment.payment_date = transaction_date
-            appointment.payment_phone = phone_number
-            appointment.save()
-            
-            # Create Transaction record
-            try:
-                # Check if transaction already exists
-                existing_transaction = Transaction.objects.filter(
-                    mpesa_transaction_id=mpesa_receipt
-                ).first()
-                
-                if not existing_transaction:
-                    transaction = Transaction.objects.create(
-                        user=appointment.user,
-                        appointment=appointment,
-                        mpesa_transaction_id=mpesa_receipt,
-                        mpesa_checkout_request_id=checkout_request_id,
-                        phone_number=phone_number,
-                        amount=amount_paid,
-                        status='completed',
-                        result_code=result_code,
-                        result_description=result_desc,
-                        completed_at=transaction_date,
-                        account_reference='Verdelle Nails',
-                        transaction_description=f'Payment for {appointment.service.name}'
-                    )
-                    logger.info(f"Transaction record created: ID {transaction.id}, Receipt: {mpesa_receipt}")
-                else:
-                    logger.info(f"Transaction already exists for receipt {mpesa_receipt}")
-            except Exception as e:
-                logger.error(f"Error creating transaction record: {str(e)}")
-                logger.error(traceback.format_exc())
-            
-            # Create notification for user
-            try:
-                Notification.objects.create(
-                    user=appointment.user,
-                    title='Payment Successful',
-                    message=f'Your payment of KES {amount_paid} for {appointment.service.name} on {appointment.appointment_date} has been confirmed.',
-                    notification_type='appointment'
-                )
-                logger.info(f"Notification created for user {appointment.user.id}")
-            except Exception as e:
-                logger.error(f"Error creating notification: {str(e)}")
-            
-            logger.info(f"Payment processing completed successfully for appointment {appointment.id}")
-            
-        elif result_code in ['1032', '1037', '2032']:
-            # Payment cancelled by user or timed out
-            logger.info(f"Payment CANCELLED for appointment {appointment.id}: {result_desc}")
-            appointment.payment_status = 'cancelled'
-            appointment.save()
-            
-        else:
-            # Payment failed
-            logger.warning(f"Payment FAILED for appointment {appointment.id} - Code: {result_code}, Desc: {result_desc}")
-            appointment.payment_status = 'failed'
-            appointment.save()
+        entry = enqueue_callback(callback_data)
+        logger.info(f"M-Pesa Callback queued: {entry.id} (CheckoutRequestID: {entry.checkout_request_id})")
         
-        # Always return success to M-Pesa
         return Response({
             'ResultCode': 0,
             'ResultDesc': 'Accepted'
         })
         
-    except json.JSONDecodeError as e:
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
         logger.error(f"Invalid JSON in callback: {str(e)}")
         return Response({
             'ResultCode': 1,
@@ -453,49 +679,48 @@ def mpesa_callback(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     except Exception as e:
-        logger.error(f"Error processing M-Pesa callback: {str(e)}")
+        logger.error(f"Error storing M-Pesa callback: {str(e)}")
         logger.error(traceback.format_exc())
-        # Still return success to M-Pesa to avoid retries
+        # Ask Safaricom to retry: the callback was not persisted
         return Response({
-            'ResultCode': 0,
-            'ResultDesc': 'Accepted'
-        })
+            'ResultCode': 1,
+            'ResultDesc': 'Temporary error, please retry'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-# 
 @api_view(['GET'])
-@permission_classes([permissions.AllowAny])
-def check_payment_status(request, appointment_id):
+@permission_classes([permissions.IsAdminUser])
+def mpesa_callback_stats(request):
+    """Callback queue depth and processing lag"""
+    return Response(queue_stats())
+
+
+async def check_payment_status(request, appointment_id):
     """
     Check payment status WITHOUT modifying the appointment status during polling.
     Only the callback should update to 'completed' or 'failed'.
     """
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+
     try:
         logger.info(f"Checking payment status for appointment {appointment_id}")
         
-        appointment = Appointment.objects.get(id=appointment_id)
-        
         # CRITICAL: Don't query M-Pesa during polling - just return current status
         # Let the callback handle status updates
+        row = await Appointment.objects.filter(id=appointment_id).values(*PAYMENT_STATUS_FIELDS).afirst()
+        if row is None:
+            logger.error(f"Appointment {appointment_id} not found")
+            return JsonResponse(
+                {'error': 'Appointment not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return JsonResponse(_payment_status_payload(row))
         
-        return Response({
-            'appointment_id': appointment.id,
-            'payment_status': appointment.payment_status,
-            'mpesa_transaction_id': appointment.mpesa_transaction_id,
-            'amount_paid': float(appointment.amount_paid) if appointment.amount_paid else None,
-            'payment_date': appointment.payment_date,
-            'appointment_status': appointment.status
-        })
-        
-    except Appointment.DoesNotExist:
-        logger.error(f"Appointment {appointment_id} not found")
-        return Response(
-            {'error': 'Appointment not found'},
-            status=status.HTTP_404_NOT_FOUND
-        )
     except Exception as e:
         logger.error(f"Error checking payment status: {str(e)}")
-        return Response(
+        return JsonResponse(
             {
                 'error': str(e),
                 'appointment_id': appointment_id,
@@ -505,6 +730,93 @@ def check_payment_status(request, appointment_id):
         )
 
 
+PAYMENT_STATUS_FIELDS = [
+    'id', 'payment_status', 'mpesa_checkout_request_id', 'payment_error',
+    'mpesa_transaction_id', 'amount_paid', 'payment_date', 'status'
+]
+
+
+def _payment_status_payload(row):
+    return {
+        'appointment_id': row['id'],
+        'payment_status': row['payment_status'],
+        'CheckoutRequestID': row['mpesa_checkout_request_id'],
+        'payment_error': row['payment_error'],
+        'mpesa_transaction_id': row['mpesa_transaction_id'],
+        'amount_paid': float(row['amount_paid']) if row['amount_paid'] else None,
+        'payment_date': row['payment_date'],
+        'appointment_status': row['status']
+    }
+
+
+async def wait_for_payment_status(request, appointment_id):
+    """
+    Long-poll variant of check_payment_status.
+
+    Holds the request until the appointment's payment_status differs from
+    ?status= (defaults to the status at the time of the call) or ?timeout=
+    seconds pass. Callback processing wakes waiters through payment_events;
+    the status is also re-read every PAYMENT_WAIT_RECHECK_INTERVAL seconds
+    as a safety net.
+
+    Only ASGI workers hold the request. Under WSGI a waiting request would pin
+    one of the few worker threads, so the view answers straight away with
+    "long_poll": false and the client falls back to short polling.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+
+    long_poll = getattr(settings, 'ASGI_MODE', False)
+    try:
+        timeout = float(request.GET.get('timeout', 25))
+    except ValueError:
+        timeout = 25
+    timeout = max(0, min(timeout, getattr(settings, 'PAYMENT_WAIT_MAX_TIMEOUT', 55)))
+    if not long_poll:
+        timeout = 0
+    recheck_interval = getattr(settings, 'PAYMENT_WAIT_RECHECK_INTERVAL', 5)
+
+    appointments = Appointment.objects.filter(id=appointment_id).values(*PAYMENT_STATUS_FIELDS)
+    row = await appointments.afirst()
+    if row is None:
+        return JsonResponse({'error': 'Appointment not found'}, status=404)
+
+    known_status = request.GET.get('status') or row['payment_status']
+    if row['payment_status'] != known_status or not timeout:
+        return JsonResponse({
+            **_payment_status_payload(row),
+            'changed': row['payment_status'] != known_status,
+            'long_poll': long_poll,
+        })
+
+    ensure_listener()
+    loop = asyncio.get_running_loop()
+    event = asyncio.Event()
+    waiters.register(row['id'], loop, event)
+    deadline = loop.time() + timeout
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(remaining, recheck_interval))
+            except asyncio.TimeoutError:
+                pass
+            event.clear()
+            row = await appointments.afirst() or row
+            if row['payment_status'] != known_status:
+                break
+    finally:
+        waiters.unregister(row['id'], loop, event)
+
+    return JsonResponse({
+        **_payment_status_payload(row),
+        'changed': row['payment_status'] != known_status,
+        'long_poll': long_poll,
+    })
+
+
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 def verify_manual_payment(request):
@@ -576,6 +888,7 @@ def verify_manual_payment(request):
         appointment.amount_paid = appointment.service.price
         appointment.payment_date = timezone.now()
         appointment.save()
+        publish_payment_status(appointment.id)
         
         logger.info(f"Manual payment submitted for verification - appointment {appointment.id}, receipt {mpesa_receipt}")
         
@@ -634,6 +947,7 @@ def approve_manual_payment(request, appointment_id):
             appointment.payment_status = 'completed'
             appointment.status = 'confirmed'
             appointment.save()
+            publish_payment_status(appointment.id)
             
             # Create Transaction record
             try:
@@ -667,6 +981,7 @@ def approve_manual_payment(request, appointment_id):
             appointment.payment_status = 'failed'
             appointment.mpesa_transaction_id = None
             appointment.save()
+            publish_payment_status(appointment.id)
             
             logger.info(f"Admin rejected manual payment for appointment {appointment.id}. Reason: {reason}")
             
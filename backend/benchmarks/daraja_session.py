@@ -0,0 +1,89 @@
+"""
+Benchmark the pooled Daraja HTTP session against per-call connections.
+
+Starts a local stub Daraja server and times STK push calls made the old way
+(module-level ``requests.post``, a new connection per call) and through the
+keep-alive session shared by MpesaClient.
+
+Run from the backend directory with:
+    python -m benchmarks.daraja_session --calls 500
+"""
+import argparse
+import os
+import statistics
+import time
+
+import django
+
+from benchmarks.stub_daraja import start_stub_server
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        'mean_ms': statistics.mean(samples) * 1000,
+        'p50_ms': samples[len(samples) // 2] * 1000,
+        'p95_ms': samples[int(len(samples) * 0.95) - 1] * 1000,
+    }
+
+
+def time_calls(func, calls):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=300)
+    args = parser.parse_args()
+
+    server = start_stub_server()
+    os.environ['MPESA_API_BASE_URL'] = server.base_url
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'verdelle_nails.settings')
+    django.setup()
+
+    import requests
+    from api.mpesa import MpesaClient, get_http_session
+
+    client = MpesaClient()
+    payload = {'BusinessShortCode': client.business_short_code, 'Amount': 1}
+    headers = {'Authorization': 'Bearer stub-token'}
+
+    # Warm up both paths so the comparison excludes first-call imports
+    requests.post(client.stk_push_url, json=payload, headers=headers)
+    get_http_session().post(client.stk_push_url, json=payload, headers=headers)
+
+    fresh = time_calls(
+        lambda: requests.post(client.stk_push_url, json=payload, headers=headers, timeout=client.timeout),
+        args.calls,
+    )
+    pooled = time_calls(
+        lambda: client.session.post(client.stk_push_url, json=payload, headers=headers, timeout=client.timeout),
+        args.calls,
+    )
+    end_to_end = time_calls(
+        lambda: client.stk_push('254712345678', 1, 'Verdelle Nails', 'Benchmark'),
+        args.calls,
+    )
+
+    fresh_stats, pooled_stats = summarize(fresh), summarize(pooled)
+    print(f"Stub Daraja at {server.base_url}, {args.calls} calls per mode\n")
+    print(f"{'mode':<28}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, stats in [
+        ('new connection per call', fresh_stats),
+        ('pooled keep-alive session', pooled_stats),
+        ('MpesaClient.stk_push', summarize(end_to_end)),
+    ]:
+        print(f"{name:<28}{stats['mean_ms']:>10.2f}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}")
+    print(f"\nSaved per call: {fresh_stats['mean_ms'] - pooled_stats['mean_ms']:.2f} ms "
+          f"(plain HTTP; a TLS handshake to Safaricom adds considerably more)")
+    print(f"Stub request counts: {server.counts}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Throughput benchmark for gallery media serving.
+
+Simulates gallery page loads (one request per grid tile) against
+``django.views.static.serve`` and ``verdelle_nails.media.serve_media`` in the
+Django WSGI handler, with several client threads. Modes:
+
+- static.serve:        the previous /media/ view
+- serve_media:         FileResponse with validators, first visit
+- serve_media revisit: browser cache revalidation (If-None-Match -> 304)
+- serve_media range:   first 64 KiB of each image (progressive loaders)
+- serve_media accel:   X-Accel-Redirect offload; the proxy sends the bytes
+
+Run from the backend directory with:
+    python -m benchmarks.media_serving --pages 200 --threads 6
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import django
+
+
+def make_images(media_root, count, size):
+    gallery = os.path.join(media_root, 'gallery')
+    os.makedirs(gallery, exist_ok=True)
+    names = []
+    for index in range(count):
+        name = f'gallery/bench_{index}.jpg'
+        with open(os.path.join(media_root, name), 'wb') as handle:
+            handle.write(os.urandom(size))
+        names.append(name)
+    return names
+
+
+def run_mode(label, names, pages, threads, extra_headers=None, revalidate=False):
+    from django.test import Client
+
+    etags = {}
+    if revalidate:
+        warm = Client()
+        for name in names:
+            etags[name] = warm.get(f'/media/{name}')['ETag']
+
+    counter = iter(range(pages))
+    lock = threading.Lock()
+    totals = {'bytes': 0, 'requests': 0}
+
+    def worker():
+        client = Client()
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            for name in names:
+                headers = dict(extra_headers or {})
+                if revalidate:
+                    headers['HTTP_IF_NONE_MATCH'] = etags[name]
+                response = client.get(f'/media/{name}', **headers)
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+                with lock:
+                    totals['bytes'] += len(body)
+                    totals['requests'] += 1
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22}{pages / elapsed:>12.1f}{totals['requests'] / elapsed:>12.1f}"
+          f"{totals['bytes'] / elapsed / 1e6:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=100, help='Gallery page loads per mode')
+    parser.add_argument('--tiles', type=int, default=12, help='Images per gallery page')
+    parser.add_argument('--image-kb', type=int, default=250)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    media_root = tempfile.mkdtemp(prefix='verdelle-media-bench-')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'verdelle_nails.settings')
+    django.setup()
+
+    from django.test import override_settings
+    from django.urls import clear_url_caches, path, re_path
+    from django.views.static import serve
+
+    from verdelle_nails.media import serve_media
+
+    names = make_images(media_root, args.tiles, args.image_kb * 1024)
+
+    class LegacyUrls:
+        urlpatterns = [re_path(r'^media/(?P<path>.*)$', serve, {'document_root': media_root})]
+
+    class MediaUrls:
+        urlpatterns = [path('media/<path:path>', serve_media)]
+
+    print(f"{args.pages} gallery pages x {args.tiles} images of {args.image_kb} KiB, {args.threads} threads\n")
+    print(f"{'mode':<22}{'pages/s':>12}{'req/s':>12}{'MB/s':>12}")
+    common = {'MEDIA_ROOT': media_root, 'ALLOWED_HOSTS': ['testserver'], 'DEBUG': False}
+    modes = [
+        ('static.serve', LegacyUrls, {}, {}, False),
+        ('serve_media', MediaUrls, {}, {}, False),
+        ('serve_media revisit', MediaUrls, {}, {}, True),
+        ('serve_media range', MediaUrls, {}, {'HTTP_RANGE': 'bytes=0-65535'}, False),
+        ('serve_media accel', MediaUrls, {'MEDIA_ACCEL_REDIRECT_PREFIX': '/protected-media/'}, {}, False),
+    ]
+    try:
+        for label, urlconf, overrides, headers, revalidate in modes:
+            with override_settings(ROOT_URLCONF=urlconf, **common, **overrides):
+                clear_url_caches()
+                run_mode(label, names, args.pages, args.threads, headers, revalidate)
+    finally:
+        clear_url_caches()
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Minimal local stand-in for the Safaricom Daraja API.
+
+Implements the OAuth, STK push and STK query endpoints used by MpesaClient
+with HTTP/1.1 keep-alive, an optional artificial latency and request counters,
+so benchmarks can run without touching Safaricom.
+
+Run standalone with: python -m benchmarks.stub_daraja --port 8090
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubDarajaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        self.server.record(self.path.split('?')[0])
+        self.server.delay()
+        if self.path.startswith('/oauth/v1/generate'):
+            self._send_json({'access_token': 'stub-token', 'expires_in': '3599'})
+        else:
+            self._send_json({'errorMessage': 'Not found'}, status=404)
+
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        self.server.record(path)
+        payload = self._read_json()
+        self.server.delay()
+        if path == '/mpesa/stkpush/v1/processrequest':
+            checkout_id = f'ws_CO_STUB_{next(self.server.ids)}'
+            self._send_json({
+                'MerchantRequestID': f'stub-{checkout_id}',
+                'CheckoutRequestID': checkout_id,
+                'ResponseCode': '0',
+                'ResponseDescription': 'Success. Request accepted for processing',
+                'CustomerMessage': 'Success. Request accepted for processing',
+            })
+            self.server.stk_pushed(checkout_id, payload)
+        elif path == '/mpesa/stkpushquery/v1/query':
+            self._send_json({
+                'ResponseCode': '0',
+                'ResponseDescription': 'The service request has been accepted successsfully',
+                'CheckoutRequestID': payload.get('CheckoutRequestID', ''),
+                'ResultCode': '0',
+                'ResultDesc': 'The service request is processed successfully.',
+            })
+        else:
+            self._send_json({'errorMessage': 'Not found'}, status=404)
+
+
+class StubDarajaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, on_stk_push=None):
+        super().__init__(address, StubDarajaHandler)
+        self.latency = latency
+        self.on_stk_push = on_stk_push
+        self.ids = itertools.count(1)
+        self.counts = {}
+        self._counts_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def record(self, path):
+        with self._counts_lock:
+            self.counts[path] = self.counts.get(path, 0) + 1
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def stk_pushed(self, checkout_id, payload):
+        if self.on_stk_push:
+            self.on_stk_push(checkout_id, payload)
+
+
+def start_stub_server(host='127.0.0.1', port=0, latency=0.0, on_stk_push=None):
+    """Start a stub Daraja server on a background thread and return it"""
+    server = StubDarajaServer((host, port), latency=latency, on_stk_push=on_stk_push)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a local stub of the Daraja API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=0.0, help='Artificial latency per call (seconds)')
+    args = parser.parse_args()
+    server = StubDarajaServer((args.host, args.port), latency=args.latency)
+    print(f'Stub Daraja listening on {server.base_url}')
+    server.serve_forever()
@@ -0,0 +1,39 @@
+"""
+Gunicorn settings loaded automatically from the backend directory.
+
+Command-line flags in Procfile/railway.toml/Dockerfile still apply. This file
+picks the application from APP_SERVER and wires prometheus_client's
+multiprocess mode so /metrics aggregates all workers (see api/metrics.py).
+
+APP_SERVER=wsgi (default) serves verdelle_nails.wsgi with gthread workers
+(--threads). APP_SERVER=asgi serves verdelle_nails.asgi with uvicorn workers,
+where the payment views await Daraja without holding a thread and the
+payment status long-poll holds requests (under WSGI it answers at once and
+the payment page polls every few seconds instead).
+"""
+import glob
+import os
+import tempfile
+
+if os.environ.get('APP_SERVER', 'wsgi').lower() == 'asgi':
+    wsgi_app = 'verdelle_nails.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'verdelle_nails.wsgi:application'
+
+# Must be set before any worker imports prometheus_client
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'verdelle-prometheus'))
+
+
+def on_starting(server):
+    # Samples from a previous master would otherwise be summed into this run
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
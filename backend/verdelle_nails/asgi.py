@@ -6,5 +6,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'verdelle_nails.settings')
+# Lets the payment views use the async Daraja client (see MpesaClient.astk_push)
+os.environ.setdefault('ASGI_MODE', 'True')
 
 application = get_asgi_application()
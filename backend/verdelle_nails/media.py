@@ -0,0 +1,159 @@
+"""
+Production media serving.
+
+Replaces ``django.views.static.serve`` for /media/. When the front proxy is
+configured (MEDIA_ACCEL_REDIRECT_PREFIX for nginx, MEDIA_SENDFILE_HEADER for
+Apache/lighttpd-style X-Sendfile) Django only authorises the path and hands
+the transfer to the proxy. Otherwise the file is streamed by FileResponse with
+ETag/Last-Modified validators, 304 responses, single byte ranges (any other
+Range header gets the whole file with 200) and long-lived Cache-Control for
+content-hashed file names. Under ASGI the body is read through an async
+iterator (``api.streaming``) because Django would otherwise read a
+FileResponse into memory before sending it.
+"""
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from api.streaming import streaming_content
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+FULL_CONTENT = object()
+CHUNK_SIZE = 64 * 1024
+
+
+def _cache_control(path):
+    pattern = getattr(settings, 'MEDIA_IMMUTABLE_PATTERN', r'\.[0-9a-f]{8,}\.\w+$')
+    if pattern and re.search(pattern, path):
+        return 'public, max-age=31536000, immutable'
+    return f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)}"
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def _parse_range(header, size):
+    """
+    Return (start, end) inclusive for a single satisfiable range, None if it
+    cannot be satisfied, or FULL_CONTENT for a header to ignore: several
+    ranges (multipart/byteranges is not supported) or a malformed one, which
+    RFC 9110 answers with the whole file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return FULL_CONTENT
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+def _read_range(fullpath, start, length):
+    with fullpath.open('rb') as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404('Invalid media path')
+    try:
+        stat = fullpath.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('Media file not found')
+    if fullpath.is_dir():
+        raise Http404('Directory indexes are not allowed here.')
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': _cache_control(path),
+        'Accept-Ranges': 'bytes',
+    }
+
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(str(fullpath))
+    content_type = content_type or 'application/octet-stream'
+
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '')
+    sendfile_header = getattr(settings, 'MEDIA_SENDFILE_HEADER', '')
+    if accel_prefix or sendfile_header:
+        # The proxy streams the file (and handles Range) itself
+        response = HttpResponse(content_type=content_type)
+        if accel_prefix:
+            response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(path)
+        else:
+            response[sendfile_header] = str(fullpath)
+    else:
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if range_header and (not if_range or if_range == etag):
+            byte_range = _parse_range(range_header, stat.st_size)
+            if byte_range is None:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+                return response
+            if byte_range is FULL_CONTENT:
+                byte_range = None
+
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                streaming_content(_read_range(fullpath, start, length)), status=206, content_type=content_type
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(length)
+        elif getattr(settings, 'ASGI_MODE', False):
+            response = StreamingHttpResponse(
+                streaming_content(_read_range(fullpath, 0, stat.st_size)), content_type=content_type
+            )
+            response['Content-Length'] = str(stat.st_size)
+        else:
+            response = FileResponse(fullpath.open('rb'), content_type=content_type)
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    for name, value in headers.items():
+        response[name] = value
+    return response
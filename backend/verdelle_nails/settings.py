@@ -5,7 +5,9 @@ Django settings for Verdelle Nails project.
 from pathlib import Path
 from decouple import config
 import os
+import tempfile
 import dj_database_url
+from corsheaders.defaults import default_headers
 from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -53,6 +55,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'corsheaders',
@@ -61,8 +64,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'verdelle_nails.middleware.AsyncWhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -125,6 +129,17 @@ else:
         }
     }
 
+# Cache
+# The default file-based cache is shared by every gunicorn worker on the host,
+# which is what the M-Pesa token cache relies on. Point CACHE_BACKEND at a
+# shared server (e.g. Redis/Memcached) when running several hosts.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=os.path.join(tempfile.gettempdir(), 'verdelle_nails_cache')),
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -146,9 +161,23 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Hand media transfers to the front proxy: an internal nginx location for
+# X-Accel-Redirect (e.g. '/protected-media/'), or a header name such as
+# 'X-Sendfile'. When neither is set Django streams the file itself.
+MEDIA_ACCEL_REDIRECT_PREFIX = config('MEDIA_ACCEL_REDIRECT_PREFIX', default='')
+MEDIA_SENDFILE_HEADER = config('MEDIA_SENDFILE_HEADER', default='')
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=3600, cast=int)
+# File names matching this pattern are content-hashed and cached as immutable
+MEDIA_IMMUTABLE_PATTERN = config('MEDIA_IMMUTABLE_PATTERN', default=r'\.[0-9a-f]{8,}\.\w+$')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Responsive image derivatives (WebP + JPEG) generated after each upload
+IMAGE_DERIVATIVES_ENABLED = config('IMAGE_DERIVATIVES_ENABLED', default=True, cast=bool)
+IMAGE_DERIVATIVE_WIDTHS = [int(w) for w in config('IMAGE_DERIVATIVE_WIDTHS', default='320,640,1024').split(',')]
+IMAGE_DERIVATIVE_QUALITY = config('IMAGE_DERIVATIVE_QUALITY', default=80, cast=int)
+IMAGE_DERIVATIVE_WORKERS = config('IMAGE_DERIVATIVE_WORKERS', default=2, cast=int)
+
 # --- CORS & CSRF SETTINGS ---
 
 # 1. Trusted Origins for CSRF (Fixing the 403 Error)
@@ -185,6 +214,8 @@ RAILWAY_STATIC_URL = config('RAILWAY_STATIC_URL', default=None)
 CSRF_TRUSTED_ORIGINS.extend(normalize_origin(RAILWAY_STATIC_URL))
 
 CORS_ALLOW_CREDENTIALS = True
+# The payment page sends Idempotency-Key with each payment attempt
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 
 # REST Framework Settings
@@ -206,6 +237,31 @@ REST_FRAMEWORK = {
 # Custom User Model
 AUTH_USER_MODEL = 'api.User'
 
+# Prometheus metrics at /metrics, behind "Authorization: Bearer <METRICS_TOKEN>"; without a
+# token the endpoint is only served with DEBUG on
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Rows fetched per round trip by streaming CSV/NDJSON exports
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Seconds the admin dashboard summary is cached
+ADMIN_SUMMARY_CACHE_TTL = config('ADMIN_SUMMARY_CACHE_TTL', default=15, cast=int)
+
+# Most appointment IDs accepted by one POST /api/appointments/bulk-update/
+APPOINTMENT_BULK_UPDATE_MAX = config('APPOINTMENT_BULK_UPDATE_MAX', default=500, cast=int)
+
+# Booking hours and slot grid used by the availability engine
+BOOKING_OPENING_TIME = config('BOOKING_OPENING_TIME', default='09:00')
+BOOKING_CLOSING_TIME = config('BOOKING_CLOSING_TIME', default='19:00')
+BOOKING_SLOT_INTERVAL = config('BOOKING_SLOT_INTERVAL', default=30, cast=int)
+# Seconds before a worker reloads a day to pick up other workers' bookings
+AVAILABILITY_CACHE_TTL = config('AVAILABILITY_CACHE_TTL', default=30, cast=int)
+# Most days a worker keeps in memory (least recently used dropped first)
+AVAILABILITY_CACHE_MAX_DAYS = config('AVAILABILITY_CACHE_MAX_DAYS', default=120, cast=int)
+# How many days ahead appointments can be booked (and availability queried)
+BOOKING_WINDOW_DAYS = config('BOOKING_WINDOW_DAYS', default=90, cast=int)
+
 # M-Pesa Configuration
 MPESA_ENVIRONMENT = config('MPESA_ENVIRONMENT', default='sandbox')
 MPESA_CONSUMER_KEY = config('MPESA_CONSUMER_KEY', default='')
@@ -213,6 +269,43 @@ MPESA_CONSUMER_SECRET = config('MPESA_CONSUMER_SECRET', default='')
 MPESA_SHORTCODE = config('MPESA_SHORTCODE', default='174379')
 MPESA_PASSKEY = config('MPESA_PASSKEY', default='bfb279f9aa9bdbcf158e97dd71a467cd2e0c893059b10f78e6b72ada1ed2c919')
 MPESA_CALLBACK_URL = config('MPESA_CALLBACK_URL', default='https://your-domain.com/api/mpesa/callback/')
+# Refresh the cached OAuth token this many seconds before Daraja expires it
+MPESA_TOKEN_REFRESH_MARGIN = config('MPESA_TOKEN_REFRESH_MARGIN', default=60, cast=int)
+MPESA_TOKEN_LOCK_TIMEOUT = config('MPESA_TOKEN_LOCK_TIMEOUT', default=10, cast=int)
+# Optional override of the Daraja base URL (e.g. a local stub for benchmarks)
+MPESA_API_BASE_URL = config('MPESA_API_BASE_URL', default='')
+# Keep-alive connection pool per worker process and request timeouts (seconds)
+MPESA_HTTP_POOL_SIZE = config('MPESA_HTTP_POOL_SIZE', default=10, cast=int)
+MPESA_CONNECT_TIMEOUT = config('MPESA_CONNECT_TIMEOUT', default=5, cast=float)
+MPESA_READ_TIMEOUT = config('MPESA_READ_TIMEOUT', default=30, cast=float)
+# Set by asgi.py: payment views then await Daraja on an httpx.AsyncClient
+ASGI_MODE = config('ASGI_MODE', default=False, cast=bool)
+MPESA_ASYNC_MAX_CONNECTIONS = config('MPESA_ASYNC_MAX_CONNECTIONS', default=100, cast=int)
+# Hand STK pushes to a background pool instead of calling Daraja in the request
+MPESA_ASYNC_STK_PUSH = config('MPESA_ASYNC_STK_PUSH', default=False, cast=bool)
+MPESA_DISPATCH_WORKERS = config('MPESA_DISPATCH_WORKERS', default=4, cast=int)
+MPESA_DISPATCH_MAX_PENDING = config('MPESA_DISPATCH_MAX_PENDING', default=32, cast=int)
+# Seconds after which an 'initiating' payment whose job was lost (e.g. to a
+# worker restart) may be claimed by a new request
+MPESA_INITIATING_TIMEOUT = config('MPESA_INITIATING_TIMEOUT', default=120, cast=int)
+# Long-poll payment status: upper bound on ?timeout= and DB re-check interval
+PAYMENT_WAIT_MAX_TIMEOUT = config('PAYMENT_WAIT_MAX_TIMEOUT', default=55, cast=int)
+PAYMENT_WAIT_RECHECK_INTERVAL = config('PAYMENT_WAIT_RECHECK_INTERVAL', default=5, cast=float)
+# Callback queue: 'thread' drains it inside each web worker; set to 'off' when
+# running `manage.py process_mpesa_callbacks` as a separate worker instead
+MPESA_CALLBACK_CONSUMER = config('MPESA_CALLBACK_CONSUMER', default='thread')
+MPESA_CALLBACK_BATCH_SIZE = config('MPESA_CALLBACK_BATCH_SIZE', default=50, cast=int)
+MPESA_CALLBACK_POLL_INTERVAL = config('MPESA_CALLBACK_POLL_INTERVAL', default=5, cast=float)
+MPESA_CALLBACK_MAX_ATTEMPTS = config('MPESA_CALLBACK_MAX_ATTEMPTS', default=5, cast=int)
+# Seconds before the first retry of a failed callback, doubled per attempt
+MPESA_CALLBACK_RETRY_BACKOFF = config('MPESA_CALLBACK_RETRY_BACKOFF', default=10, cast=int)
+# Seconds a payment initiation response is kept for replay to retries
+PAYMENT_IDEMPOTENCY_TTL = config('PAYMENT_IDEMPOTENCY_TTL', default=900, cast=int)
+# `manage.py reconcile_payments`: query Daraja about pushes still 'initiated'
+# after this many seconds, with this many threads and queries per second
+MPESA_RECONCILE_AFTER = config('MPESA_RECONCILE_AFTER', default=300, cast=int)
+MPESA_RECONCILE_WORKERS = config('MPESA_RECONCILE_WORKERS', default=4, cast=int)
+MPESA_RECONCILE_RATE = config('MPESA_RECONCILE_RATE', default=5, cast=float)
 
 # Security Settings for Production
 if not DEBUG:
@@ -3,18 +3,18 @@ from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic.base import RedirectView
-from django.views.static import serve # <--- IMPORT THIS
+from .media import serve_media
+from api.metrics import metrics_view
 
 urlpatterns = [
     path('', RedirectView.as_view(url=settings.FRONTEND_URL)),
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    path('metrics', metrics_view, name='metrics'),
 
-    # --- THE MANUAL OVERRIDE ---
-    # This forces Django to serve files at /media/ even in production
-    re_path(r'^media/(?P<path>.*)$', serve, {
-        'document_root': settings.MEDIA_ROOT,
-    }),
+    # Media is served by Django in production too; see verdelle_nails/media.py
+    # for proxy offload (X-Accel-Redirect / X-Sendfile) and caching headers
+    re_path(r'^media/(?P<path>.*)$', serve_media),
 ]
 
 # Keep this for your local computer development
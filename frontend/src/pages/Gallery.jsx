@@ -61,7 +61,13 @@ const Gallery = () => {
         // Store original image URL for reference
         original_image: image.image,
         // Convert to absolute URL
-        image: getAbsoluteImageUrl(image.image)
+        image: getAbsoluteImageUrl(image.image),
+        // Resized WebP derivatives for the grid tiles, once generated
+        tile_srcset: image.image_srcset
+          ? Object.entries(image.image_srcset.webp)
+              .map(([width, url]) => `${getAbsoluteImageUrl(url)} ${width}w`)
+              .join(', ')
+          : undefined
       }));
       
       setImages(processedImages);
@@ -104,6 +110,8 @@ const Gallery = () => {
               >
                 <GalleryImage 
                   src={image.image} 
+                  srcSet={image.tile_srcset}
+                  sizes="(max-width: 768px) 100vw, (max-width: 1200px) 50vw, 33vw"
                   alt={image.title}
                   onError={(e) => {
                     console.error('Failed to load image:', image.image);
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
 import styled from 'styled-components';
 import { motion } from 'framer-motion';
@@ -18,6 +18,12 @@ const Payment = () => {
   const [message, setMessage] = useState('');
   const [checkoutRequestId, setCheckoutRequestId] = useState('');
   const [checkCount, setCheckCount] = useState(0);
+  const lastKnownStatus = useRef('');
+  // Set when the server answers without waiting (a WSGI deployment)
+  const shortPoll = useRef(false);
+  // One key per payment attempt: a retry after a network error is replayed
+  // by the server instead of sending a second M-Pesa prompt
+  const idempotencyKey = useRef('');
   const [mpesaReceipt, setMpesaReceipt] = useState('');
   const [verifyingReceipt, setVerifyingReceipt] = useState(false);
 
@@ -28,21 +34,31 @@ const Payment = () => {
   }, [appointment, navigate]);
 
   useEffect(() => {
-    let interval;
-    const MAX_CHECKS = 40; // 40 checks * 3 seconds = 2 minutes
+    // Each check is a long-poll that returns as soon as the status changes.
+    // Servers that cannot hold the request answer at once; then poll every
+    // few seconds instead, as after a failed request.
+    const LONG_POLL_CHECKS = 5; // 5 checks * 25 seconds ≈ 2 minutes
+    const SHORT_POLL_CHECKS = 40; // 40 checks * 3 seconds = 2 minutes
+    const POLL_DELAY = 3000;
+    const MAX_CHECKS = shortPoll.current ? SHORT_POLL_CHECKS : LONG_POLL_CHECKS;
+    let cancelled = false;
+    let timer;
     
     if (paymentStatus === 'checking' && appointment && checkCount < MAX_CHECKS) {
-      interval = setInterval(() => {
-        checkPaymentStatus();
-        setCheckCount(prev => prev + 1);
-      }, 3000);
+      checkPaymentStatus().then((waited) => {
+        if (cancelled) return;
+        timer = setTimeout(() => {
+          if (!cancelled) setCheckCount(prev => prev + 1);
+        }, waited ? 0 : POLL_DELAY);
+      });
     } else if (checkCount >= MAX_CHECKS && paymentStatus === 'checking') {
       setPaymentStatus('timeout');
       setMessage('Payment verification timed out. Please check your M-Pesa messages or use manual verification if you completed the payment.');
     }
     
     return () => {
-      if (interval) clearInterval(interval);
+      cancelled = true;
+      clearTimeout(timer);
     };
   }, [paymentStatus, appointment, checkCount]);
 
@@ -68,6 +84,9 @@ const Payment = () => {
     setLoading(true);
     setMessage('');
     setPaymentStatus('processing');
+    if (!idempotencyKey.current) {
+      idempotencyKey.current = crypto.randomUUID();
+    }
 
     try {
       console.log('Initiating payment to:', `${API_BASE}/mpesa/initiate/`);
@@ -75,6 +94,7 @@ const Payment = () => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey.current,
         },
         body: JSON.stringify({
           appointment_id: appointment.id,
@@ -86,6 +106,7 @@ const Payment = () => {
       console.log('Payment initiation response:', data);
 
       if (!response.ok) {
+        idempotencyKey.current = '';
         const errorMsg = data.error || data.message || data.detail || 'Payment initiation failed';
         setMessage(`Error: ${errorMsg}`);
         setPaymentStatus('failed');
@@ -94,8 +115,9 @@ const Payment = () => {
       }
 
       if (data.success) {
-        setCheckoutRequestId(data.CheckoutRequestID);
+        setCheckoutRequestId(data.CheckoutRequestID || '');
         setMessage(data.message || 'Please check your phone and enter your M-Pesa PIN');
+        lastKnownStatus.current = data.payment_status || '';
         setPaymentStatus('checking');
         setCheckCount(0);
       } else {
@@ -111,13 +133,23 @@ const Payment = () => {
     }
   };
 
+  // Resolves to true if the server held the request (no pause needed before the next check)
   const checkPaymentStatus = async () => {
     try {
       console.log(`Checking payment status (attempt ${checkCount + 1})...`);
-      const response = await fetch(`${API_BASE}/mpesa/status/${appointment.id}/`);
+      const params = new URLSearchParams({ timeout: '25' });
+      if (lastKnownStatus.current) {
+        params.set('status', lastKnownStatus.current);
+      }
+      const response = await fetch(`${API_BASE}/mpesa/status/${appointment.id}/wait/?${params}`);
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+      }
       const data = await response.json();
 
       console.log('Payment status response:', data);
+      lastKnownStatus.current = data.payment_status;
+      shortPoll.current = data.long_poll === false;
 
       if (data.payment_status === 'completed') {
         console.log('✅ Payment completed!');
@@ -125,25 +157,34 @@ const Payment = () => {
         setMessage('Payment successful! Your appointment has been confirmed.');
       } else if (data.payment_status === 'cancelled') {
         console.log('❌ Payment cancelled');
+        idempotencyKey.current = '';
         setPaymentStatus('cancelled');
         setMessage('Payment was cancelled. You can try again or use manual verification.');
       } else if (data.payment_status === 'failed') {
         console.log('❌ Payment failed');
+        idempotencyKey.current = '';
         setPaymentStatus('failed');
-        setMessage('Payment failed. Please try again or use manual verification.');
+        setMessage(data.payment_error
+          ? `Payment failed: ${data.payment_error}. Please try again or use manual verification.`
+          : 'Payment failed. Please try again or use manual verification.');
       } else if (data.payment_status === 'pending_verification') {
         console.log('⏳ Payment pending verification');
         setPaymentStatus('manual');
         setMessage('Payment submitted for manual verification. An admin will review your payment within 24 hours.');
-      } else if (data.payment_status === 'pending' || data.payment_status === 'initiated') {
+      } else if (['pending', 'initiating', 'initiated'].includes(data.payment_status)) {
         // Still waiting for payment to complete
         console.log(`⏳ Payment still processing (status: ${data.payment_status})`);
+        if (data.CheckoutRequestID) {
+          setCheckoutRequestId(data.CheckoutRequestID || '');
+        }
         // Don't change the UI state - keep checking
       } else {
         console.log(`⚠️ Unexpected payment status: ${data.payment_status}`);
       }
+      return !shortPoll.current;
     } catch (error) {
       console.error('Error checking payment status:', error);
+      return false;
     }
   };
 
@@ -288,6 +329,8 @@ const Payment = () => {
                 If you completed the M-Pesa payment, please use the manual verification option below to submit your receipt number.
               </InfoText>
               <RetryButton onClick={() => {
+                // A deliberate retry is a new payment request, not a replay of the timed-out one
+                idempotencyKey.current = '';
                 setPaymentStatus('idle');
                 setCheckCount(0);
                 setMessage('');
@@ -306,11 +349,11 @@ const Payment = () => {
                 <FaSpinner size={50} />
               </Spinner>
               <StatusTitle>Processing Payment...</StatusTitle>
-              <StatusText>Waiting for M-Pesa confirmation (attempt {checkCount + 1} of 40)</StatusText>
+              <StatusText>Waiting for M-Pesa confirmation (attempt {checkCount + 1} of 5)</StatusText>
               <InfoText>
                 Please complete the payment on your phone. This may take up to 2 minutes.
               </InfoText>
-              {checkCount > 10 && (
+              {checkCount >= 1 && (
                 <ManualVerifyLink onClick={() => setPaymentStatus('manual')}>
                   Payment completed? Verify manually
                 </ManualVerifyLink>